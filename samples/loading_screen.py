@@ -1,5 +1,4 @@
 from ursina import *
-from direct.stdpy import thread
 
 
 class LoadingWheel(Entity):
@@ -36,26 +35,21 @@ if __name__ == '__main__':
     def load_textures():
         textures_to_load = ['brick', 'shore', 'grass', 'heightmap'] * 50
         bar = HealthBar(max_value=len(textures_to_load), value=0, position=(-.5,-.35,-2), scale_x=1, animation_duration=0, world_parent=loading_screen, bar_color=color.gray)
-        for i, t in enumerate(textures_to_load):
-            load_texture(t)
-            print(i)
-            bar.value = i+1
-        # destroy(bar, delay=.01)
-        print('loaded textures')
-        loading_screen.enabled = False
+
+        # the textures get decoded on background threads, and the callbacks run on the main thread, so the loading wheel keeps spinning
+        def on_loaded(future):
+            bar.value += 1
+            if bar.value >= len(textures_to_load):
+                print('loaded textures')
+                loading_screen.enabled = False
+
+        for t in textures_to_load:
+            load_texture_async(t).add_done_callback(on_loaded)
 
     def input(key):
         if key == 'space':
             loading_screen.enabled = True
             info_text.enabled = False
-            t = time.time()
-
-            try:
-                thread.start_new_thread(function=load_textures, args='')
-            except Exception as e:
-                print('error starting thread', e)
+            load_textures()
 
-            print('---', time.time()-t)
-    # load_textures()
-    # invoke(load_textures, delay=0)
     app.run()
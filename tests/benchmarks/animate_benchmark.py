@@ -0,0 +1,56 @@
+# compares Entity.animate, which evaluates the curve every frame with a Tween, with the old way of baking a Func for every step into a Sequence.
+# run with: python tests/benchmarks/animate_benchmark.py
+import tracemalloc
+from time import perf_counter
+
+from ursina import *
+
+app = Ursina(window_type='none')
+application.calculate_dt = False
+time.dt = time.dt_unscaled = 1/60
+
+
+def legacy_animate(self, name, value, duration=.1, delay=0, curve=curve.in_expo, resolution=None):   # Entity.animate before Tween, without the interrupt handling
+    sequence = Sequence(auto_destroy=True, ignore_paused=self.ignore_paused, name=name)
+    sequence.append(Wait(delay))
+    if not resolution:
+        resolution = max(int(duration * 60), 1)
+
+    for i in range(resolution+1):
+        t = curve(i / resolution)
+        sequence.append(Wait(duration / resolution), regenerate=False)
+        sequence.append(Func(self._setattr, name, lerp(self._getattr(name), value, t)), regenerate=False)
+
+    sequence.generate()
+    sequence.start()
+    return sequence
+
+
+def animate(self, name, value, duration=.1, delay=0, curve=curve.in_expo):
+    return self.animate(name, value, duration=duration, delay=delay, curve=curve, interrupt=False)
+
+
+def measure(animate_function, entities, duration, frames=60):
+    application.sequences.clear()
+    tracemalloc.start()
+    t = perf_counter()
+    for e in entities:
+        animate_function(e, 'position', Vec3(1,2,3), duration=duration)
+    create_ms = (perf_counter() - t) * 1000
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    t = perf_counter()
+    for _ in range(frames):
+        app._update()
+    frame_ms = (perf_counter() - t) / frames * 1000
+    return create_ms, memory / len(entities), frame_ms
+
+
+entities = [Entity(shader=None) for _ in range(1_000)]
+for duration in (.5, 2, 8):
+    legacy = measure(legacy_animate, entities, duration)
+    tween = measure(animate, entities, duration)
+    print(f'{len(entities)} animations of {duration}s')
+    for name, (create_ms, bytes_per_animation, frame_ms) in (('baked Funcs', legacy), ('Tween', tween)):
+        print(f'    {name:<12} | create: {create_ms:8.1f} ms | memory: {bytes_per_animation/1000:7.1f} kB per animation | update: {frame_ms:7.2f} ms/frame')
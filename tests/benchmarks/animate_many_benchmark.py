@@ -0,0 +1,34 @@
+# compares animating the position of many entities with one animate() each, and with a single animate_many().
+# run with: python tests/benchmarks/animate_many_benchmark.py
+from time import perf_counter
+
+from ursina import *
+
+app = Ursina(window_type='none')
+application.calculate_dt = False
+time.dt = time.dt_unscaled = 1/60
+
+
+def time_frames(frames=30):
+    t = perf_counter()
+    for _ in range(frames):
+        app._update()
+    return (perf_counter() - t) / frames * 1000
+
+
+for entity_count in (100, 1_000, 10_000):
+    application.sequences.clear()
+    entities = [Entity(shader=None) for _ in range(entity_count)]
+    delays = [i / entity_count * .1 for i in range(entity_count)]   # staggered, so the curve gets evaluated per entity
+
+    for e, delay in zip(entities, delays, strict=True):
+        e.animate_position(Vec3(1,2,3), duration=2, delay=delay, curve=curve.out_bounce)
+    separate_ms = time_frames()
+
+    application.sequences.clear()
+    animate_many(entities, 'position', Vec3(1,2,3), duration=2, delay=delays, curve=curve.out_bounce)
+    batch_ms = time_frames()
+
+    print(f'{entity_count:>6} entities | animate: {separate_ms:8.2f} ms/frame | animate_many: {batch_ms:8.2f} ms/frame | {separate_ms/batch_ms:6.1f}x')
+    for e in entities:
+        destroy(e)
@@ -0,0 +1,54 @@
+# compares finding models by walking the folder with glob, like load_model used to, with the asset index, on a synthetic tree of 50k files.
+# run with: python tests/benchmarks/asset_index_benchmark.py
+import shutil
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+from ursina import asset_index
+from ursina.asset_index import AssetIndex, search
+
+root = Path(tempfile.mkdtemp())
+cache_folder = Path(tempfile.mkdtemp())
+file_types = ('.bam', '.ursinamesh', '.obj', '.glb', '.gltf', '.blend')
+for i in range(500):
+    folder = root / f'level_{i // 50}' / f'props_{i}'
+    folder.mkdir(parents=True)
+    for j in range(100):
+        (folder / f'prop_{i}_{j}{file_types[j % len(file_types)]}').touch()
+print('files:', sum(1 for _ in root.rglob('*.*')))
+
+
+def time_it(func, count=1):
+    t = perf_counter()
+    for _ in range(count):
+        func()
+    return (perf_counter() - t) / count * 1000
+
+
+def glob_lookup(name):    # what load_model did for each model, stopping at the first match
+    for file_type in file_types:
+        for path in root.glob(f'**/{name}{file_type}'):
+            return path
+
+
+def index_lookup(name):
+    return next(search(name, (root, ), file_types), None)
+
+
+print(f'glob, hit:                {time_it(lambda: glob_lookup("prop_499_0"), 3):8.2f} ms per model')
+print(f'glob, miss:               {time_it(lambda: glob_lookup("missing"), 3):8.2f} ms per model')
+
+cache_file = cache_folder / 'asset_index.json'
+print(f'index, first run:         {time_it(lambda: AssetIndex(root, cache_file).load()):8.2f} ms')
+print(f'index, loaded from disk:  {time_it(lambda: AssetIndex(root, cache_file).load(), 5):8.2f} ms')
+(root / 'level_3' / 'props_150' / 'new_prop.bam').touch()
+print(f'index, one folder changed:{time_it(lambda: AssetIndex(root, cache_file).load()):8.2f} ms')
+
+asset_index.indexes[root] = AssetIndex(root, cache_file)
+asset_index.indexes[root].load()
+print(f'index, hit:               {time_it(lambda: index_lookup("prop_499_0"), 1000):8.3f} ms per model')
+print(f'index, miss:              {time_it(lambda: index_lookup("missing"), 100):8.3f} ms per model (checks the folders for changes)')
+
+shutil.rmtree(root)
+shutil.rmtree(cache_folder)
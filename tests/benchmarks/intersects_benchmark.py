@@ -0,0 +1,39 @@
+# compares checking 500 moving entities against 5k static colliders each frame with .intersects(), .intersects(return_hit_only=True) and an IntersectionPool.
+# run with: python tests/benchmarks/intersects_benchmark.py
+import random
+from time import perf_counter
+
+from ursina import *
+
+app = Ursina(window_type='none')
+random.seed(0)
+
+for _ in range(5_000):
+    Entity(model='cube', collider='box', position=(random.uniform(-100,100), random.uniform(0,4), random.uniform(-100,100)), scale=random.uniform(.5,3))
+
+movers = [Entity(model='sphere', collider='sphere', position=(random.uniform(-100,100), 2, random.uniform(-100,100))) for i in range(500)]
+pool = IntersectionPool(entities=movers)
+
+
+def move():
+    for e in movers:
+        e.x += random.uniform(-.5, .5)
+        e.z += random.uniform(-.5, .5)
+
+
+tests = {
+    'intersects()':                      lambda: [e.intersects().hit for e in movers],
+    'intersects(return_hit_only=True)':  lambda: [e.intersects(return_hit_only=True) for e in movers],
+    'IntersectionPool':                  lambda: (pool.update(), [pool.intersects(e) for e in movers]),
+    }
+
+grid = scene.collision_grid
+for use_grid in (True, False):
+    scene.collision_grid = grid if use_grid else None
+    for name, func in tests.items():
+        frames = 10
+        t = perf_counter()
+        for _ in range(frames):
+            move()
+            func()
+        print(f'{"collision_grid" if use_grid else "whole scene   "} | {name:>33}: {(perf_counter() - t) / frames * 1000:8.2f} ms/frame')
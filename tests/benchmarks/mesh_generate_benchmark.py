@@ -0,0 +1,74 @@
+# compares building a grid mesh, like Terrain does, from lists of Vec3 and tuples with building it from numpy arrays.
+# also compares the step that turns the data into flat buffers with how Mesh.generate() did it before numpy arrays were supported.
+# run with: python tests/benchmarks/mesh_generate_benchmark.py
+from time import perf_counter
+
+import numpy as np
+
+from ursina import *
+
+app = Ursina(window_type='none')
+
+
+def legacy_to_buffers(mesh):   # how Mesh.generate() flattened list data before: _ravel into a list, then array.array
+    import array
+    for data, dtype in ((mesh.vertices, 'f'), (mesh.uvs, 'f'), (mesh.indices, 'I')):
+        array.array(dtype, mesh._ravel(data))
+
+
+def to_buffers(mesh):
+    for data, dtype in ((mesh.vertices, 'f'), (mesh.uvs, 'f'), (mesh.indices, 'I')):
+        Mesh._as_buffer(data, dtype)
+
+
+def grid_lists(size):
+    vertices, uvs, triangles = [], [], []
+    for z in range(size):
+        for x in range(size):
+            vertices.append(Vec3(x/(size-1) - .5, 0, z/(size-1) - .5))
+            uvs.append((x/size, z/size))
+            if x > 0 and z > 0:
+                i = z*size + x
+                triangles.append((i, i-1, i-size-1, i-size))
+    return vertices, uvs, triangles
+
+
+def grid_arrays(size):
+    x, z = np.meshgrid(np.arange(size), np.arange(size))
+    vertices = np.stack((x/(size-1) - .5, np.zeros_like(x), z/(size-1) - .5), axis=-1).reshape(-1, 3).astype(np.float32)
+    uvs = np.stack((x/size, z/size), axis=-1).reshape(-1, 2).astype(np.float32)
+    i = (z*size + x)[1:, 1:].reshape(-1)
+    triangles = np.stack((i, i-1, i-size-1, i-size), axis=-1).astype(np.uint32)
+    return vertices, uvs, triangles
+
+
+def regenerate_vertices(mesh):
+    mesh.generated_vertices = None
+    return mesh.generated_vertices
+
+
+def timed(func, *args):
+    t = perf_counter()
+    result = func(*args)
+    return result, (perf_counter() - t) * 1000
+
+
+for size in (64, 256, 512):
+    (vertices, uvs, triangles), build_lists_ms = timed(grid_lists, size)
+    mesh = Mesh(vertices=vertices, uvs=uvs, triangles=triangles)
+    _, legacy_buffers_ms = timed(legacy_to_buffers, mesh)
+    _, list_buffers_ms = timed(to_buffers, mesh)
+    _, list_ms = timed(mesh.generate)
+    _, list_generated_ms = timed(regenerate_vertices, mesh)
+
+    (vertices, uvs, triangles), build_arrays_ms = timed(grid_arrays, size)
+    mesh = Mesh(vertices=vertices, uvs=uvs, triangles=triangles)
+    _, array_buffers_ms = timed(to_buffers, mesh)
+    _, array_ms = timed(mesh.generate)
+    _, array_generated_ms = timed(regenerate_vertices, mesh)
+
+    print(f'{size*size:>7} vertices')
+    print(f'    build data   | lists: {build_lists_ms:9.1f} ms | numpy: {build_arrays_ms:9.1f} ms')
+    print(f'    to buffers   | lists before: {legacy_buffers_ms:9.1f} ms | lists: {list_buffers_ms:9.1f} ms | numpy: {array_buffers_ms:9.1f} ms')
+    print(f'    generate()   | lists: {list_ms:9.1f} ms | numpy: {array_ms:9.1f} ms')
+    print(f'    generated_vertices | lists: {list_generated_ms:9.1f} ms | numpy: {array_generated_ms:9.1f} ms')
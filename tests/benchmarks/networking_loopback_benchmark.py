@@ -0,0 +1,79 @@
+# compares the "threads" and "selectors" backends of networking.Peer on a host with many clients over localhost.
+# every client sends a timestamped message and waits for the host to echo it back, so the latency is the round trip time, including the host's update().
+# run with: python tests/benchmarks/networking_loopback_benchmark.py
+import selectors
+import socket
+import struct
+import threading
+from time import perf_counter, sleep
+
+from ursina.networking import Peer
+
+
+def run(backend, client_count, duration=2):
+    def on_data(connection, data, time_received):
+        connection.send(data)
+
+    host = Peer(on_data=on_data, backend=backend)
+    host.start('localhost', 0, is_host=True, backlog=client_count)
+    while not host.is_running():
+        sleep(.01)
+    port = host.listen_socket.getsockname()[1]
+
+    # the clients are plain sockets serviced by a single thread, so that they don't compete with the host for the GIL more than they have to.
+    clients = [socket.create_connection(('localhost', port)) for i in range(client_count)]
+    while host.connection_count() < client_count:
+        host.update()
+        sleep(.001)
+
+    client_selector = selectors.DefaultSelector()
+    for client in clients:
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client.setblocking(False)
+        client_selector.register(client, selectors.EVENT_READ, bytearray())
+
+    latencies = []
+    done = False
+
+    def drive_clients():
+        while not done:
+            for client in clients:
+                client.sendall(struct.pack('>Hd', 8, perf_counter()))
+            waiting_for = client_count
+            while waiting_for and not done:
+                for key, _ in client_selector.select(.1):
+                    received = key.data
+                    received += key.fileobj.recv(65536)
+                    while len(received) >= 10:
+                        latencies.append(perf_counter() - struct.unpack_from('>d', received, 2)[0])
+                        del received[:10]
+                        waiting_for -= 1
+
+    client_thread = threading.Thread(target=drive_clients, daemon=True)
+    start = perf_counter()
+    client_thread.start()
+    while perf_counter() - start < duration:
+        host.update(max_events=1000)
+        sleep(.001)    # the rest of the frame
+    done = True
+    elapsed = perf_counter() - start
+    client_thread.join()
+
+    for client in clients:
+        client.close()
+    client_selector.close()
+    host.stop()
+
+    latencies.sort()
+    mean_ms = sum(latencies) / max(len(latencies), 1) * 1000
+    p99_ms = latencies[int(len(latencies) * .99)] * 1000 if latencies else 0
+    return len(latencies) / elapsed, mean_ms, p99_ms
+
+
+for client_count in (10, 100, 500):
+    results = dict()
+    for backend in ('threads', 'selectors'):
+        results[backend] = run(backend, client_count)
+        messages_per_second, mean_ms, p99_ms = results[backend]
+        print(f'{client_count:>4} clients | {backend:>9} | {messages_per_second:9.0f} messages/s | latency mean {mean_ms:7.2f} ms, p99 {p99_ms:7.2f} ms')
+    print(f'{"":>4}           selectors/threads throughput: {results["selectors"][0] / results["threads"][0]:.1f}x')
@@ -0,0 +1,65 @@
+# compares sending every message right away with Peer(batch_sends=True), which queues them and sends them all at once in update().
+# the host broadcasts 30 entity updates per tick to 100 clients.
+# run with: python tests/benchmarks/networking_send_batching_benchmark.py
+import selectors
+import socket
+import threading
+from time import perf_counter, sleep
+
+from ursina.networking import Peer
+
+
+def run(backend, batch_sends, client_count=100, messages_per_tick=30, ticks=200):
+    host = Peer(backend=backend, batch_sends=batch_sends)
+    host.start('localhost', 0, is_host=True, backlog=client_count)
+    while not host.is_running():
+        sleep(.01)
+    port = host.listen_socket.getsockname()[1]
+
+    clients = [socket.create_connection(('localhost', port)) for i in range(client_count)]
+    while host.connection_count() < client_count:
+        host.update()
+        sleep(.001)
+
+    # just throw away what the clients receive
+    client_selector = selectors.DefaultSelector()
+    for client in clients:
+        client.setblocking(False)
+        client_selector.register(client, selectors.EVENT_READ)
+    done = False
+
+    def drain_clients():
+        while not done:
+            for key, _ in client_selector.select(.1):
+                try:
+                    key.fileobj.recv(1 << 20)
+                except BlockingIOError:
+                    pass
+
+    client_thread = threading.Thread(target=drain_clients, daemon=True)
+    client_thread.start()
+
+    connections = host.get_connections()
+    message = bytes(28)     # about the size of an rpc with an entity id and a position
+    start = perf_counter()
+    for _ in range(ticks):
+        for connection in connections:
+            for _ in range(messages_per_tick):
+                connection.send(message)
+        host.update()
+    elapsed = perf_counter() - start
+    writes = sum(connection.flush_count for connection in connections)
+
+    done = True
+    client_thread.join()
+    for client in clients:
+        client.close()
+    client_selector.close()
+    host.stop()
+    return elapsed / ticks * 1000, writes / ticks
+
+
+for backend in ('threads', 'selectors'):
+    immediate_ms, immediate_writes = run(backend, batch_sends=False)
+    batched_ms, batched_writes = run(backend, batch_sends=True)
+    print(f'{backend:>9} | immediate: {immediate_ms:7.3f} ms/tick, {immediate_writes:6.0f} writes/tick | batch_sends: {batched_ms:7.3f} ms/tick, {batched_writes:6.0f} writes/tick | {immediate_ms/batched_ms:5.1f}x')
@@ -0,0 +1,58 @@
+# compares sending position updates on the RELIABLE and UNRELIABLE_SEQUENCED channels of the "udp" transport, with simulated packet loss.
+# a client sends 60 timestamped updates per second to the host. the latency is how old the newest update is when the host gets it,
+# so with RELIABLE, every update waits for the lost ones before it to be resent.
+# run with: python tests/benchmarks/networking_udp_loss_benchmark.py
+import struct
+from time import perf_counter, sleep
+
+from ursina.networking import Channel, NetworkSimulator, Peer
+
+
+def run(channel, packet_loss, duration=3, send_rate=60):
+    latencies = []
+
+    def on_data(connection, data, time_received):
+        latencies.append(perf_counter() - struct.unpack('>d', data)[0])
+
+    host = Peer(on_data=on_data, transport='udp')
+    host.start('localhost', 0, is_host=True)
+    while not host.is_running():
+        sleep(.01)
+    client = Peer(transport='udp')
+    client.start('localhost', host.listen_socket.getsockname()[1])
+    while not client.connection_count():
+        sleep(.01)
+    host.update()
+
+    # 20 ms each way, which is about what a player in the same region has.
+    host.network_simulator = NetworkSimulator(packet_loss=packet_loss, latency=.02, seed=1)
+    client.network_simulator = NetworkSimulator(packet_loss=packet_loss, latency=.02, seed=2)
+    connection = client.get_connections()[0]
+    sent = 0
+    start = next_send_time = perf_counter()
+    while perf_counter() - start < duration:
+        if perf_counter() >= next_send_time:
+            connection.send(struct.pack('>d', perf_counter()), channel)
+            sent += 1
+            next_send_time += 1 / send_rate
+        host.update()
+        sleep(.001)
+
+    # let the updates that are still on the way arrive before stopping. reliable ones all arrive eventually, so wait for those.
+    drain_end = perf_counter() + (5 if channel == Channel.RELIABLE else .2)
+    while len(latencies) < sent and perf_counter() < drain_end:
+        host.update()
+        sleep(.001)
+
+    client.stop()
+    host.stop()
+    latencies.sort()
+    mean_ms = sum(latencies) / max(len(latencies), 1) * 1000
+    p99_ms = latencies[int(len(latencies) * .99)] * 1000 if latencies else 0
+    return len(latencies) / max(sent, 1), mean_ms, p99_ms
+
+
+for packet_loss in (0, .05, .2):
+    for channel in (Channel.RELIABLE, Channel.UNRELIABLE_SEQUENCED):
+        received, mean_ms, p99_ms = run(channel, packet_loss)
+        print(f'{packet_loss:4.0%} loss | {channel.name:>20} | received {received:5.1%} | latency mean {mean_ms:7.2f} ms, p99 {p99_ms:7.2f} ms')
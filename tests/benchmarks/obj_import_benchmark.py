@@ -0,0 +1,74 @@
+# compares the line by line .obj parser with the numpy one in obj_reader, on a synthetic grid with uvs, normals and materials.
+# run with: python tests/benchmarks/obj_import_benchmark.py
+import shutil
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+from ursina.mesh_importer import obj_to_ursinamesh
+
+folder = Path(tempfile.mkdtemp())
+size = 500     # size * size quads, so 2 * size * size triangles
+
+
+def write_grid(name, quads=True, materials=False):
+    lines = []
+    if materials:
+        lines.append(f'mtllib {name}.mtl\n')
+    lines.extend(f'v {x/size:.6f} {(x*y%7)/70:.6f} {y/size:.6f}\n' for y in range(size+1) for x in range(size+1))
+    lines.extend(f'vt {x/size:.6f} {y/size:.6f}\n' for y in range(size+1) for x in range(size+1))
+    lines.append('vn 0 1 0\n')
+    for y in range(size):
+        if materials and y % (size // 4) == 0:
+            lines.append(f'usemtl {("red", "blue")[(y // (size // 4)) % 2]}\n')
+        for x in range(size):
+            a, b, c, d = (i + 1 for i in (y*(size+1)+x, y*(size+1)+x+1, (y+1)*(size+1)+x+1, (y+1)*(size+1)+x))
+            if quads:
+                lines.append(f'f {a}/{a}/1 {b}/{b}/1 {c}/{c}/1 {d}/{d}/1\n')
+            else:
+                lines.append(f'f {a}/{a}/1 {b}/{b}/1 {c}/{c}/1\nf {a}/{a}/1 {c}/{c}/1 {d}/{d}/1\n')
+
+    (folder / f'{name}.obj').write_text(''.join(lines))
+    if materials:
+        (folder / f'{name}.mtl').write_text('newmtl red\nKd 1 0 0\nnewmtl blue\nKd 0 0 1\n')
+
+
+def triangles(values, width):  # sorted rows of triangles, so outputs triangulated in a different order compare equal
+    tris = np.round(np.asarray(values, dtype=np.float32).reshape(-1, 3, width), 4)
+    tris = np.sort(tris.reshape(len(tris), -1), axis=1)
+    return tris[np.lexsort(tris.T[::-1])]
+
+
+def check(name, fast, slow):
+    assert len(fast.vertices) == len(slow.vertices), name
+    for attr, width in (('vertices', 3), ('uvs', 2), ('normals', 3), ('colors', 4)):
+        slow_values = getattr(slow, attr)
+        fast_values = getattr(fast, attr)
+        if not len(slow_values):
+            assert fast_values is None or not len(fast_values), (name, attr)
+            continue
+        assert np.array_equal(triangles(fast_values, width), triangles(slow_values, width)), (name, attr)
+
+
+for name, quads, materials in (('quads', True, False), ('triangles', False, False), ('materials', True, True)):
+    write_grid(name, quads, materials)
+    megabytes = (folder / f'{name}.obj').stat().st_size / 1024**2
+    triangle_count = 2 * size * size
+
+    timings = dict()
+    meshes = dict()
+    for use_numpy in (False, True):
+        t = perf_counter()
+        meshes[use_numpy] = obj_to_ursinamesh(folder=folder, name=name, use_numpy=use_numpy)
+        timings[use_numpy] = perf_counter() - t
+
+    check(name, meshes[True], meshes[False])
+    print(f'{name} ({megabytes:.1f} MB, {triangle_count} triangles):')
+    for use_numpy, label in ((False, 'line by line'), (True, 'numpy')):
+        t = timings[use_numpy]
+        print(f'    {label:14}{t*1000:8.0f} ms  {megabytes/t:7.1f} MB/s  {triangle_count/t/1e6:6.2f} M triangles/s')
+    print(f'    speedup: {timings[False]/timings[True]:.1f}x')
+
+shutil.rmtree(folder)
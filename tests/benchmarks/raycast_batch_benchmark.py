@@ -0,0 +1,39 @@
+# compares raycast_batch with calling raycast in a loop, for 1000 sight check style rays among 20k box colliders.
+# run with: python tests/benchmarks/raycast_batch_benchmark.py
+from time import perf_counter
+
+import numpy as np
+
+from ursina import *
+
+app = Ursina(window_type='none')
+rng = np.random.default_rng(0)
+
+chunk = None
+for i, position in enumerate(rng.uniform((-200,0,-200), (200,10,200), (20_000, 3))):
+    if i % 1000 == 0:
+        chunk = Entity()
+    Entity(parent=chunk, model='cube', collider='box', position=position)
+
+ray_count = 1000
+origins = rng.uniform((-200,5,-200), (200,5,200), (ray_count, 3))
+directions = rng.uniform(-1, 1, (ray_count, 3)) * (1,0,1)
+
+
+def loop(distance):
+    return [raycast(Vec3(*origins[i]), Vec3(*directions[i]), distance) for i in range(ray_count)]
+
+
+grid = scene.collision_grid
+for distance in (10, 30, 100):
+    for use_grid in (True, False):
+        scene.collision_grid = grid if use_grid else None
+        if use_grid:
+            grid.refresh()  # turning the grid back on marks everything as moved, since it couldn't keep track while it was off
+        t = perf_counter()
+        results, entities = raycast_batch(origins, directions, distance)
+        batch_ms = (perf_counter() - t) * 1000
+        t = perf_counter()
+        loop(distance) if use_grid else [raycast(Vec3(*origins[i]), Vec3(*directions[i]), distance) for i in range(50)]
+        loop_ms = (perf_counter() - t) * 1000 * (1 if use_grid else ray_count / 50)     # estimated from 50 rays without the grid, since it's slow
+        print(f'{ray_count} rays of {distance:>3} units, {"collision_grid" if use_grid else "whole scene   "} | {results["hit"].sum():>4} hits | raycast loop: {loop_ms:9.1f} ms | raycast_batch: {batch_ms:7.1f} ms | {loop_ms/batch_ms:6.1f}x')
@@ -0,0 +1,47 @@
+# compares raycast, boxcast and intersects using scene.collision_grid with traversing the whole scene, with 20k static box colliders and some moving ones.
+# run with: python tests/benchmarks/raycast_broadphase_benchmark.py
+import random
+from time import perf_counter
+
+from ursina import *
+
+app = Ursina(window_type='none')
+random.seed(0)
+
+chunk = None
+for i in range(20_000):
+    if i % 1000 == 0:
+        chunk = Entity()
+    Entity(parent=chunk, model='cube', collider='box', position=(random.uniform(-200,200), random.uniform(0,10), random.uniform(-200,200)))
+
+movers = [Entity(model='cube', collider='sphere', position=(random.uniform(-200,200), 5, random.uniform(-200,200))) for i in range(100)]
+player = Entity(model='cube', collider='box', position=(0,5,0))
+rays = [(Vec3(random.uniform(-200,200), 5, random.uniform(-200,200)), Vec3(random.uniform(-1,1), 0, random.uniform(-1,1)).normalized()) for i in range(200)]
+
+
+def time_calls(func, count):
+    t = perf_counter()
+    for i in range(count):
+        func(i)
+    return (perf_counter() - t) / count * 1000
+
+
+def move(i):    # move the movers every call, so the grid has to keep up
+    for e in movers:
+        e.x += .1
+
+
+tests = {
+    'raycast, 20 units':        lambda i: (move(i), raycast(*rays[i % len(rays)], distance=20)),
+    'raycast, 9999 units':      lambda i: (move(i), raycast(*rays[i % len(rays)])),
+    'boxcast, 10 units':        lambda i: (move(i), boxcast(*rays[i % len(rays)], distance=10, thickness=1)),
+    'intersects':               lambda i: (move(i), setattr(player, 'position', rays[i % len(rays)][0]), player.intersects()),
+    }
+
+grid = scene.collision_grid
+for name, func in tests.items():
+    scene.collision_grid = None
+    full_ms = time_calls(func, 20)
+    scene.collision_grid = grid
+    grid_ms = time_calls(func, 200)
+    print(f'{name:>20} | whole scene: {full_ms:8.3f} ms | collision_grid: {grid_ms:8.3f} ms | {full_ms/grid_ms:6.1f}x')
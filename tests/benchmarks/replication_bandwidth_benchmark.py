@@ -0,0 +1,58 @@
+# measures how many bytes per tick networking.Replicator sends to a client, depending on how many of the replicated entities change.
+# without deltas, every tick would contain the full state of every entity.
+# run with: python tests/benchmarks/replication_bandwidth_benchmark.py
+import time as _time
+from typing import Annotated
+
+from ursina import *
+from ursina.networking import Replicator, RPCPeer
+
+app = Ursina(window_type='none')
+
+host = RPCPeer(compact=True, length_header='varint')
+client = RPCPeer(compact=True, length_header='varint')
+replicators = []
+for peer in (host, client):
+    peer.print_connect = peer.print_disconnect = False
+    replicator = Replicator(peer, tick_rate=30)
+    replicator.register_class('box', spawn=Entity, fields={'position': Annotated[Vec3, 'f32'], 'rotation_y': Annotated[float, 'f32'], 'color': Color})
+    replicators.append(replicator)
+host_replicator, client_replicator = replicators
+
+
+def run_for(seconds, moving=()):
+    end = _time.time() + seconds
+    while _time.time() < end:
+        for e in moving:
+            e.x += .01
+            e.rotation_y += 1
+        for o in (host, client, host_replicator, client_replicator):
+            o.update()
+        _time.sleep(.001)
+
+
+entity_count = 1000
+boxes = [Entity(position=(i, 0, 0)) for i in range(entity_count)]
+for e in boxes:
+    host_replicator.add(e, 'box')
+
+host.start('localhost', 0, is_host=True)
+while not host.is_running():
+    _time.sleep(.01)
+client.start('localhost', host.peer.listen_socket.getsockname()[1])
+while len(client_replicator.replicated_entities) < entity_count:
+    run_for(.01)
+run_for(.2)
+
+connection = host.get_connections()[0]
+full_state_size = len(boxes) * (12 + 4 + 32)
+print(f'{entity_count} entities, full state: {full_state_size} bytes/tick')
+for fraction in (0, .01, .1, 1):
+    moving = boxes[:int(entity_count * fraction)]
+    start_bytes, start_tick = connection.bytes_sent, host_replicator.tick
+    run_for(1, moving)
+    bytes_per_tick = (connection.bytes_sent - start_bytes) / (host_replicator.tick - start_tick)
+    print(f'{len(moving):>5} changing | {bytes_per_tick:9.1f} bytes/tick | {bytes_per_tick / full_state_size * 100:6.2f}% of the full state')
+
+client.stop()
+host.stop()
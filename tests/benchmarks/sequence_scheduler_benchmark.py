@@ -0,0 +1,44 @@
+# compares the heap based sequence_scheduler with the old way of calling update() on every Sequence every frame.
+# most of the sequences are waiting, like invoke() with a delay or a long animation, so only a few of them have something to do each frame.
+# run with: python tests/benchmarks/sequence_scheduler_benchmark.py
+from time import perf_counter
+
+from ursina import *
+from ursina.sequence import sequence_scheduler
+
+app = Ursina(window_type='none')
+application.calculate_dt = False
+time.dt = time.dt_unscaled = 1/60
+
+
+def legacy_update():   # the sequence part of Ursina._update before the scheduler
+    for seq in application.sequences:
+        seq.update()
+
+
+def time_frames(func, frames=60):
+    t = perf_counter()
+    for _ in range(frames):
+        func()
+    return (perf_counter() - t) / frames * 1000
+
+
+calls = 0
+def count_call():
+    global calls
+    calls += 1
+
+
+for sequence_count in (1_000, 10_000, 100_000):
+    application.sequences.clear()
+    sequence_scheduler.clear()
+    for i in range(sequence_count):
+        Sequence(Func(count_call), 1 + (i % 600) / 60, Func(count_call), loop=True, started=True)
+
+    for seq in application.sequences:   # take them out of the scheduler so update() doesn't reschedule them
+        sequence_scheduler.cancel(seq)
+    legacy_ms = time_frames(legacy_update)
+    for seq in application.sequences:   # resync the sequences with the scheduler after updating them by hand
+        seq.start()
+    scheduler_ms = time_frames(sequence_scheduler.update)
+    print(f'{sequence_count:>7} sequences | update all: {legacy_ms:8.3f} ms/frame | scheduler: {scheduler_ms:8.3f} ms/frame | {legacy_ms/scheduler_ms:6.1f}x')
@@ -0,0 +1,65 @@
+# compares Ursina._update, which only visits entities in scene._updaters, with the old way of going through all of scene.entities every frame.
+# run with: python tests/benchmarks/update_dispatch_benchmark.py
+from time import perf_counter
+
+from ursina import *
+
+app = Ursina(window_type='none')
+
+
+def legacy_update():   # the per entity part of Ursina._update before the update registry
+    for e in scene.entities:
+        if e in scene._entities_marked_for_removal:
+            continue
+        if not e.enabled or e.ignore:
+            continue
+        if application.paused and e.ignore_paused is False:
+            continue
+        if e.has_disabled_ancestor():
+            continue
+
+        if hasattr(e, 'update') and callable(e.update):
+            e.update()
+        if not e:
+            continue
+
+        if hasattr(e, 'scripts'):
+            for script in e.scripts:
+                if script.enabled and hasattr(script, 'update') and callable(script.update):
+                    script.update()
+        if not e:
+            continue
+
+        if e.shader and hasattr(e.shader, "continuous_input"):
+            for key, value in e.shader.continuous_input.items():
+                e.set_shader_input(key, value())
+
+
+class Counter(Entity):
+    frames = 0
+    def update(self):
+        self.frames += 1
+
+
+def time_frames(func, frames=20):
+    t = perf_counter()
+    for _ in range(frames):
+        func()
+    return (perf_counter() - t) / frames * 1000
+
+
+chunk = None
+for entity_count in (1_000, 10_000, 100_000):
+    # keep adding to the scene instead of clearing it between runs. 1% of the entities have an update function, the rest are static props.
+    # parent them to chunks of 1000 entities, since adding to very long children lists is slow on its own.
+    while len(scene.entities) < entity_count:
+        if len(scene.entities) % 1000 == 0:
+            chunk = Entity(shader=None)
+        elif len(scene.entities) % 100 == 0:
+            Counter(parent=chunk, shader=None)
+        else:
+            Entity(parent=chunk, shader=None)
+
+    legacy_ms = time_frames(legacy_update)
+    registry_ms = time_frames(app._update)
+    print(f'{entity_count:>7} entities, {len(scene._updaters):>5} updaters | scan all: {legacy_ms:8.3f} ms/frame | registry: {registry_ms:8.3f} ms/frame | {legacy_ms/registry_ms:6.1f}x')
@@ -0,0 +1,43 @@
+# compares loading a text .ursinamesh, which gets eval()-ed, with loading the binary version, which gets memory-mapped.
+# run with: python tests/benchmarks/ursinamesh_load_benchmark.py
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+from ursina import *
+from ursina.mesh_importer import imported_meshes
+
+app = Ursina(window_type='none')
+folder = Path(tempfile.mkdtemp())
+
+
+def load_time(name, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        imported_meshes.clear()
+        t = perf_counter()
+        load_model(name, folder=folder)
+        best = min(best, perf_counter() - t)
+    return best * 1000
+
+
+for size in (32, 128, 256):
+    x, z = np.meshgrid(np.arange(size), np.arange(size))
+    vertices = np.stack((x/size, np.sin(x*z*.01), z/size), axis=-1).reshape(-1, 3).astype(np.float32)
+    i = (z*size + x)[1:, 1:].reshape(-1)
+    mesh = Mesh(
+        vertices=vertices,
+        triangles=np.stack((i, i-1, i-size-1, i-size), axis=-1).astype(np.uint32),
+        uvs=vertices[:, (0,2)].copy(),
+        normals=np.tile(np.float32((0,1,0)), (len(vertices), 1)),
+        )
+    mesh.save(f'grid_{size}_text.ursinamesh', folder=folder)
+    mesh.save(f'grid_{size}_binary.ursinamesh', folder=folder, binary=True)
+
+    text_ms = load_time(f'grid_{size}_text')
+    binary_ms = load_time(f'grid_{size}_binary')
+    text_kb = (folder / f'grid_{size}_text.ursinamesh').stat().st_size / 1000
+    binary_kb = (folder / f'grid_{size}_binary.ursinamesh').stat().st_size / 1000
+    print(f'{size*size:>7} vertices | text: {text_ms:9.1f} ms, {text_kb:9.0f} kB | binary: {binary_ms:7.1f} ms, {binary_kb:8.0f} kB | {text_ms/binary_ms:6.1f}x')
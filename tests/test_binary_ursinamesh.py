@@ -0,0 +1,51 @@
+import tempfile
+
+import numpy as np
+
+from ursina import *
+from ursina.scripts.binary_ursinamesh import is_binary_ursinamesh, read_binary_ursinamesh
+from ursina.ursinastuff import _test
+
+app = Ursina(window_type='offscreen')
+folder = Path(tempfile.mkdtemp())
+
+
+def rows(data):
+    return np.asarray(Mesh._as_buffer(data, 'f')).tolist()
+
+def round_trip(mesh, name):     # save in both formats and load them again
+    mesh.save(f'{name}_text.ursinamesh', folder=folder)
+    mesh.save(f'{name}.ursinamesh', folder=folder, binary=True)
+    return load_model(f'{name}_text.ursinamesh', folder=folder, use_deepcopy=True), load_model(f'{name}.ursinamesh', folder=folder, use_deepcopy=True)
+
+def same_mesh(a, b):
+    return (np.allclose(rows(a.vertices), rows(b.vertices), atol=1e-4)
+        and np.allclose(rows(a.colors), rows(b.colors), atol=1e-3)
+        and np.allclose(rows(a.uvs), rows(b.uvs), atol=1e-4)
+        and np.allclose(rows(a.normals), rows(b.normals), atol=1e-4)
+        and np.asarray(Mesh._as_buffer(a.triangles, 'I')).tolist() == np.asarray(Mesh._as_buffer(b.triangles, 'I')).tolist()
+        and a.mode == b.mode and abs(a.thickness - b.thickness) < 1e-6)
+
+
+sphere = load_model('sphere', use_deepcopy=True)
+text_version, binary_version = round_trip(sphere, 'sphere')
+_test(is_binary_ursinamesh(folder / 'sphere.ursinamesh') and not is_binary_ursinamesh(folder / 'sphere_text.ursinamesh'))
+_test(same_mesh(binary_version, sphere))
+_test(same_mesh(binary_version, text_version))
+_test(binary_version.geom.get_vertex_data().get_num_rows() == len(sphere.vertices))
+
+# triangles with different lengths, colors and a line mesh
+mixed = Mesh(vertices=[Vec3(0,0,0), Vec3(1,0,0), Vec3(1,1,0), Vec3(0,1,0), Vec3(2,0,0)], triangles=[(0,1,2), (0,2,3,4)], colors=[color.red, color.green, color.blue, color.white, color.black])
+mixed.save('mixed.ursinamesh', folder=folder, binary=True)
+loaded_mixed = read_binary_ursinamesh(folder / 'mixed.ursinamesh')
+_test(same_mesh(loaded_mixed, mixed))
+_test(loaded_mixed.triangles == [(0,1,2), (0,2,3,4)])
+
+line = Mesh(vertices=[(0,0,0), (1,1,0), (2,0,0)], mode='line', thickness=3, static=False)
+line.save('line.ursinamesh', folder=folder, binary=True)
+loaded_line = read_binary_ursinamesh(folder / 'line.ursinamesh')
+_test(same_mesh(loaded_line, line) and loaded_line.static is False)
+
+# the arrays are memory mapped copy-on-write, so editing them doesn't change the file
+loaded_line.update_vertices(0, [(5,5,5)])
+_test(read_binary_ursinamesh(folder / 'line.ursinamesh').vertices[0].tolist() == [0,0,0])
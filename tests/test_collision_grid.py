@@ -0,0 +1,60 @@
+import random
+
+from ursina import *
+from ursina.ursinastuff import _test
+
+app = Ursina(window_type='offscreen')
+random.seed(3)
+
+entities = [Entity(model='cube', collider=random.choice(('box', 'sphere', 'mesh')), position=[random.uniform(-40,40) for _ in range(3)],
+    scale=random.uniform(.3,4), rotation=[random.uniform(0,360) for _ in range(3)]) for i in range(800)]
+parent = Entity(position=(5,0,0))
+children = [Entity(parent=parent, model='cube', collider='box', x=i*2) for i in range(10)]
+Entity(model='plane', collider='box', scale=(500,1,500), y=-50)
+probe = Entity(model='cube', collider='box')
+
+
+def compare(query, *args, **kwargs):    # run the query with scene.collision_grid and with a full traversal of the scene
+    grid = scene.collision_grid
+    with_grid = query(*args, **kwargs)
+    scene.collision_grid = None
+    without_grid = query(*args, **kwargs)
+    scene.collision_grid = grid
+    if with_grid.hit != without_grid.hit:
+        return False
+    return not with_grid.hit or with_grid.entities == without_grid.entities     # same entities, in the same order
+
+
+def random_queries(count=200):
+    mismatches = {'raycast': 0, 'boxcast': 0, 'intersects': 0}
+    for _ in range(count):
+        origin = Vec3(*[random.uniform(-50,50) for _ in range(3)])
+        direction = Vec3(*[random.uniform(-1,1) for _ in range(3)]).normalized()
+        distance = random.choice((5, 30, 9999))
+        ignore = random.sample(entities, 3)
+        mismatches['raycast'] += not compare(raycast, origin, direction, distance, ignore=ignore)
+        mismatches['boxcast'] += not compare(boxcast, origin, direction, min(distance, 40), thickness=2, ignore=ignore)
+        probe.position, probe.scale = origin, random.uniform(1,8)
+        mismatches['intersects'] += not compare(probe.intersects, ignore=ignore)
+    return mismatches
+
+
+_test(random_queries() == {'raycast': 0, 'boxcast': 0, 'intersects': 0})
+
+# move, disable, reparent and destroy some of them, so the grid has to keep up
+for e in random.sample(entities, 200):
+    e.position += Vec3(random.uniform(-20,20), 0, random.uniform(-20,20))
+    e.rotation_y += 45
+    e.scale *= 1.5
+for e in random.sample(entities, 100):
+    e.enabled = False
+for e in random.sample(entities, 50):
+    e.collision = False
+parent.position, parent.rotation_y, parent.scale = (30,10,-20), 90, 3
+children[0].parent = entities[0]
+children[1].world_parent = scene
+for e in random.sample(entities, 50):
+    destroy(e)
+    entities.remove(e)
+
+_test(random_queries() == {'raycast': 0, 'boxcast': 0, 'intersects': 0})
@@ -0,0 +1,57 @@
+from ursina import *
+from ursina.ursinastuff import _test
+
+app = Ursina(window_type='offscreen')
+
+calls = []
+class Listener(Entity):
+    def input(self, key):
+        calls.append((self.name, key))
+
+a = Listener(name='a')
+b = Listener(name='b', input_keys={'space', 'a'})
+c = Listener(name='c')
+no_input = Entity(name='no_input')
+_test(no_input not in scene._get_input_listeners(('space', )))
+
+app.input('space')
+_test(calls == [('a', 'space'), ('b', 'space'), ('c', 'space')])  # in the order of scene.entities
+calls.clear()
+app.input('enter')
+_test(calls == [('a', 'enter'), ('c', 'enter')])     # b only gets the keys in its input_keys
+
+# changing input_keys, and setting it back to None to get every key
+calls.clear()
+b.input_keys = 'enter'
+app.input('space')
+app.input('enter')
+_test(calls == [('a', 'space'), ('c', 'space'), ('a', 'enter'), ('b', 'enter'), ('c', 'enter')])
+calls.clear()
+b.input_keys = None
+app.input('tab')
+_test(calls == [('a', 'tab'), ('b', 'tab'), ('c', 'tab')])
+
+# disabled entities and entities with disabled parents don't get input, and are back in the same place when enabled again
+calls.clear()
+a.enabled = False
+c.parent = Entity(enabled=False)
+app.input('tab')
+_test(calls == [('b', 'tab'), ])
+calls.clear()
+a.enabled = True
+c.parent.enabled = True
+app.input('tab')
+_test(calls == [('a', 'tab'), ('b', 'tab'), ('c', 'tab')])
+
+# returning True eats the input
+class Eater(Entity):
+    def input(self, key):
+        calls.append(('eater', key))
+        return True
+calls.clear()
+a.input = None
+eater = Eater()
+scene._input_listeners.pop(eater)
+scene._input_listeners = {eater: -1, **scene._input_listeners}    # make it get the input first
+app.input('tab')
+_test(calls == [('eater', 'tab'), ])
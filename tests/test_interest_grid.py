@@ -0,0 +1,91 @@
+import time as time_module
+
+from ursina import *
+from ursina.networking import InterestGrid, Replicator, RPCPeer
+from ursina.ursinastuff import _test
+
+app = Ursina(window_type='offscreen')
+
+
+def update_until(condition, objects, timeout=5):
+    end = time_module.time() + timeout
+    while not condition():
+        for e in objects:
+            e.update()
+        time_module.sleep(.002)
+        if time_module.time() > end:
+            return False
+    return True
+
+
+# a host and two loopback clients
+host, client_a, client_b = RPCPeer(), RPCPeer(), RPCPeer()
+replicators = []
+received_calls = {client_a: [], client_b: []}
+for peer in (host, client_a, client_b):
+    peer.print_connect = peer.print_disconnect = False
+    replicator = Replicator(peer, tick_rate=30)
+    replicator.register_class('box', fields={'position': Vec3}, spawn=Entity)
+    replicators.append(replicator)
+
+    def make_procedure(peer):
+        def notify(connection, time_received, x: int):
+            received_calls.get(peer, []).append(x)
+        return notify
+    peer.register_procedure(make_procedure(peer))
+
+host_replicator, replicator_a, replicator_b = replicators
+objects = [host, client_a, client_b, *replicators]
+
+events = []
+grid = InterestGrid(cell_size=5, view_distance=10, axes='xz', on_enter=lambda connection, entity: events.append('enter'), on_leave=lambda connection, entity: events.append('leave'))
+host.interest_manager = grid
+boxes = [Entity(x=i) for i in range(100)]
+for box in boxes:
+    host_replicator.add(box, 'box')
+
+host.start('localhost', 0, is_host=True)
+update_until(host.is_running, [host])
+port = host.peer.listen_socket.getsockname()[1]
+client_a.start('localhost', port)
+update_until(lambda: client_a.is_running() and host.connection_count() == 1, [host, client_a])
+connection_a = host.get_connections()[0]
+client_b.start('localhost', port)
+update_until(lambda: client_b.is_running() and host.connection_count() == 2, [host, client_b])
+connection_b = [connection for connection in host.get_connections() if connection != connection_a][0]
+
+update_until(lambda: host_replicator.tick > 5, objects)
+_test(len(replicator_a.replicated_entities) == 0)   # connections without an observer don't get anything
+
+# each client only spawns the entities near its observer
+grid.set_observer(connection_a, Vec3(0,0,0))
+observer_b = Entity(x=50)
+grid.set_observer(connection_b, observer_b)
+_test(update_until(lambda: len(replicator_a.replicated_entities) == 11 and len(replicator_b.replicated_entities) == 21, objects))
+_test(sorted(round(e.entity.x) for e in replicator_b.replicated_entities.values()) == list(range(40, 61)))
+
+# moving the observer despawns the entities that got out of range and spawns the new ones
+events.clear()
+grid.set_observer(connection_a, Vec3(90,0,0))
+_test(update_until(lambda: sorted(round(e.entity.x) for e in replicator_a.replicated_entities.values()) == list(range(80, 100)), objects))
+_test(events.count('leave') == 11 and events.count('enter') == 20)
+
+# entities stay relevant until view_distance + leave_margin away
+observer_b.x = 51
+update_until(lambda: False, objects, .1)
+_test(boxes[40] in grid.relevant(connection_b))
+
+# broadcasts with relevant_to only go to the connections the entity is relevant to
+host.broadcast('notify', 7, relevant_to=boxes[45])
+host.broadcast('notify', 8)
+_test(update_until(lambda: received_calls[client_b] == [7, 8] and received_calls[client_a] == [8, ], objects))
+
+# destroying the observer despawns everything on that client, and disconnected connections get dropped from the grid
+destroy(observer_b)
+_test(update_until(lambda: len(replicator_b.replicated_entities) == 0, objects))
+client_a.stop()
+client_b.stop()
+update_until(lambda: host.connection_count() == 0, objects)
+update_until(lambda: False, objects, .1)
+_test(not grid.observers)
+host.stop()
@@ -0,0 +1,48 @@
+import numpy as np
+from panda3d.core import GeomVertexReader
+
+from ursina import *
+from ursina.ursinastuff import _test
+
+app = Ursina(window_type='offscreen')
+
+
+def gpu_vertices(mesh):    # what's actually in the vertex data
+    reader = GeomVertexReader(mesh.geom.get_vertex_data(), 'vertex')
+    return [tuple(reader.get_data3()) for i in range(mesh.geom.get_vertex_data().get_num_rows())]
+
+
+# list of Vec3
+mesh = Mesh(vertices=[Vec3(0,0,0), Vec3(1,0,0), Vec3(1,1,0)], triangles=[0,1,2], static=False)
+mesh.update_vertices(1, [Vec3(2,0,0)])
+_test(mesh.vertices[1] == Vec3(2,0,0))
+_test(gpu_vertices(mesh) == [(0,0,0), (2,0,0), (1,1,0)])
+
+# tuple of tuples can't be changed in place, so it gets turned into a list
+mesh = Mesh(vertices=((0,0,0), (1,0,0), (1,1,0)), triangles=(0,1,2), static=False)
+mesh.update_vertices(0, [(5,5,5)])
+_test(list(mesh.vertices) == [(5,5,5), (1,0,0), (1,1,0)])
+_test(gpu_vertices(mesh)[0] == (5,5,5))
+
+# flat list, and flat data for a list of rows
+mesh = Mesh(vertices=[0,0,0, 1,0,0, 1,1,0], static=False)
+mesh.update_vertices(2, (3,3,3))
+_test(mesh.vertices == [0,0,0, 1,0,0, 3,3,3])
+mesh = Mesh(vertices=[(0,0,0), (1,0,0), (1,1,0)], static=False)
+mesh.update_vertices(1, np.array([4,4,4], dtype=np.float32))
+_test(mesh.vertices[1] == (4,4,4))
+
+# numpy
+mesh = Mesh(vertices=np.zeros((4,3), dtype=np.float32), triangles=np.array([[0,1,2,3]], dtype=np.uint32), static=False)
+mesh.update_vertices(slice(2,4), np.ones((2,3), dtype=np.float32))
+_test(mesh.vertices[2:].tolist() == [[1,1,1], [1,1,1]])
+_test(gpu_vertices(mesh)[1:] == [(0,0,0), (1,1,1), (1,1,1)])
+
+# a slice's stop has to match the number of rows given
+def update_with_wrong_slice():
+    try:
+        mesh.update_vertices(slice(0,3), np.ones((2,3), dtype=np.float32))
+    except ValueError:
+        return True
+    return False
+_test(update_with_wrong_slice)
@@ -0,0 +1,88 @@
+import socket
+import struct
+import time
+
+from ursina.networking import Peer, decode_varint, encode_varint, pack_length_header, unpack_length_header
+from ursina.ursinastuff import _test
+
+
+def update_until(condition, peers, timeout=10):
+    end = time.time() + timeout
+    while not condition():
+        for peer in peers:
+            peer.update()
+        time.sleep(.001)
+        if time.time() > end:
+            return False
+    return True
+
+
+# headers on their own
+_test(all(decode_varint(encode_varint(value)) == (value, len(encode_varint(value))) for value in (0, 1, 127, 128, 300, 0xffff, 2**32-1)))
+_test(all(unpack_length_header(length_header, b'xx' + pack_length_header(length_header, 70000), 2)[0] == 70000 for length_header in ('uint32', 'varint')))
+_test(unpack_length_header('uint32', pack_length_header('uint32', 5)[:3], 0) is None)    # the rest of the header hasn't arrived yet
+_test(unpack_length_header('varint', encode_varint(70000)[:2], 0) is None)
+
+
+# every combination of length headers and backends. big messages can only be sent by peers that don't use uint16.
+big_message = bytes(range(256)) * 2000
+
+def send_both_ways(host_backend, client_backend, host_length_header, client_length_header):
+    host_received, client_received = [], []
+    host = Peer(backend=host_backend, length_header=host_length_header, on_data=lambda connection, data, time_received: host_received.append(data))
+    client = Peer(backend=client_backend, length_header=client_length_header, on_data=lambda connection, data, time_received: client_received.append(data))
+    host.start('localhost', 0, is_host=True)
+    update_until(host.is_running, [])
+    client.start('localhost', host.listen_socket.getsockname()[1])
+    update_until(lambda: client.is_running() and host.connection_count() == 1, [host, client])
+
+    # an empty message, and one that looks like a length header announcement
+    client_messages = [b'a', b'', b'\xffursina\xff\x01', b'x' * 300]
+    host_messages = [b'b', b'\xffursina\xff\x01']
+    if client_length_header != 'uint16':
+        client_messages.append(big_message)
+    if host_length_header != 'uint16':
+        host_messages.append(big_message)
+    for message in client_messages:
+        client.get_connections()[0].send(message)
+    for message in host_messages:
+        host.get_connections()[0].send(message)
+
+    update_until(lambda: len(host_received) == len(client_messages) and len(client_received) == len(host_messages), [host, client])
+    _test(host_received == client_messages and client_received == host_messages)
+    client.stop()
+    host.stop()
+
+
+for host_backend, client_backend in (('threads', 'threads'), ('selectors', 'selectors'), ('threads', 'selectors')):
+    for host_length_header, client_length_header in (('uint16', 'uint16'), ('uint32', 'varint'), ('varint', 'uint16'), ('uint16', 'uint32')):
+        send_both_ways(host_backend, client_backend, host_length_header, client_length_header)
+
+
+# messages split over many recv() calls, and many messages in one recv()
+def send_raw(backend):
+    received = []
+    host = Peer(backend=backend, length_header='varint', on_data=lambda connection, data, time_received: received.append(data))
+    host.start('localhost', 0, is_host=True)
+    update_until(host.is_running, [])
+    raw_socket = socket.create_connection(('localhost', host.listen_socket.getsockname()[1]))
+    data = struct.pack('>H', 9) + b'\xffursina\xff\x02'  # announce varint headers, in a uint16 header
+    for message in (b'hello', b'y' * 200, b'z' * 70000):
+        data += encode_varint(len(message)) + message
+    for i in range(300):
+        raw_socket.send(data[i:i+1])
+        time.sleep(.0005)
+    raw_socket.sendall(data[300:])
+    update_until(lambda: len(received) == 3, [host])
+    _test(received == [b'hello', b'y' * 200, b'z' * 70000])
+
+    # a message bigger than max_message_size disconnects
+    host.max_message_size = 1000
+    raw_socket.sendall(encode_varint(5000) + b'q' * 10)
+    _test(update_until(lambda: host.connection_count() == 0, [host]))
+    host.stop()
+    raw_socket.close()
+
+
+for backend in ('threads', 'selectors'):
+    send_raw(backend)
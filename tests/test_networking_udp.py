@@ -0,0 +1,106 @@
+import random
+import time
+
+from ursina.networking import Channel, NetworkSimulator, Peer, RPCPeer, UDPConnection, rpc
+from ursina.ursinastuff import _test
+
+
+def update_until(condition, peers, timeout=30):
+    end = time.time() + timeout
+    while not condition():
+        for peer in peers:
+            peer.update(1000)
+        time.sleep(.002)
+        if time.time() > end:
+            return False
+    return True
+
+def connected_pair(**kwargs):
+    received = {'host': [], 'client': []}
+    host = Peer(transport='udp', on_data=lambda connection, data, time_received: received['host'].append(bytes(data)), **kwargs)
+    host.start('localhost', 0, is_host=True)
+    update_until(host.is_running, [host])
+    client = Peer(transport='udp', on_data=lambda connection, data, time_received: received['client'].append(bytes(data)), **kwargs)
+    client.start('localhost', host.listen_socket.getsockname()[1])
+    update_until(lambda: host.connection_count() == 1 and client.connection_count() == 1, [host, client])
+    return host, client, received
+
+
+# reliable messages arrive in order and only once, with 20% packet loss, reordering and duplicated packets both ways.
+# some are bigger than a packet, so they get split into fragments.
+host, client, received = connected_pair()
+host.network_simulator = NetworkSimulator(packet_loss=.2, latency=.005, jitter=.01, duplicate=.1, seed=1)
+client.network_simulator = NetworkSimulator(packet_loss=.2, latency=.005, jitter=.01, duplicate=.1, seed=2)
+connection = client.get_connections()[0]
+_test(isinstance(connection, UDPConnection))
+
+random.seed(3)
+sent = []
+for i in range(300):
+    size = random.choice((4, 100, 1174, 1175, 5000, 30000))
+    message = i.to_bytes(4, 'big') * (size // 4)
+    sent.append(message)
+    connection.send(message)
+
+update_until(lambda: len(received['host']) >= len(sent), [host, client], timeout=60)
+_test(received['host'] == sent)
+_test(connection.resent_count > 0)
+
+# unreliable sequenced messages can get lost, but never arrive out of order or twice
+host_connection = host.get_connections()[0]
+for i in range(300):
+    host_connection.send(i.to_bytes(4, 'big') + bytes(3000 if i % 7 == 0 else 10), Channel.UNRELIABLE_SEQUENCED)
+    if i % 10 == 0:
+        time.sleep(.002)
+time.sleep(.3)
+for peer in (host, client):
+    peer.update(10000)
+ids = [int.from_bytes(message[:4], 'big') for message in received['client']]
+_test(ids == sorted(set(ids)) and 50 < len(ids) < 300)
+
+# stop simulating, so the disconnect packets don't wait in the simulator's queue
+host.network_simulator = client.network_simulator = None
+client.stop()
+_test(update_until(lambda: host.connection_count() == 0, [host], timeout=5))
+host.stop()
+
+
+# a client that stops answering gets timed out
+host, client, received = connected_pair(connection_timeout=.5)
+client.network_simulator = NetworkSimulator(packet_loss=1)
+_test(update_until(lambda: host.connection_count() == 0 and client.connection_count() == 0, [host, client], timeout=5))
+client.stop()
+host.stop()
+
+
+# RPCPeer with a reliable and an unreliable sequenced procedure
+def call_procedures(compact):
+    log = []
+    host, client = RPCPeer(transport='udp', compact=compact), RPCPeer(transport='udp', compact=compact)
+    for peer in (host, client):
+        peer.print_connect = peer.print_disconnect = False
+
+        @rpc(peer, channel=Channel.UNRELIABLE_SEQUENCED)
+        def move(connection, time_received, x: int):
+            log.append(('move', x))
+
+        @rpc(peer)
+        def chat(connection, time_received, text: str):
+            log.append(('chat', text))
+
+    host.start('localhost', 0, is_host=True)
+    update_until(host.is_running, [host])
+    client.start('localhost', host.peer.listen_socket.getsockname()[1])
+    update_until(lambda: host.connection_count() == 1 and client.connection_count() == 1, [host, client])
+    connection = client.get_connections()[0]
+    for i in range(20):
+        client.move(connection, i)
+        client.chat(connection, str(i))
+    update_until(lambda: len(log) == 40, [host, client])
+    _test([e for e in log if e[0] == 'chat'] == [('chat', str(i)) for i in range(20)])
+    client.stop()
+    host.stop()
+
+
+for compact in (False, True):
+    call_procedures(compact)
@@ -0,0 +1,52 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from ursina.mesh_importer import _parse_obj_lines
+from ursina.scripts.obj_reader import read_obj
+from ursina.ursinastuff import _test
+
+folder = Path(tempfile.mkdtemp())
+
+
+def triangles(values, width):  # sorted rows of triangles, so outputs triangulated in a different order compare equal
+    tris = np.round(np.asarray(values, dtype=np.float32).reshape(-1, 3, width), 4)
+    tris = np.sort(tris.reshape(len(tris), -1), axis=1)
+    return tris[np.lexsort(tris.T[::-1])]
+
+def same_as_line_by_line(file_path, reference_path=None):   # read_obj() should give the same triangles, uvs, normals and colors as _parse_obj_lines()
+    fast, slow = read_obj(file_path), _parse_obj_lines(reference_path if reference_path else file_path)
+    if fast is None or len(fast.vertices) != len(slow.vertices):
+        return False
+    for attr, width in (('vertices', 3), ('uvs', 2), ('normals', 3), ('colors', 4)):
+        fast_values, slow_values = getattr(fast, attr), getattr(slow, attr)
+        if not len(slow_values):
+            if fast_values is not None and len(fast_values):
+                return False
+        elif not np.array_equal(triangles(fast_values, width), triangles(slow_values, width)):
+            return False
+    return True
+
+def write(name, text):
+    (folder / f'{name}.obj').write_text(text)
+    return folder / f'{name}.obj'
+
+
+_test(same_as_line_by_line(write('triangle', 'v 0 0 0\nv 1 0 0\nv 1 1 0\nf 1 2 3\n')))
+_test(same_as_line_by_line(write('quad_and_ngon', 'v 0 0 0\nv 1 0 0\nv 1 1 0\nv .5 1.5 0\nv 0 1 0\nf 1 2 3 5\nf 1 2 3 4 5\n')))
+_test(same_as_line_by_line(write('negative_indices', 'v 0 0 0\nv 1 0 0\nv 1 1 0\nf -3 -2 -1\n'), folder / 'triangle.obj'))    # the line by line parser doesn't support relative indices
+_test(same_as_line_by_line(write('vertex_colors', 'v 0 0 0 1 0 0\nv 1 0 0 0 1 0\nv 1 1 0 0 0 1\nf 1 2 3\n')))
+_test(same_as_line_by_line(write('uvs_and_normals', 'v 0 0 0\nv 1 0 0\nv 1 1 0\nvt 0 0\nvt 1 0\nvt 1 1\nvn 0 0 1\nf 1/1/1 2/2/1 3/3/1\n')))
+_test(same_as_line_by_line(write('normals_only', 'v 0 0 0\nv 1 0 0\nv 1 1 0\nvn 0 0 1\nf 1//1 2//1 3//1\n')))
+_test(same_as_line_by_line(write('crlf', 'v 0 0 0\r\nv 1 0 0\r\nv 1 1 0\r\nf 1 2 3\r\n')))
+_test(same_as_line_by_line(write('comments', '# comment\no thing\nv 0 0 0\nv 1 0 0\nv 1 1 0\ns off\nf 1 2 3\n')))
+
+(folder / 'materials.mtl').write_text('newmtl red\nKd 1 0 0\nnewmtl blue\nKd 0 0 1\n')
+_test(same_as_line_by_line(write('materials', 'mtllib materials.mtl\nv 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nusemtl red\nf 1 2 3\nusemtl blue\nf 1 3 4\n')))
+
+# a model exported from blender, with uvs, normals and materials
+_test(same_as_line_by_line(Path(__file__).parent / 'test_load_blender_model/models_compressed/blender_test_model.obj'))
+
+# faces with different formats in the same run aren't handled, so read_obj() returns None and obj_file_to_mesh() uses the line by line parser instead
+_test(read_obj(write('mixed_faces', 'v 0 0 0\nv 1 0 0\nv 1 1 0\nvt 0 0\nf 1/1 2/1 3/1\nf 1 2 3\n')) is None)
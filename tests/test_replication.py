@@ -0,0 +1,72 @@
+import time as time_module
+from typing import Annotated
+
+from ursina import *
+from ursina.networking import NetworkSimulator, Replicator, RPCPeer
+from ursina.ursinastuff import _test
+
+app = Ursina(window_type='offscreen')
+
+
+def update_until(condition, objects, timeout, moving=()):
+    end = time_module.time() + timeout
+    while not condition():
+        for entity in moving:
+            entity.x += .01
+        for e in objects:
+            e.update()
+        time_module.sleep(.002)
+        if time_module.time() > end:
+            return False
+    return True
+
+
+# 3000 entities is more than fits in one message with a uint16 length header, or in one udp packet
+def replicate(kwargs, packet_loss):
+    host, client = RPCPeer(**kwargs), RPCPeer(**kwargs)
+    replicators = []
+    for peer in (host, client):
+        peer.print_connect = peer.print_disconnect = False
+        if packet_loss:
+            peer.peer.network_simulator = NetworkSimulator(packet_loss=packet_loss, latency=.02, jitter=.01, seed=1)
+        replicator = Replicator(peer, tick_rate=20)
+        replicator.register_class('box', fields={'position': Annotated[Vec3, 'f32'], 'rotation_y': Annotated[float, 'f32'], 'color': Color, 'name': str}, spawn=Entity)
+        replicators.append(replicator)
+    host_replicator, client_replicator = replicators
+    objects = [host, client, host_replicator, client_replicator]
+
+    boxes = [Entity(position=(i,0,0), color=color.red, name=f'box_{i}') for i in range(3000)]
+    for box in boxes:
+        host_replicator.add(box, 'box')
+    host.start('localhost', 0, is_host=True)
+    update_until(host.is_running, [host], 5)
+    client.start('localhost', host.peer.listen_socket.getsockname()[1])
+    update_until(lambda: client.is_running() and host.connection_count() == 1, [host, client], 5)
+    _test(update_until(lambda: len(client_replicator.replicated_entities) == 3000, objects, 20))
+
+    # move all of them for a while, change some colors, and check that the client ends up with the same values
+    def converged():
+        for box in boxes:
+            client_entity = client_replicator.get_entity(host_replicator.get_id(box))
+            if client_entity is None or distance(client_entity.position, box.position) > 1e-4 or client_entity.color != box.color or client_entity.name != box.name:
+                return False
+        return True
+
+    update_until(lambda: False, objects, 1, moving=boxes)
+    for box in boxes[::7]:
+        box.color = color.blue
+    _test(update_until(converged, objects, 20))
+
+    for box in boxes[:100]:
+        destroy(box)
+    _test(update_until(lambda: len(client_replicator.replicated_entities) == 2900, objects, 10))
+
+    client.stop()
+    host.stop()
+    for box in boxes:
+        destroy(box)
+    update_until(lambda: False, objects, .2)
+
+
+for kwargs, packet_loss in ((dict(), None), (dict(compact=True), None), (dict(compact=True, transport='udp'), .05)):
+    replicate(kwargs, packet_loss)
@@ -0,0 +1,61 @@
+from ursina import *
+from ursina.sequence import sequence_scheduler
+from ursina.ursinastuff import _test
+
+app = Ursina(window_type='offscreen')
+application.calculate_dt = False     # step with a fixed dt, so the frame a Func is called on is known
+time.dt = time.dt_unscaled = 1/8
+
+def step(frames=1):
+    for _ in range(frames):
+        app.step()
+
+
+log = []
+s = Sequence(Func(log.append, 'a'), 1, Func(log.append, 'b'), 1, Func(log.append, 'c'), started=True)
+step()
+_test(log == ['a', ])
+step(8)
+_test(log == ['a', 'b'])
+
+# pausing stops the clock for that sequence, resuming continues where it was
+s.pause()
+step(30)
+_test(log == ['a', 'b'])
+s.resume()
+step(9)
+_test(log == ['a', 'b', 'c'] and s.finished)
+
+# killing a looping sequence cancels its scheduled wake-up
+log.clear()
+looping = Sequence(Func(log.append, 'loop'), .5, loop=True, started=True)
+step(17)
+_test(log.count('loop') == 5)
+looping.kill()
+step(16)
+_test(log.count('loop') == 5)
+_test(looping not in application.sequences)
+
+# invoke() and cancelling it before it's due
+log.clear()
+invoke(log.append, 'invoked', delay=.5)
+cancelled = invoke(log.append, 'cancelled', delay=.5)
+cancelled.kill()
+step(8)
+_test(log == ['invoked', ])
+
+# restarting a sequence throws away the old wake-up, so the Funcs don't get called twice
+log.clear()
+restarted = Sequence(1, Func(log.append, 'restarted'), started=True)
+step(4)
+restarted.start()
+step(16)
+_test(log == ['restarted', ])
+
+# scene.clear() removes the sequences, and the scheduler drops them without calling them
+log.clear()
+Sequence(.5, Func(log.append, 'cleared'), started=True)
+scene.clear()
+step(8)
+_test(log == [])
+_test(all(entry[2] != entry[3]._schedule_id for heap in sequence_scheduler.heaps.values() for entry in heap))    # anything left in the heaps is cancelled
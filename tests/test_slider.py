@@ -0,0 +1,23 @@
+from ursina import *
+from ursina.ursinastuff import _test
+
+app = Ursina(window_type='offscreen')
+
+values = []
+slider = Slider(0, 10, default=0, dynamic=True)
+slider.on_value_changed = lambda: values.append(slider.value)
+_test(slider in scene.entities)
+_test(slider in scene._updaters)    # Slider adds itself to the scene at the end of __init__, so it has to be registered for update() too
+
+# drag the knob halfway. Slider.update() should pick up the new position while dragging.
+slider.knob.dragging = True
+slider.knob.x = .25
+app.step()
+_test(values and values[-1] == 5)
+
+slider.knob.stop_dragging()
+values.clear()
+slider.knob.x = .5
+app.step()
+_test(not values)   # not dragging anymore, so update() doesn't call slide()
+_test(slider.value == 10)
@@ -0,0 +1,61 @@
+from ursina import *
+from ursina.ursinastuff import _test
+
+app = Ursina(window_type='offscreen')
+
+calls = []
+class Updater(Entity):
+    def update(self):
+        calls.append(self.name)
+
+a, b, c = Updater(name='a'), Updater(name='b'), Updater(name='c')
+no_update = Entity(name='no_update')
+child = Updater(name='child', parent=b)
+
+app.step()
+_test(calls == ['a', 'b', 'c', 'child'])     # in the order of scene.entities
+_test(no_update not in scene._updaters)     # only entities with update() or scripts get visited
+
+# disabling an entity or its parent skips it, and enabling it again puts it back in the same place
+calls.clear()
+a.enabled = False
+b.enabled = False
+app.step()
+_test(calls == ['c', ])
+calls.clear()
+a.enabled = True
+b.enabled = True
+app.step()
+_test(calls == ['a', 'b', 'c', 'child'])
+
+# update added or removed after creating the entity
+calls.clear()
+a.update = None
+plain = Entity(name='plain')
+plain.update = lambda: calls.append('plain')
+app.step()
+_test(calls == ['b', 'c', 'child', 'plain'])
+
+# scripts get update() too
+class Script:
+    enabled = True
+    def update(self):
+        calls.append('script')
+calls.clear()
+scripted = Entity()
+scripted.add_script(Script())
+app.step()
+_test(calls == ['b', 'c', 'child', 'plain', 'script'])
+
+# destroying an entity in update() of an earlier one skips it the same frame
+class Destroyer(Entity):
+    def update(self):
+        calls.append('destroyer')
+        destroy(c)
+calls.clear()
+destroyer = Destroyer()
+scene._updaters.pop(destroyer)
+scene._updaters = {destroyer: -1, **scene._updaters}    # make it run first
+app.step()
+_test('c' not in calls and 'destroyer' in calls)
+_test(c not in scene._updaters)
@@ -20,17 +20,18 @@ from ursina.array_tools import *
 from ursina import input_handler
 from ursina.input_handler import held_keys, Keys
 from ursina.string_utilities import *
-from ursina.mesh_importer import load_model, load_blender_scene
+from ursina.mesh_importer import load_model, load_model_async, load_blender_scene
 from ursina.texture import Texture
-from ursina.texture_importer import load_texture
+from ursina.texture_importer import load_texture, load_texture_async
 from ursina import color
 from ursina.color import Color, hsv, rgb
-from ursina.sequence import Sequence, Func, Wait
+from ursina.sequence import Sequence, Func, Wait, Tween, BatchTween
 from ursina import curve
 from ursina.entity import Entity
 from ursina.collider import *
-from ursina.raycast import raycast
+from ursina.raycast import raycast, raycast_batch
 from ursina.boxcast import boxcast
+from ursina.intersection_pool import IntersectionPool
 from ursina.audio import Audio
 from ursina import music_system
 from ursina.duplicate import duplicate
@@ -2,11 +2,12 @@ import sys
 from pathlib import Path
 from panda3d.core import getModelPath
 from ursina import string_utilities
+from ursina.array_tools import OrderedSet
 
 paused = False
 time_scale = 1
 calculate_dt = True
-sequences = []
+sequences = OrderedSet()
 trace_entity_definition = False # enable to set entity.line_definition
 print_entity_definition = False
 
@@ -47,6 +48,15 @@ _model_path.append_path(str(Path('C:/Windows/Fonts').resolve()))
 _model_path.append_path(str(asset_folder.resolve()))
 
 
+def __getattr__(name):
+    # cache_folder is where ursina keeps things that can be rebuilt if deleted, like the asset index and converted models.
+    # it's asset_folder / '.ursina_cache/', looked up when used, so it follows asset_folder if that gets changed after import.
+    # set application.cache_folder to put it somewhere else. builds don't include it, and it can be added to .gitignore.
+    if name == 'cache_folder':
+        return asset_folder / '.ursina_cache/'
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
 base = None             # this will be set once the Ursina() is created
 hot_reloader = None     # will be set my main if development_mode
 
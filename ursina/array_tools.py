@@ -428,3 +428,78 @@ class LoopingList(list):
     def __getitem__(self, i):
         return super().__getitem__(i % len(self))
 
+
+
+class OrderedSet:   # keeps insertion order like a list, but append(), remove() and `in` are O(1). iterates over a snapshot, so it's safe to add or remove while iterating.
+    def __init__(self, iterable=()):
+        self._items = dict.fromkeys(iterable)
+
+    def append(self, value):
+        self._items[value] = None
+
+    add = append
+
+    def extend(self, values):
+        self._items.update(dict.fromkeys(values))
+
+    def remove(self, value):
+        try:
+            del self._items[value]
+        except KeyError:
+            raise ValueError(f'{value} not in OrderedSet') from None
+
+    def discard(self, value):
+        self._items.pop(value, None)
+
+    def difference_update(self, values):
+        for value in values:
+            self._items.pop(value, None)
+
+    def clear(self):
+        self._items.clear()
+
+    def copy(self):
+        return OrderedSet(self._items)
+
+    def index(self, value):     # O(n)
+        for i, e in enumerate(self._items):
+            if e is value or e == value:
+                return i
+        raise ValueError(f'{value} not in OrderedSet')
+
+    def __getitem__(self, i):   # O(n), except for the first and last element
+        if i == 0 and self._items:
+            return next(iter(self._items))
+        if i == -1 and self._items:
+            return next(reversed(self._items))
+        return list(self._items)[i]
+
+    def __contains__(self, value):
+        return value in self._items
+
+    def __iter__(self):
+        return iter(tuple(self._items))
+
+    def __reversed__(self):
+        return reversed(tuple(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return f'OrderedSet({list(self._items)})'
+
+
+if __name__ == '__main__':
+    s = OrderedSet(['a', 'b', 'c'])
+    s.append('d')
+    s.remove('b')
+    _test(list(s) == ['a', 'c', 'd'])
+    _test('c' in s)
+    _test(s[-1] == 'd')
+    _test(s.index('d') == 2)
+    s.difference_update({'a', 'x'})
+    _test(list(s) == ['c', 'd'])
+    for e in s:
+        s.append(e + '_copy')
+    _test(list(s) == ['c', 'd', 'c_copy', 'd_copy'])
@@ -0,0 +1,202 @@
+'''
+A dict for loaded assets that keeps the memory they use under a budget.
+load_model and load_texture store what they load in mesh_importer.imported_meshes and texture_importer.imported_textures,
+which are AssetCaches. Without a budget they keep everything, like before. With one, the least recently used
+(or least frequently used, with policy='lfu') assets get dropped when the cache grows past it.
+
+Assets used by an entity's model or texture are reference counted, and never dropped while in use.
+Use pin(name) for assets that should always stay loaded, like the player model.
+
+    mesh_importer.imported_meshes.budget = 256 * 1024**2    # bytes
+    texture_importer.imported_textures.policy = 'lfu'
+    texture_importer.imported_textures.pin('grass')
+    print(texture_importer.imported_textures.stats)
+'''
+from collections import OrderedDict
+
+from panda3d.core import GeomNode, TexturePool
+
+
+class AssetCache:
+    def __init__(self, budget=None, policy='lru', size_of=None, on_evict=None, name='assets'):
+        self.name = name
+        self.policy = policy            # 'lru' or 'lfu'
+        self.size_of = size_of          # function that returns the number of bytes an asset uses
+        self.on_evict = on_evict        # called with the asset when it gets dropped because of the budget
+        self.entries = OrderedDict()    # key -> asset, least recently used first
+        self.sizes = dict()
+        self.uses = dict()
+        self.refcounts = dict()
+        self.pinned = set()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._budget = budget           # max number of bytes to keep, or None for no limit
+
+    @property
+    def budget(self):
+        return self._budget
+
+    @budget.setter
+    def budget(self, value):
+        self._budget = value
+        self.trim()
+
+
+    def get(self, key, default=None):   # like dict.get(), but counts as a hit or miss and marks the asset as used
+        if key not in self.entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.uses[key] += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def __getitem__(self, key):
+        self.entries.move_to_end(key)
+        self.uses[key] += 1
+        return self.entries[key]
+
+    def __setitem__(self, key, value):
+        if key in self.entries:
+            self.resident_bytes -= self.sizes[key]
+        else:
+            self.uses[key] = 1
+            self.refcounts.setdefault(key, 0)
+
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        self.sizes[key] = self.size_of(value) if self.size_of and value is not None else 0
+        self.resident_bytes += self.sizes[key]
+        self.trim(keep=key)
+
+    def __delitem__(self, key):
+        self.resident_bytes -= self.sizes.pop(key)
+        del self.entries[key]
+        del self.uses[key]
+        self.refcounts.pop(key, None)
+
+    def pop(self, key, *default):
+        if key not in self.entries:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = self.entries[key]
+        del self[key]
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.sizes.clear()
+        self.uses.clear()
+        self.refcounts.clear()
+        self.resident_bytes = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def keys(self):
+        return self.entries.keys()
+
+    def values(self):
+        return self.entries.values()
+
+    def items(self):
+        return self.entries.items()
+
+
+    def acquire(self, key):     # mark the asset as in use, so it won't get dropped. returns False if it's not in the cache.
+        if key not in self.entries:
+            return False
+        self.refcounts[key] += 1
+        return True
+
+    def release(self, key):
+        if self.refcounts.get(key):
+            self.refcounts[key] -= 1
+            if self.refcounts[key] == 0:
+                self.trim()
+
+    def pin(self, key):     # keep the asset loaded even when it's not in use. can be called before it's loaded.
+        self.pinned.add(key)
+
+    def unpin(self, key):
+        self.pinned.discard(key)
+        self.trim()
+
+
+    def trim(self, keep=None):   # drop unused assets until resident_bytes is within the budget
+        if self._budget is None:
+            return
+        while self.resident_bytes > self._budget:
+            victim = None
+            for key in self.entries:    # oldest first, so ties go to the least recently used
+                if key == keep or key in self.pinned or self.refcounts.get(key):
+                    continue
+                if self.policy != 'lfu':
+                    victim = key
+                    break
+                if victim is None or self.uses[key] < self.uses[victim]:
+                    victim = key
+
+            if victim is None:  # everything left is in use
+                return
+            value = self.pop(victim)
+            self.evictions += 1
+            if self.on_evict and value is not None:
+                self.on_evict(value)
+
+
+    @property
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses, evictions=self.evictions, resident_bytes=self.resident_bytes, entries=len(self.entries), budget=self._budget)
+
+    def __repr__(self):
+        return f'AssetCache({self.name}, {self.stats})'
+
+
+
+def model_size(node_path):  # bytes used by the vertices, indices and textures of a model
+    size = 0
+    geom_nodes = list(node_path.find_all_matches('**/+GeomNode'))
+    if isinstance(node_path.node(), GeomNode):
+        geom_nodes.append(node_path)
+
+    for geom_node in geom_nodes:
+        for geom in geom_node.node().get_geoms():
+            vertex_data = geom.get_vertex_data()
+            for i in range(vertex_data.get_num_arrays()):
+                size += vertex_data.get_array(i).get_data_size_bytes()
+            for primitive in geom.get_primitives():
+                if primitive.is_indexed():
+                    size += primitive.get_vertices().get_data_size_bytes()
+
+    for texture in node_path.find_all_textures():
+        size += texture.estimate_texture_memory()
+    return size
+
+
+def texture_size(texture):
+    return texture._texture.estimate_texture_memory()
+
+
+def release_texture(texture):   # let panda's TexturePool forget it too, or the memory won't be freed
+    if getattr(texture, 'path', None) is not None:
+        TexturePool.release_texture(texture._texture)
+
+
+
+if __name__ == '__main__':
+    cache = AssetCache(budget=10, size_of=len)
+    cache['a'] = 'aaaa'
+    cache['b'] = 'bbbb'
+    cache.acquire('a')
+    cache['c'] = 'cccc'     # over budget, and 'a' is in use, so 'b' gets dropped
+    print(list(cache), cache.stats)
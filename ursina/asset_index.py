@@ -0,0 +1,213 @@
+'''
+Keeps track of which files are in the asset folders, so load_model, load_texture, Shader.load and Text.font
+don't have to walk the whole folder with glob every time they look for a file.
+
+Each folder is scanned once and the result is saved to application.cache_folder. On the next run, only the
+folders whose modification time changed get scanned again. If a lookup finds nothing, the index checks for
+changes before giving up, so files added while the game is running are found too.
+'''
+import json
+import os
+import threading
+import zlib
+from pathlib import Path
+
+from ursina import application
+
+_VERSION = 2
+_normalize = str.lower if os.name == 'nt' else str    # glob is case-insensitive on windows, so match that
+indexes = dict()    # folder -> AssetIndex
+ignore_folders = ('.ursina_cache', )   # not indexed, so writing the cache doesn't make the index rescan
+_lock = threading.RLock()   # load_model_async and load_texture_async search from background threads
+
+
+class AssetIndex:
+    def __init__(self, folder, cache_file=None):
+        self.folder = Path(folder)
+        self.cache_file = cache_file
+        self.dirs = dict()     # relative dir path -> [modification time, file names, subfolder names]
+        self.files = dict()    # file name -> relative paths of the files with that name
+        self.loaded = False
+
+
+    def find(self, file_name):    # like folder.glob(f'**/{file_name}'), file_name can include a parent folder, like 'textures/grass.png'
+        file_name = _normalize(file_name)
+        base_name = file_name.rsplit('/', 1)[-1]
+        with _lock:
+            if not self.loaded:
+                self.load()
+            rel_paths = tuple(self.files.get(base_name, ()))
+
+        paths = []
+        for rel_path in rel_paths:
+            if base_name != file_name and not ('/' + _normalize(rel_path)).endswith('/' + file_name):
+                continue
+            path = self.folder / rel_path
+            if path.exists():   # might have been deleted since we last looked
+                paths.append(path)
+        return paths
+
+
+    def load(self):
+        with _lock:
+            self._load()
+
+    def _load(self):
+        self.loaded = True
+        if self.cache_file and self.cache_file.exists():
+            try:
+                with self.cache_file.open('r') as f:
+                    data = json.load(f)
+                if data['version'] == _VERSION and data['folder'] == str(self.folder):
+                    self.dirs = data['dirs']
+                    for rel_dir, (_, file_names, _) in self.dirs.items():
+                        self._add_files(rel_dir, file_names)
+            except (OSError, ValueError, KeyError, TypeError):
+                self.dirs, self.files = dict(), dict()
+
+        if self.refresh() or not self.cache_file or not self.cache_file.exists():
+            self.save()
+
+
+    def refresh(self):    # scans the folders that changed since last time. returns True if anything changed.
+        with _lock:
+            if not self.loaded:
+                self.load()
+                return True
+            return self._sync('')
+
+
+    def save(self):
+        if not self.cache_file:
+            return
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with self.cache_file.open('w') as f:
+                json.dump({'version': _VERSION, 'folder': str(self.folder), 'dirs': self.dirs}, f, separators=(',', ':'))
+        except OSError:     # read-only install or similar. the index still works, it just won't be saved.
+            pass
+
+
+    def _sync(self, rel_dir):
+        path = os.path.join(self.folder, rel_dir) if rel_dir else self.folder
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            if rel_dir in self.dirs:
+                self._remove_dir(rel_dir)
+                return True
+            return False
+
+        entry = self.dirs.get(rel_dir)
+        changed = False
+        if entry is None or entry[0] != mtime:
+            file_names, subdirs = [], []
+            try:
+                with os.scandir(path) as it:
+                    for e in it:
+                        try:
+                            if not e.is_dir(follow_symlinks=False):
+                                file_names.append(e.name)
+                            elif e.name not in ignore_folders:
+                                subdirs.append(e.name)
+                        except OSError:
+                            pass
+            except OSError:
+                pass
+
+            if entry is not None:
+                self._remove_files(rel_dir, entry[1])
+                for subdir in set(entry[2]).difference(subdirs):
+                    self._remove_dir(f'{rel_dir}/{subdir}' if rel_dir else subdir)
+            self._add_files(rel_dir, file_names)
+            self.dirs[rel_dir] = entry = [mtime, file_names, subdirs]
+            changed = True
+
+        for subdir in entry[2]:
+            changed |= self._sync(f'{rel_dir}/{subdir}' if rel_dir else subdir)
+        return changed
+
+
+    def _add_files(self, rel_dir, file_names):
+        for file_name in file_names:
+            key = _normalize(file_name)
+            rel_path = f'{rel_dir}/{file_name}' if rel_dir else file_name
+            if key in self.files:
+                self.files[key].append(rel_path)
+            else:
+                self.files[key] = [rel_path, ]
+
+    def _remove_files(self, rel_dir, file_names):
+        for file_name in file_names:
+            key = _normalize(file_name)
+            paths = self.files.get(key)
+            if paths is None:
+                continue
+            rel_path = f'{rel_dir}/{file_name}' if rel_dir else file_name
+            if rel_path in paths:
+                paths.remove(rel_path)
+            if not paths:
+                del self.files[key]
+
+    def _remove_dir(self, rel_dir):
+        entry = self.dirs.pop(rel_dir, None)
+        if entry is None:
+            return
+        self._remove_files(rel_dir, entry[1])
+        for subdir in entry[2]:
+            self._remove_dir(f'{rel_dir}/{subdir}')
+
+
+
+def get_index(folder):
+    folder = Path(folder)
+    with _lock:
+        index = indexes.get(folder)
+        if index is None:
+            cache_file = application.cache_folder / f'asset_index_{zlib.crc32(str(folder.resolve()).encode()):08x}.json'
+            index = indexes[folder] = AssetIndex(folder, cache_file)
+    return index
+
+
+def search(name, folders, file_types=('', ), folder_first=False):
+    # yields (path, file_type, folder) for the files named name + file_type in the folders, in order of file_type, then folder,
+    # or folder, then file_type if folder_first is True. if nothing is found, the indexes check for new files and try again.
+    name = str(name)
+    if folder_first:
+        order = [(folder, file_type) for folder in folders for file_type in file_types]
+    else:
+        order = [(folder, file_type) for file_type in file_types for folder in folders]
+
+    if any(char in name for char in '*?['):     # a glob pattern, so walk the folders like before
+        for folder, file_type in order:
+            for path in folder.glob(f'**/{name}{file_type}'):
+                yield path, file_type, folder
+        return
+
+    for attempt in range(2):
+        found = False
+        for folder, file_type in order:
+            for path in get_index(folder).find(f'{name}{file_type}'):
+                found = True
+                yield path, file_type, folder
+
+        if found or attempt == 1:
+            return
+        if not any([get_index(folder).refresh() for folder in dict.fromkeys(folders)]):
+            return
+
+
+def clear():    # forget the indexes, so the folders get checked again on the next lookup
+    indexes.clear()
+
+
+
+if __name__ == '__main__':
+    from time import perf_counter
+    folders = (application.asset_folder, application.internal_textures_folder)
+    t = perf_counter()
+    print(next(search('noise', folders, ('.png', '.jpg')), None))
+    print('first lookup:', perf_counter() - t)
+    t = perf_counter()
+    print(next(search('white_cube', folders, ('.png', '.jpg')), None))
+    print('second lookup:', perf_counter() - t)
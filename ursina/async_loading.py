@@ -0,0 +1,102 @@
+'''
+Runs slow work, like parsing models and decoding textures, on background threads, and hands the results back to the main thread.
+Panda3D's scene graph and ursina's caches aren't thread safe, so anything that touches them should happen in on_main_thread.
+Ursina runs the queued main thread calls at the start of each frame, taking at most main_thread_time_budget seconds,
+so finishing many loads at once doesn't cause a hitch.
+
+    future = submit(parse_level_file, 'level_1.json', on_main_thread=build_level)
+    future.add_done_callback(lambda future: print('done:', future.result()))
+'''
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Empty, SimpleQueue
+from time import perf_counter
+
+max_workers = 4                     # set before the first load to change how many threads to use
+main_thread_time_budget = .004      # seconds per frame to spend on finishing loads
+
+_executor = None
+_main_thread_queue = SimpleQueue()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ursina_loader')
+    return _executor
+
+
+def call_on_main_thread(function, *args, **kwargs):     # can be called from any thread
+    _main_thread_queue.put((function, args, kwargs))
+
+
+def submit(function, *args, on_main_thread=None, **kwargs):
+    # calls function(*args, **kwargs) on a background thread, then on_main_thread(result) on the main thread, if given.
+    # returns a Future, which gets the result of on_main_thread, or of function if there's no on_main_thread.
+    # the future is resolved on the main thread, so its done callbacks run there too.
+    future = Future()
+    future.set_running_or_notify_cancel()
+
+    def finish(result):
+        try:
+            if on_main_thread is not None:
+                result = on_main_thread(result)
+        except Exception as e:
+            future.set_exception(e)
+            return
+        future.set_result(result)
+
+    def work():
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            call_on_main_thread(future.set_exception, e)
+            return
+        call_on_main_thread(finish, result)
+
+    get_executor().submit(work)
+    return future
+
+
+def resolved(value):    # a future that's already done, for when there's nothing to wait for
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def run_main_thread_tasks(time_budget=None):    # called by Ursina every frame. always runs at least one task, if there are any.
+    if time_budget is None:
+        time_budget = main_thread_time_budget
+    end_time = perf_counter() + time_budget
+    while True:
+        try:
+            function, args, kwargs = _main_thread_queue.get_nowait()
+        except Empty:
+            return
+        function(*args, **kwargs)
+        if perf_counter() > end_time:
+            return
+
+
+def wait(future, timeout=None):     # blocks until the future is done, while still running main thread tasks. for when you need the result right away.
+    end_time = perf_counter() + timeout if timeout is not None else None
+    while not future.done():
+        if end_time is not None and perf_counter() > end_time:
+            raise TimeoutError()
+        try:
+            function, args, kwargs = _main_thread_queue.get(timeout=.01)
+        except Empty:
+            continue
+        function(*args, **kwargs)
+    return future.result()
+
+
+
+if __name__ == '__main__':
+    from time import sleep
+
+    def slow_square(x):
+        sleep(.1)
+        return x * x
+
+    futures = [submit(slow_square, i, on_main_thread=lambda result: result + 1) for i in range(8)]
+    print([wait(f) for f in futures])
@@ -321,7 +321,7 @@ class UrsinaBuild:
             builds_folder='builds',
             build_name='',
             platform='Windows',
-            ignore_folders=['builds', '.venv', 'build.bat','__pycache__','.git'],
+            ignore_folders=['builds', '.venv', 'build.bat','__pycache__','.git','.ursina_cache'],
             ignore_filetypes=['.gitignore', '.psd', '.zip', '.blend', '.blend1', '.kra', '.kra~'],
             extra_ignore_filetypes=[],
         ):
@@ -82,7 +82,7 @@ def make_command_line_app(cls):
 
     # Parse __init__ parameters
     init_sig = inspect.signature(cls.__init__)
-    init_params = list(init_sig.parameters.items())[1:]  # skip self
+    init_params = [(name, param) for name, param in list(init_sig.parameters.items())[1:] if param.kind not in (param.VAR_POSITIONAL, param.VAR_KEYWORD)]  # skip self, and *args and **kwargs if the class doesn't define __init__
 
     init_kwargs = {}
     remaining_args = args[:]
@@ -193,6 +193,8 @@ def print_app_help(cls):
 
     print('Constructor arguments:')
     for name, param in list(init_sig.parameters.items())[1:]:  # skip self
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
         param_type = param.annotation.__name__ if param.annotation != inspect._empty else 'str'
         required = param.default == inspect.Parameter.empty
         default = f'(default={param.default})' if not required else ''
@@ -0,0 +1,388 @@
+from math import floor, inf
+
+from panda3d.core import BoundingSphere, FiniteBoundingVolume, Point3
+
+
+def _entry_distance(entry):     # what CollisionHandlerQueue.sort_entries() sorts by, so the grid and a full traversal give the entries in the same order
+    return (entry.get_surface_point(entry.get_from_node_path()) - entry.get_from().get_collision_origin()).length_squared()
+
+
+class CollisionGrid:
+    '''
+    Broad-phase for scene.collidables, used by raycast, boxcast and Entity.intersects so they only have to test
+    the colliders along the ray or inside the box, instead of traversing the whole scene.
+
+    Colliders are put in every cell their world space bounding box overlaps. Entity marks itself as moved
+    when its position, rotation, scale or parent changes, and the moved colliders get put in their new cells
+    lazily, right before the next query.
+    Entities below a NodePath that isn't an Entity, like the rigidbody of a PhysicsEntity, can be moved without Entity
+    knowing, so the transform of that NodePath gets compared before each query instead.
+    If you move entities with panda3d's methods directly (setPos() and so on), call scene.collision_grid.moved(entity) after,
+    or set scene.collision_grid = None to always traverse the whole scene.
+    '''
+    def __init__(self, cell_size=8, max_cells_per_collider=512, root=None):
+        if root is None:
+            from ursina.scene import instance as root
+        self.root = root
+        self.cell_size = cell_size
+        self.max_cells_per_collider = max_cells_per_collider   # colliders bigger than this, like terrain, or with infinite bounds, get tested by every query instead
+        self.cells = dict()         # (x, y, z) -> set of entities
+        self.entries = dict()       # entity -> (min_cell, max_cell) for the cells it's in, or None if it's in .large
+        self.spheres = dict()       # entity -> (x, y, z, radius) of its world space bounding sphere, for rejecting candidates before traversing them
+        self.large = set()
+        self.members = set()        # every entity added. the ones not under root don't get an entry.
+        self.dirty = set()          # added or moved since the last query
+        self._ancestors = dict()    # entity -> the Entities above it, so moving a parent moves the children too
+        self._descendants = dict()  # ancestor -> set of members below it
+        self._outside = dict()      # NodePath that isn't an Entity -> set of members with it as their first non-Entity ancestor
+        self._outside_transforms = dict()   # NodePath in _outside -> its transform relative to root at the last query
+        self.min_cell = None        # bounds of all the cells that have been used. only grows, so rays can be clipped to it.
+        self.max_cell = None
+
+
+    def add(self, entity):
+        if entity in self.members:
+            self.dirty.add(entity)  # collider might have changed
+            return
+
+        from ursina.entity import Entity
+        ancestors = []
+        parent = getattr(entity, '_parent', None)
+        while isinstance(parent, Entity):
+            ancestors.append(parent)
+            self._descendants.setdefault(parent, set()).add(entity)
+            parent = getattr(parent, '_parent', None)
+
+        self._ancestors[entity] = (ancestors, parent)
+        if parent is not None and parent is not self.root:
+            self._outside.setdefault(parent, set()).add(entity)
+        self.members.add(entity)
+        self.dirty.add(entity)
+
+
+    def remove(self, entity):
+        if entity not in self.members:
+            return
+
+        self.members.discard(entity)
+        self.dirty.discard(entity)
+        self._unindex(entity)
+        ancestors, top = self._ancestors.pop(entity)
+        for ancestor in ancestors:
+            descendants = self._descendants[ancestor]
+            descendants.discard(entity)
+            if not descendants:
+                del self._descendants[ancestor]
+
+        outside = self._outside.get(top)
+        if outside is not None:
+            outside.discard(entity)
+            if not outside:
+                del self._outside[top]
+                self._outside_transforms.pop(top, None)
+
+
+    def moved(self, entity, reparented=False):
+        descendants = self._descendants.get(entity)
+        if reparented:
+            for e in [entity, *descendants] if descendants else [entity, ]:
+                if e in self.members:
+                    self.remove(e)
+                    self.add(e)
+            return
+
+        if entity in self.members:
+            self.dirty.add(entity)
+        if descendants:
+            self.dirty.update(descendants)
+
+
+    def clear(self):
+        self.__init__(self.cell_size, self.max_cells_per_collider, self.root)
+
+
+    def refresh(self):   # called before each query
+        for top, entities in self._outside.items():
+            transform = top.get_transform(self.root) if not top.is_empty() and self.root.is_ancestor_of(top) else None
+            if transform != self._outside_transforms.get(top):
+                self._outside_transforms[top] = transform
+                self.dirty.update(entities)
+
+        if not self.dirty:
+            return
+        for entity in self.dirty:
+            self._index(entity)
+        self.dirty.clear()
+
+
+    def _index(self, entity):
+        ancestors, top = self._ancestors[entity]
+        if top is not self.root and (top is None or not self.root.is_ancestor_of(top)):
+            self._unindex(entity)   # not in the scene, so it can't be hit anyway
+            return
+
+        volume = self.world_volume(entity)
+        if volume is None:
+            self._unindex(entity)
+            return
+
+        cell_size = self.cell_size
+        if volume is inf:
+            min_cell = max_cell = None
+        else:
+            low, high = volume.get_min(), volume.get_max()
+            if isinstance(volume, BoundingSphere):
+                self.spheres[entity] = (*volume.get_center(), volume.get_radius())
+            else:
+                self.spheres[entity] = ((low[0]+high[0])/2, (low[1]+high[1])/2, (low[2]+high[2])/2, (high-low).length()/2)
+            min_cell = (floor(low[0] / cell_size), floor(low[1] / cell_size), floor(low[2] / cell_size))
+            max_cell = (floor(high[0] / cell_size), floor(high[1] / cell_size), floor(high[2] / cell_size))
+
+        if min_cell is None or (max_cell[0]-min_cell[0]+1) * (max_cell[1]-min_cell[1]+1) * (max_cell[2]-min_cell[2]+1) > self.max_cells_per_collider:
+            if self.entries.get(entity, False) is not None:
+                self._unindex(entity, keep_sphere=True)
+                self.entries[entity] = None
+                self.large.add(entity)
+            if min_cell is None:
+                self.spheres.pop(entity, None)
+            return
+
+        if self.entries.get(entity) == (min_cell, max_cell):
+            return
+
+        self._unindex(entity, keep_sphere=True)
+        self.entries[entity] = (min_cell, max_cell)
+        for cell in self._cell_range(min_cell, max_cell):
+            self.cells.setdefault(cell, set()).add(entity)
+
+        if self.min_cell is None:
+            self.min_cell, self.max_cell = min_cell, max_cell
+        else:
+            self.min_cell = tuple(min(a, b) for a, b in zip(self.min_cell, min_cell, strict=True))
+            self.max_cell = tuple(max(a, b) for a, b in zip(self.max_cell, max_cell, strict=True))
+
+
+    def _unindex(self, entity, keep_sphere=False):
+        if not keep_sphere:
+            self.spheres.pop(entity, None)
+        if entity not in self.entries:
+            return
+
+        entry = self.entries.pop(entity)
+        if entry is None:
+            self.large.discard(entity)
+            return
+
+        for cell in self._cell_range(*entry):
+            entities = self.cells[cell]
+            entities.discard(entity)
+            if not entities:
+                del self.cells[cell]
+
+
+    def world_bounds(self, entity):  # returns (min, max) of the entity's collider in world space, or None if it has no bounds
+        volume = self.world_volume(entity)
+        if volume is None:
+            return None
+        if volume is inf:
+            return ((-inf, -inf, -inf), (inf, inf, inf))
+        return (volume.get_min(), volume.get_max())
+
+
+    def world_volume(self, entity):    # the collider's bounding volume in world space, None if it's empty, or inf if it's infinite
+        node_path = getattr(entity.collider, 'node_path', None)
+        if node_path is None or node_path.is_empty():
+            return None
+
+        bounds = node_path.node().get_bounds()
+        if bounds.is_empty():
+            return None
+        if bounds.is_infinite():
+            return inf
+
+        bounds = bounds.make_copy()
+        bounds.xform(node_path.get_mat(self.root))
+        if not isinstance(bounds, FiniteBoundingVolume):
+            return inf
+        return bounds
+
+
+    @staticmethod
+    def _cell_range(min_cell, max_cell):
+        for x in range(min_cell[0], max_cell[0]+1):
+            for y in range(min_cell[1], max_cell[1]+1):
+                for z in range(min_cell[2], max_cell[2]+1):
+                    yield (x, y, z)
+
+
+    def entities_in_box(self, box_min, box_max):   # candidates whose bounds might overlap the box
+        self.refresh()
+        candidates = set(self.large)
+        if not self.cells:
+            return candidates
+
+        cell_size = self.cell_size
+        min_cell = tuple(max(floor(e / cell_size), c) if e > -inf else c for e, c in zip(box_min, self.min_cell, strict=True))
+        max_cell = tuple(min(floor(e / cell_size), c) if e < inf else c for e, c in zip(box_max, self.max_cell, strict=True))
+        if any(a > b for a, b in zip(min_cell, max_cell, strict=True)):
+            return candidates
+
+        if (max_cell[0]-min_cell[0]+1) * (max_cell[1]-min_cell[1]+1) * (max_cell[2]-min_cell[2]+1) > len(self.cells):
+            # the box covers more cells than are in use, so it's faster to check the ones in use
+            for cell, entities in self.cells.items():
+                if all(a <= c <= b for a, c, b in zip(min_cell, cell, max_cell, strict=True)):
+                    candidates.update(entities)
+            return candidates
+
+        cells = self.cells
+        for cell in self._cell_range(min_cell, max_cell):
+            entities = cells.get(cell)
+            if entities:
+                candidates.update(entities)
+        return candidates
+
+
+    def entities_along_ray(self, origin, direction, distance, cull=True):  # candidates whose bounds might be hit by the ray. direction should be normalized.
+        self.refresh()
+        candidates = set(self.large)
+        if not self.cells:
+            return candidates
+
+        cells = self.cells
+        for cell in self._cells_along_ray(origin, direction, distance):
+            entities = cells.get(cell)
+            if entities:
+                candidates.update(entities)
+        if not cull:
+            return candidates
+
+        # skip the ones whose bounding sphere is too far from the ray. much cheaper than traversing them.
+        ox, oy, oz = origin[0], origin[1], origin[2]
+        dx, dy, dz = direction[0], direction[1], direction[2]
+        spheres = self.spheres
+        hits = set()
+        for entity in candidates:
+            sphere = spheres.get(entity)
+            if sphere is None:
+                hits.add(entity)
+                continue
+            x, y, z, radius = sphere
+            t = (x-ox)*dx + (y-oy)*dy + (z-oz)*dz
+            t = 0 if t < 0 else (distance if t > distance else t)
+            x -= ox + dx*t
+            y -= oy + dy*t
+            z -= oz + dz*t
+            if x*x + y*y + z*z <= radius*radius:
+                hits.add(entity)
+        return hits
+
+
+    def traverse(self, traverser, queue, candidates, ignore=(), from_node_path=None, first_only=False):   # traverse each candidate's collider and return all the collision entries, sorted like queue.sort_entries() would, or stop at the first candidate with any if first_only
+        # when the traversal starts at the into node, panda skips the bounding volume check it'd normally do first,
+        # and some of the solid tests (like box into sphere) rely on it, so give from_node_path to do that check here.
+        from_bounds = from_sphere = None
+        if from_node_path is not None:
+            from_bounds = from_node_path.node().get_bounds().make_copy()
+            from_bounds.xform(from_node_path.get_mat(self.root))
+            if isinstance(from_bounds, BoundingSphere):     # the common case, which can be checked without making a BoundingSphere for each candidate
+                from_sphere = (*from_bounds.get_center(), from_bounds.get_radius())
+
+        spheres = self.spheres
+        entries = []
+        for entity in candidates:
+            if from_bounds is not None:
+                sphere = spheres.get(entity)
+                if sphere is not None:
+                    if from_sphere is not None:
+                        x, y, z = sphere[0]-from_sphere[0], sphere[1]-from_sphere[1], sphere[2]-from_sphere[2]
+                        if x*x + y*y + z*z > (sphere[3]+from_sphere[3]) ** 2:
+                            continue
+                    elif not from_bounds.contains(BoundingSphere(Point3(sphere[0], sphere[1], sphere[2]), sphere[3])):
+                        continue
+
+            if entity in ignore or not entity.effective_enabled:    # disabled entities are stashed, so a full traversal wouldn't find them either
+                continue
+            node_path = getattr(entity.collider, 'node_path', None)
+            if node_path is None or node_path.is_empty():
+                continue
+            traverser.traverse(node_path)
+            entries.extend(queue.get_entries())
+            if first_only and entries:
+                return entries
+
+        entries.sort(key=_entry_distance)
+        return entries
+
+
+    def _cells_along_ray(self, origin, direction, distance):
+        # clip the ray to the bounds of the grid, then step from cell to cell (Amanatides & Woo)
+        cell_size = self.cell_size
+        t_enter, t_exit = 0, distance
+        for i in range(3):
+            low, high = self.min_cell[i] * cell_size, (self.max_cell[i]+1) * cell_size
+            if direction[i] == 0:
+                if not low <= origin[i] <= high:
+                    return
+                continue
+
+            t0 = (low - origin[i]) / direction[i]
+            t1 = (high - origin[i]) / direction[i]
+            if t0 > t1:
+                t0, t1 = t1, t0
+            t_enter = max(t_enter, t0)
+            t_exit = min(t_exit, t1)
+
+        if t_enter > t_exit:
+            return
+
+        cell = [0, 0, 0]
+        step = [0, 0, 0]
+        t_max = [inf, inf, inf]
+        t_delta = [inf, inf, inf]
+        for i in range(3):
+            start = origin[i] + direction[i] * t_enter
+            cell[i] = min(max(floor(start / cell_size), self.min_cell[i]), self.max_cell[i])
+            if direction[i] > 0:
+                step[i] = 1
+                t_max[i] = t_enter + ((cell[i]+1) * cell_size - start) / direction[i]
+                t_delta[i] = cell_size / direction[i]
+            elif direction[i] < 0:
+                step[i] = -1
+                t_max[i] = t_enter + (cell[i] * cell_size - start) / direction[i]
+                t_delta[i] = -cell_size / direction[i]
+
+        while True:
+            yield tuple(cell)
+            axis = 0 if t_max[0] <= t_max[1] and t_max[0] <= t_max[2] else (1 if t_max[1] <= t_max[2] else 2)
+            if t_max[axis] > t_exit:
+                return
+            cell[axis] += step[axis]
+            if not self.min_cell[axis] <= cell[axis] <= self.max_cell[axis]:
+                return
+            t_max[axis] += t_delta[axis]
+
+
+
+if __name__ == '__main__':
+    from ursina import EditorCamera, Entity, Ursina, Vec3, camera, color, raycast, scene, time
+    app = Ursina()
+    '''
+    raycast, boxcast and intersects use scene.collision_grid automatically.
+    here, 10k cubes, and a ray that only has to test the few along the way.
+    '''
+    for z in range(100):
+        for x in range(100):
+            Entity(model='cube', collider='box', position=(x*2, 0, z*2), color=color.random_color(), scale=.5)
+
+    mover = Entity(model='cube', collider='box', color=color.red, position=(0,0,50))
+    camera.position = (100, 150, -50)
+    camera.look_at((100,0,100))
+
+    def update():
+        mover.x = (time.time() * 20) % 200
+        hit_info = raycast((-10,0,50), Vec3(1,0,0), distance=300)
+        if hit_info.hit:
+            print(hit_info.entity, hit_info.distance, len(scene.collision_grid.cells))
+
+    EditorCamera()
+    app.run()
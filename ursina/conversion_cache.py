@@ -0,0 +1,332 @@
+'''
+Keeps track of the .bam files load_model makes from .obj and .blend files, so a model only gets converted again when
+the content of its source file changes, not when it's touched, or when the .bam happens to be found first.
+
+Converted models are stored in application.cache_folder / 'converted', named after a hash of the source file and the
+converter settings, then copied to models_compressed, where load_model and builds look for them. The manifest records
+which source each of those .bam files was made from, so load_model can tell when one is out of date.
+
+To convert everything that changed before making a build, run this in the folder with your assets:
+    python -m ursina.conversion_cache warm
+'''
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from panda3d.core import PandaSystem
+
+from ursina import application
+from ursina.cmd_tool_maker import auto_validate_input, make_command_line_app
+from ursina.string_utilities import print_info, print_warning
+
+_VERSION = 1    # change this when the conversion changes, so everything gets converted again
+file_types = ('.obj', '.blend')     # in the order load_model looks for them
+ignore_folders = ('builds', 'build_cache', '__pycache__', '.git', '.venv', '.ursina_cache')  # not searched by warm()
+_manifest = None
+_lock = threading.RLock()   # load_model_async converts on background threads
+
+
+def get_folder():
+    return application.cache_folder / 'converted'
+
+
+def _manifest_path():
+    return get_folder() / 'manifest.json'
+
+
+def _to_key(path):  # paths are stored relative to the asset folder, so the manifest still works if the project is moved
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(application.asset_folder.resolve()).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+def _from_key(key):
+    path = Path(key)
+    return path if path.is_absolute() else application.asset_folder / path
+
+
+def get_manifest():
+    global _manifest
+    with _lock:
+        if _manifest is None or _manifest['folder'] != str(application.asset_folder):
+            _manifest = {'version': _VERSION, 'folder': str(application.asset_folder), 'sources': dict(), 'outputs': dict()}
+            try:
+                with _manifest_path().open('r') as f:
+                    data = json.load(f)
+                if data['version'] == _VERSION:
+                    _manifest['sources'], _manifest['outputs'] = data['sources'], data['outputs']
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        return _manifest
+
+
+def save_manifest():
+    with _lock:
+        manifest = get_manifest()
+        try:
+            get_folder().mkdir(parents=True, exist_ok=True)
+            temp_path = _manifest_path().with_suffix(f'.{os.getpid()}.tmp')
+            with temp_path.open('w') as f:
+                json.dump(manifest, f, separators=(',', ':'))
+            os.replace(temp_path, _manifest_path())
+        except OSError:     # read-only install or similar. the conversions still work, they just won't be remembered.
+            pass
+
+
+def hash_file(path):    # content hash, reused from the manifest if the size and modification time didn't change
+    path = Path(path)
+    stat = path.stat()
+    key = _to_key(path)
+    with _lock:
+        entry = get_manifest()['sources'].get(key)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['hash']
+
+    with path.open('rb') as f:
+        digest = hashlib.file_digest(f, 'sha256').hexdigest()
+    with _lock:
+        get_manifest()['sources'][key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest}
+    return digest
+
+
+def settings_for(source):   # everything other than the source file itself that changes the output
+    source = Path(source)
+    settings = {'version': _VERSION, 'panda3d': PandaSystem.get_version_string(), 'file_type': source.suffix}
+    if source.suffix == '.obj':     # materials are read from the .mtl with the same name
+        mtl_file = source.with_suffix('.mtl')
+        settings['mtl'] = hash_file(mtl_file) if mtl_file.exists() else None
+    elif source.suffix == '.blend':
+        settings['export_mtl'] = True
+    return settings
+
+
+def cache_key(source):
+    data = json.dumps({'source': hash_file(source), **settings_for(source)}, sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+
+def stored_path(key):
+    return get_folder() / f'{key}.bam'
+
+
+def output_path(name):
+    return application.models_compressed_folder / f'{name}.bam'
+
+
+def source_of(output):  # the file a .bam in models_compressed was converted from, or None if it wasn't made by this
+    entry = get_manifest()['outputs'].get(_to_key(output))
+    return _from_key(entry['source']) if entry else None
+
+
+def is_up_to_date(output, source=None):
+    entry = get_manifest()['outputs'].get(_to_key(output))
+    if not entry or not Path(output).exists():
+        return False
+    source = source if source is not None else _from_key(entry['source'])
+    if _to_key(source) != entry['source']:
+        return False
+    if not source.exists():     # builds don't include .blend files, so there's nothing to compare with
+        return True
+    return cache_key(source) == entry['key']
+
+
+def stale_source(output):   # the source of a converted .bam, if it changed since it was converted. else None.
+    source = source_of(output)
+    if source is None or not source.exists() or is_up_to_date(output, source):
+        return None
+    return source
+
+
+def convert_file(source, blender_paths=None, temp_folder=None):     # converts the file to a Mesh, without caching anything
+    from ursina.mesh_importer import blend_to_obj, obj_file_to_mesh
+    source = Path(source)
+    if source.suffix == '.obj':
+        return obj_file_to_mesh(source)
+
+    if source.suffix == '.blend':
+        if blender_paths:
+            application.blender_paths.update(blender_paths)
+        temp_folder = Path(temp_folder) if temp_folder is not None else get_folder()
+        temp_folder.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=temp_folder) as obj_folder:  # not models_compressed, so the .obj doesn't get found instead of the .blend later
+            blend_to_obj(source, out_folder=Path(obj_folder))
+            obj_file = Path(obj_folder) / f'{source.stem}.obj'
+            return obj_file_to_mesh(obj_file) if obj_file.exists() else None
+
+    raise ValueError(f'can only convert {file_types}, not: {source}')
+
+
+def _write_bam(mesh, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(f'.{os.getpid()}_{threading.get_ident()}.tmp')
+    mesh.writeBamFile(temp_path)
+    os.replace(temp_path, path)
+
+
+def _convert_to_file(source, path, blender_paths=None):   # runs in the worker processes for warm()
+    mesh = convert_file(source, blender_paths, temp_folder=path.parent)    # application.cache_folder isn't set up in the worker processes
+    if mesh is None:
+        return False
+    _write_bam(mesh, path)
+    return True
+
+
+def _publish(source, key, output):  # copy the stored .bam to models_compressed and remember where it came from
+    output.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output.with_suffix(f'.{os.getpid()}_{threading.get_ident()}.tmp')
+    shutil.copyfile(stored_path(key), temp_path)
+    os.replace(temp_path, output)
+    with _lock:
+        get_manifest()['outputs'][_to_key(output)] = {'source': _to_key(source), 'key': key}
+        save_manifest()
+
+
+def update(source, name=None, force=False):
+    # makes models_compressed/<name>.bam from source, unless it's up to date already. a conversion stored from earlier gets reused.
+    # returns (output path, Mesh or None, changed). the Mesh is only there if it had to convert the file. changed is True if the output
+    # was replaced, which also happens when it's changed back to a version that was converted before. returns (None, None, False) if it failed.
+    source = Path(source)
+    output = output_path(name if name else source.stem)
+    if not force and is_up_to_date(output, source):
+        return output, None, False
+
+    key = cache_key(source)
+    mesh = None
+    if force or not stored_path(key).exists():
+        print_info('converting:', source)
+        mesh = convert_file(source)
+        if mesh is None:
+            return None, None, False
+        _write_bam(mesh, stored_path(key))
+
+    _publish(source, key, output)
+    return output, mesh, True
+
+
+def find_sources(folders=None):    # name -> source file, picking the same file load_model would, for each model name
+    if folders is None:
+        folders = (application.asset_folder, )
+    sources = dict()
+    for file_type in file_types:
+        for folder in folders:
+            for path in sorted(Path(folder).rglob(f'*{file_type}')):
+                if any(part in ignore_folders for part in path.relative_to(folder).parts):
+                    continue
+                sources.setdefault(path.stem, path)
+
+    for name in sources:    # if the .bam was made from another file with the same name, keep using that one
+        source = source_of(output_path(name))
+        if source is not None and source.exists():
+            sources[name] = source
+    return sources
+
+
+def warm(folders=None, max_workers=None, force=False):
+    # converts all the .obj and .blend files in folders that changed, in parallel, with one process per conversion.
+    # since it starts new python processes, call it from the command line or under if __name__ == '__main__':
+    # .bam files in models_compressed that weren't made by this and are newer than their source are left alone, unless force is True.
+    # returns a dict with the names of the models that were converted, reused, up to date, skipped and failed.
+    result = {'converted': [], 'reused': [], 'up_to_date': [], 'skipped': [], 'failed': []}
+    jobs = dict()   # name -> (source, key)
+    for name, source in find_sources(folders).items():
+        output = output_path(name)
+        if not force:
+            if is_up_to_date(output, source):
+                result['up_to_date'].append(name)
+                continue
+            if output.exists() and source_of(output) is None and output.stat().st_mtime_ns >= source.stat().st_mtime_ns:
+                result['skipped'].append(name)
+                continue
+
+        key = cache_key(source)
+        if not force and stored_path(key).exists():
+            _publish(source, key, output)
+            result['reused'].append(name)
+            continue
+        jobs[name] = (source, key)
+
+    if len(jobs) == 1:  # not worth starting a process for
+        for name, (source, key) in jobs.items():
+            try:
+                converted = _convert_to_file(source, stored_path(key))
+            except Exception as e:
+                print_warning('failed to convert:', source, e)
+                converted = False
+            if converted:
+                _publish(source, key, output_path(name))
+            result['converted' if converted else 'failed'].append(name)
+
+    elif jobs:
+        # spawn instead of fork, since forking a process with a window or running threads isn't safe
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = {executor.submit(_convert_to_file, source, stored_path(key), dict(application.blender_paths)): name for name, (source, key) in jobs.items()}
+            for future in as_completed(futures):
+                name = futures[future]
+                source, key = jobs[name]
+                try:
+                    converted = future.result()
+                except Exception as e:
+                    print_warning('failed to convert:', source, e)
+                    converted = False
+                if converted:
+                    _publish(source, key, output_path(name))
+                result['converted' if converted else 'failed'].append(name)
+
+    save_manifest()
+    return result
+
+
+def clear():    # delete the stored conversions and the manifest. the .bam files in models_compressed are kept.
+    global _manifest
+    with _lock:
+        shutil.rmtree(get_folder(), ignore_errors=True)
+        _manifest = None
+
+
+
+def _set_asset_folder(folder):  # when run from the command line, application.asset_folder is the ursina package, so use the given folder instead
+    application.asset_folder = Path(folder).resolve()
+    application.models_compressed_folder = application.asset_folder / 'models_compressed/'
+
+
+@auto_validate_input
+class ConversionCacheCommands:
+    def warm(self, folder='.', max_workers=0, force=False):
+        '''convert the .obj and .blend files in folder that changed since last time'''
+        _set_asset_folder(folder)
+        result = warm(max_workers=max_workers if max_workers > 0 else None, force=force)
+        for state, names in result.items():
+            print(f'{state}: {len(names)}', ', '.join(sorted(names)) if state in ('converted', 'skipped', 'failed') and names else '')
+
+    def status(self, folder='.'):
+        '''list the models in folder and whether their .bam is up to date'''
+        _set_asset_folder(folder)
+        for name, source in sorted(find_sources().items()):
+            output = output_path(name)
+            if is_up_to_date(output, source):
+                state = 'up to date'
+            elif output.exists() and source_of(output) is None:
+                state = 'not made by ursina'
+            else:
+                state = 'needs converting'
+            print(f'{name:32} {state:20} {_to_key(source)}')
+        save_manifest()
+
+    def clear(self, folder='.'):
+        '''delete the stored conversions and the manifest'''
+        _set_asset_folder(folder)
+        clear()
+
+
+
+if __name__ == '__main__':
+    # use the module instead of this __main__ copy of it, so the worker processes can find the functions
+    from ursina import conversion_cache
+    make_command_line_app(conversion_cache.ConversionCacheCommands)
@@ -237,11 +237,21 @@ def combine(curve_a, curve_b, split_at):
             return curve_a(t / split_at)
         else:
             return curve_b(min((t / (1-split_at)) - split_at, 1))
+
+    def _new_curve_func_array(t):
+        import numpy as np
+        a, b = vectorize(curve_a), vectorize(curve_b)
+        return np.where(t < split_at, a(np.minimum(t / split_at, 1)), b(np.minimum((t / (1-split_at)) - split_at, 1)))
+    _new_curve_func.array_version = _new_curve_func_array
     return _new_curve_func
 
 def reverse(curve_function):
     def _new_curve_func(t):
         return curve_function(1-t)
+
+    def _new_curve_func_array(t):
+        return vectorize(curve_function)(1-t)
+    _new_curve_func.array_version = _new_curve_func_array
     return _new_curve_func
 
 
@@ -261,6 +271,179 @@ for e in dir(sys.modules[__name__]):
         '''))
 
 
+# array versions of the curves, so a whole batch of t values can be evaluated at once with numpy. get them with vectorize(curve_function).
+def vectorize(curve_function):
+    if isinstance(curve_function, CubicBezier):
+        return curve_function.calculate_array
+    if hasattr(curve_function, 'array_version'):
+        return curve_function.array_version
+
+    import numpy as np  # custom curves without an array version still work, but aren't faster than calling them one by one.
+    return np.vectorize(curve_function, otypes=[float])
+
+
+def _array_version_of(curve_function):
+    def decorator(array_function):
+        curve_function.array_version = array_function
+        return array_function
+    return decorator
+
+
+# these only use arithmetic, so they work on arrays as they are
+for _curve_function in (linear, in_quad, out_quad, in_cubic, out_cubic, in_quart, out_quart, in_quint, out_quint, in_expo, out_expo, in_back, out_back):
+    _curve_function.array_version = _curve_function
+
+
+@_array_version_of(in_sine)
+def _in_sine_array(t):
+    import numpy as np
+    return -1 * np.cos(t * (pi / 2)) + 1
+
+@_array_version_of(out_sine)
+def _out_sine_array(t):
+    import numpy as np
+    return np.sin(t * (pi / 2))
+
+@_array_version_of(in_out_sine)
+def _in_out_sine_array(t):
+    import numpy as np
+    return -.5 * (np.cos(pi * t) - 1)
+
+
+@_array_version_of(in_out_quad)
+def _in_out_quad_array(t):
+    import numpy as np
+    return np.where(t < .5, 2 * t * t, -1 + (4 - 2 * t) * t)
+
+@_array_version_of(in_out_cubic)
+def _in_out_cubic_array(t):
+    import numpy as np
+    return np.where(t < .5, 4 * t * t * t, (t - 1) * (2 * t - 2) * (2 * t - 2) + 1)
+
+@_array_version_of(in_out_quart)
+def _in_out_quart_array(t):
+    import numpy as np
+    t1 = t - 1
+    return np.where(t < .5, 8 * t * t * t * t, 1 - 8 * t1 * t1 * t1 * t1)
+
+@_array_version_of(in_out_quint)
+def _in_out_quint_array(t):
+    import numpy as np
+    t1 = t - 1
+    return np.where(t < .5, 16 * t * t * t * t * t, 1 + 16 * t1 * t1 * t1 * t1 * t1)
+
+
+@_array_version_of(in_out_expo)
+def _in_out_expo_array(t):
+    import numpy as np
+    scaledTime1 = t * 2 - 1
+    return np.where(scaledTime1 < 0, .5 * np.power(2, 10 * scaledTime1), .5 * (-np.power(2, -10 * scaledTime1) + 2))
+
+
+@_array_version_of(in_circ)
+def _in_circ_array(t):
+    import numpy as np
+    return -1 * (np.sqrt(1 - t * t) - 1)
+
+@_array_version_of(out_circ)
+def _out_circ_array(t):
+    import numpy as np
+    t1 = t - 1
+    return np.sqrt(1 - t1 * t1)
+
+@_array_version_of(in_out_circ)
+def _in_out_circ_array(t):
+    import numpy as np
+    scaledTime = t * 2
+    scaledTime1 = scaledTime - 2
+    return np.where(scaledTime < 1,
+        -.5 * (np.sqrt(np.maximum(1 - scaledTime * scaledTime, 0)) - 1),
+        .5 * (np.sqrt(np.maximum(1 - scaledTime1 * scaledTime1, 0)) + 1))
+
+
+@_array_version_of(in_out_back)
+def _in_out_back_array(t, magnitude=1.70158):
+    import numpy as np
+    scaledTime = t * 2
+    scaledTime2 = scaledTime - 2
+    s = magnitude * 1.525
+    return np.where(scaledTime < 1,
+        .5 * scaledTime * scaledTime * (((s + 1) * scaledTime) - s),
+        .5 * (scaledTime2 * scaledTime2 * ((s + 1) * scaledTime2 + s) + 2))
+
+
+@_array_version_of(in_elastic)
+def _in_elastic_array(t, magnitude=.7):
+    import numpy as np
+    scaledTime1 = t - 1
+    p = 1 - magnitude
+    s = p / (2 * pi) * asin(1)
+    return np.where((t == 0) | (t == 1), t, -(np.power(2, 10 * scaledTime1) * np.sin((scaledTime1 - s) * (2 * pi) / p)))
+
+@_array_version_of(out_elastic)
+def _out_elastic_array(t, magnitude=.7):
+    import numpy as np
+    p = 1 - magnitude
+    scaledTime = t * 2
+    s = p / (2 * pi) * asin(1)
+    return np.where((t == 0) | (t == 1), t, (np.power(2, -10 * scaledTime) * np.sin((scaledTime - s) * (2 * pi) / p)) + 1)
+
+@_array_version_of(in_out_elastic)
+def _in_out_elastic_array(t, magnitude=0.65):
+    import numpy as np
+    p = 1 - magnitude
+    scaledTime1 = t * 2 - 1
+    s = p / (2 * pi) * asin(1)
+    wave = np.sin((scaledTime1 - s) * (2 * pi) / p)
+    value = np.where(scaledTime1 < 0, -.5 * (np.power(2, 10 * scaledTime1) * wave), (np.power(2, -10 * scaledTime1) * wave * .5) + 1)
+    return np.where((t == 0) | (t == 1), t, value)
+
+
+@_array_version_of(out_bounce)
+def _out_bounce_array(t):
+    import numpy as np
+    offset = np.select(
+        (t < 1 / 2.75, t < 2 / 2.75, t < 2.5 / 2.75),
+        (0, 1.5 / 2.75, 2.25 / 2.75),
+        2.625 / 2.75)
+    add = np.select(
+        (t < 1 / 2.75, t < 2 / 2.75, t < 2.5 / 2.75),
+        (0, .75, 0.9375),
+        0.984375)
+    scaledTime2 = t - offset
+    return (7.5625 * scaledTime2 * scaledTime2) + add
+
+@_array_version_of(in_bounce)
+def _in_bounce_array(t):
+    return 1 - _out_bounce_array(1 - t)
+
+@_array_version_of(in_out_bounce)
+def _in_out_bounce_array(t):
+    import numpy as np
+    return np.where(t < .5, _in_bounce_array(t * 2) * .5, (_out_bounce_array((t * 2) - 1) * .5) + .5)
+
+
+@_array_version_of(zero)
+def _zero_array(t):
+    import numpy as np
+    return np.zeros_like(t, dtype=float)
+
+@_array_version_of(one)
+def _one_array(t):
+    import numpy as np
+    return np.ones_like(t, dtype=float)
+
+
+for _name in [e for e in dir(sys.modules[__name__]) if e.endswith('_boomerang')]:
+    exec(dedent(f'''
+        def _{_name}_array(t):
+            import numpy as np
+            f = vectorize({_name.removesuffix('_boomerang')})
+            return np.where(t < .5, f(np.minimum(t*2, 1)), f(np.minimum(1-((t-.5)*2), 1)))   # both sides get evaluated, so keep them in range
+        {_name}.array_version = _{_name}_array
+    '''))
+
+
 class CubicBezier:
     __slots__ = ['a', 'b', 'c', 'd', 'cx', 'bx', 'ax', 'cy', 'by', 'ay']
 
@@ -335,6 +518,28 @@ class CubicBezier:
         # Give up
         return t2
 
+    def calculate_array(self, x, epsilon=.0001):  # calculate for a numpy array of x values at once
+        return self.sample_curve_y(self.solve_curve_x_array(x, epsilon))
+
+    def solve_curve_x_array(self, t, epsilon=.0001):
+        # same bi-section as solve_curve_x, but for every value at once. stops updating each value once it's close enough.
+        import numpy as np
+        t = np.asarray(t, dtype=float)
+        t0 = np.zeros_like(t)
+        t1 = np.ones_like(t)
+        t2 = np.clip(t, 0, 1)
+
+        for _i in range(32):
+            x2 = self.sample_curve_x(t2)
+            not_done = np.abs(x2 - t) >= epsilon
+            if not not_done.any():
+                break
+            t0 = np.where(not_done & (t > x2), t2, t0)
+            t1 = np.where(not_done & (t <= x2), t2, t1)
+            t2 = np.where(not_done, (t1 - t0) * .5 + t0, t2)
+
+        return t2
+
 
 if __name__ == '__main__':
     '''Draws a sheet with every curve and its name'''
@@ -42,6 +42,9 @@ def _destroy(entity, force_destroy=False):
     if entity.collider and hasattr(entity.collider, 'remove'):
         entity.collider.remove()
 
+    if hasattr(entity, '_release_cached_assets'):
+        entity._release_cached_assets()
+
     if hasattr(entity, 'clip') and hasattr(entity, 'stop'): # stop audio
         entity.stop(False)
 
@@ -49,10 +52,13 @@ def _destroy(entity, force_destroy=False):
         entity.on_destroy()
 
     if entity in scene.entities:
-        scene._entities_marked_for_removal.append(entity)
+        scene._entities_marked_for_removal.add(entity)
+    scene._remove_from_dispatch(entity)
 
     if entity in scene.collidables:
         scene.collidables.remove(entity)
+    if scene.collision_grid is not None:
+        scene.collision_grid.remove(entity)
 
     if hasattr(entity, '_parent') and entity._parent and hasattr(entity._parent, '_children') and entity in entity._parent._children:
         entity._parent._children.remove(entity)
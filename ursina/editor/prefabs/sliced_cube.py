@@ -10,7 +10,7 @@ def stretch_model(mesh, scale, limit=.25, scale_multiplier=1, regenerate=False):
             if v[j] <= -limit:
                 verts[i][j] += .5 + (scale_multiplier/2)
                 verts[i][j] -= scale[j] / 2
-                if mesh.uvs:
+                if mesh.uvs is not None and len(mesh.uvs):
                     mesh.uvs[i][0] += .5 + (scale_multiplier/2)
 
             elif v[j] >= limit:
@@ -1,3 +1,4 @@
+from copy import copy
 from pathlib import Path
 from textwrap import dedent
 from typing import Literal
@@ -6,22 +7,22 @@ from panda3d.core import CullFaceAttrib, MovieTexture, NodePath, Quat, TextureSt
 from panda3d.core import Shader as Panda3dShader
 
 import ursina
-from ursina import application, color, curve, shader
+from ursina import application, color, curve, mesh_importer, shader, texture_importer
 from ursina.collider import BoxCollider, CapsuleCollider, Collider, MeshCollider, SphereCollider
 from ursina.color import Color
 from ursina.mesh import Mesh
-from ursina.mesh_importer import load_model
+from ursina.mesh_importer import load_model, load_model_async
 from ursina.models.procedural.nine_slice import NineSlice
 from ursina.models.procedural.quad import Quad
 from ursina.scene import instance as scene
 from ursina.scripts.every_decorator import every, get_class_name
-from ursina.sequence import Func, Sequence, Wait
+from ursina.sequence import Func, Sequence, Tween, Wait
 from ursina.shader import Shader
 from ursina.shaders.unlit_shader import unlit_shader
 from ursina.shaders.unlit_with_fog_shader import unlit_with_fog_shader
 from ursina.string_utilities import print_warning
 from ursina.texture import Texture
-from ursina.texture_importer import load_texture
+from ursina.texture_importer import load_texture, load_texture_async
 from ursina.ursinamath import Bounds, lerp
 from ursina.ursinastuff import Default, PostInitCaller, after
 from ursina.vec2 import Vec2
@@ -41,6 +42,12 @@ class Entity(NodePath, metaclass=PostInitCaller):
     default_shader = unlit_with_fog_shader
     ignore_paused = False
     strict = False
+    _model_cache_key = None     # the names the model and texture were loaded with, if they came from load_model/load_texture
+    _texture_cache_key = None
+    async_load = False          # if True, models and textures set by name load in the background. a placeholder is shown until the model is done.
+    async_placeholder_model = 'wireframe_cube'
+    _pending_model = None
+    _pending_texture = None
     default_values = {
         'parent':scene,
         'name':'entity', 'enabled':True, 'eternal':False, 'position':Vec3(0,0,0), 'rotation':Vec3(0,0,0), 'scale':Vec3(1,1,1), 'model':None, 'origin':Vec3(0,0,0),
@@ -64,6 +71,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
         ignore_paused=Default,
         eternal=False,
         name='',
+        async_load=Default,
         **kwargs
         ):
         self._children = []
@@ -94,6 +102,8 @@ class Entity(NodePath, metaclass=PostInitCaller):
         #         default_shader = unlit_shader
         self.shader = shader if shader is not Default else __class__.default_shader
 
+        if async_load is not Default:
+            self.async_load = async_load    # set before model and texture, so they can load in the background
         self.model = model
         if origin != __class__.default_values['origin']: self.origin = origin
         for key in ('origin_x', 'origin_y', 'origin_z'):
@@ -110,7 +120,10 @@ class Entity(NodePath, metaclass=PostInitCaller):
         self.collider = collider
 
         for key, value in kwargs.items():
-            if Entity.strict and key not in self.attributes + ('input', 'update', 'x', 'y', 'z', 'rotation_x', 'rotation_y', 'rotation_z', 'scale_x', 'scale_y', 'scale_z', 'ignore', 'unlit', 'visible_self', 'alpha', 'wireframe', 'world_parent', 'loose_parent', 'highlight_color', 'shader_input', 'tileset_size', 'tile_coordinate', 'on_click'):
+            if Entity.strict and key not in self.attributes + (
+                'input', 'update', 'input_keys', 'x', 'y', 'z', 'rotation_x', 'rotation_y', 'rotation_z', 'scale_x', 'scale_y', 'scale_z',
+                'ignore', 'unlit', 'visible_self', 'alpha', 'wireframe', 'world_parent', 'loose_parent', 'highlight_color', 'shader_input',
+                'tileset_size', 'tile_coordinate', 'on_click'):
                 raise Exception(f'Invalid input to Entity: {key}')
             setattr(self, key, value)
 
@@ -151,7 +164,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
 
     def __post_init__(self):
         if self.add_to_scene_entities:
-            scene.entities.append(self)
+            scene._add_entity(self)
 
         if self.enabled and hasattr(self, 'on_enable'):
             self.on_enable()
@@ -194,6 +207,8 @@ class Entity(NodePath, metaclass=PostInitCaller):
     def enabled_setter(self, value):    # disabled entities will not be visible nor run code.
         original_value = self.enabled
         self._enabled = value
+        self._invalidate_effective_enabled()
+        scene._refresh_dispatch(self)
 
         if value and not original_value and hasattr(self, 'on_enable'):
             self.on_enable()
@@ -212,8 +227,114 @@ class Entity(NodePath, metaclass=PostInitCaller):
             loose_child.enabled = value
 
 
+    def effective_enabled_getter(self):     # False if this entity or any of its ancestors are disabled. cached until .enabled or .parent changes on this entity or an ancestor.
+        value = getattr(self, '_effective_enabled', None)
+        if value is not None:
+            return value
+
+        parent = getattr(self, '_parent', None)
+        cache = True
+        if not self.enabled:
+            value = False
+        elif isinstance(parent, Entity):
+            value = parent.effective_enabled
+            cache = getattr(parent, '_effective_enabled', None) is not None
+        elif parent is scene or parent is None:
+            value = True
+        else:   # parented to a regular NodePath, like camera.ui or a kinematic PhysicsEntity. only cache it if there's no Entity above that could get disabled without us knowing.
+            value = self.get_stashed_ancestor().is_empty()
+            cache = parent.find_net_python_tag('Entity').is_empty()
+
+        if cache:
+            self._effective_enabled = value
+        return value
+
+    def _invalidate_effective_enabled(self):
+        stack = [self, ]
+        while stack:
+            e = stack.pop()
+            if getattr(e, '_effective_enabled', None) is None:    # not cached, so none of the descendants can be either
+                continue
+            e._effective_enabled = None
+            stack.extend(getattr(e, '_children', ()))
+
+    def _transform_changed(self, reparented=False):    # lets scene.collision_grid know the colliders on this entity or its descendants might have moved
+        grid = scene._collision_grid
+        if grid is not None:
+            grid.moved(self, reparented)
+
+    def _swap_cached_asset(self, cache, old_key, new_key):   # keeps the reference counts in imported_meshes/imported_textures up to date, so assets in use don't get dropped
+        if new_key == old_key:
+            return old_key
+        if new_key is not None and not cache.acquire(new_key):
+            new_key = None
+        if old_key is not None:
+            cache.release(old_key)
+        return new_key
+
+    def _on_async_load(self, future, pending_attr, attr, name):   # called on the main thread when a model or texture from async_load is done
+        if getattr(self, pending_attr) != name or self.is_empty():    # replaced or destroyed while loading
+            return
+        setattr(self, pending_attr, None)
+        if future.exception() is not None:
+            print_warning(f"failed to load {attr}: '{name}'", future.exception())
+            return
+        if future.result() is None:
+            if getattr(application, f'raise_exception_on_missing_{attr}'):
+                raise ValueError(f"missing {attr}: '{name}'")
+            print_warning(f"missing {attr}: '{name}'")
+            return
+        async_load, self.async_load = self.async_load, False    # it's in the cache now, so this is quick
+        setattr(self, attr, name)
+        self.async_load = async_load
+
+    def _release_cached_assets(self):
+        self._model_cache_key = self._swap_cached_asset(mesh_importer.imported_meshes, self._model_cache_key, None)
+        self._texture_cache_key = self._swap_cached_asset(texture_importer.imported_textures, self._texture_cache_key, None)
+
+
+    def update_getter(self):
+        try:
+            return self._update
+        except AttributeError:
+            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute 'update'") from None
+
+    def update_setter(self, value):     # assigning update after creation, like e.update = some_function, registers the entity for updating.
+        self._update = value
+        scene._refresh_dispatch(self)
+
+    def update_deleter(self):
+        del self._update
+        scene._refresh_dispatch(self)
+
+    def input_getter(self):
+        try:
+            return self._input
+        except AttributeError:
+            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute 'input'") from None
+
+    def input_setter(self, value):      # assigning input after creation, like e.input = some_function, registers the entity for input.
+        self._input = value
+        scene._refresh_dispatch(self)
+
+    def input_deleter(self):
+        del self._input
+        scene._refresh_dispatch(self)
+
+    def input_keys_getter(self):
+        return getattr(self, '_input_keys', None)
+
+    def input_keys_setter(self, value):  # only send these keys to input() and the scripts' input(), for example input_keys={'space', 'left mouse down'}. None means all keys.
+        if isinstance(value, str):
+            value = (value, )
+        self._input_keys = frozenset(value) if value is not None else None
+        scene._refresh_dispatch(self)
+
+
 
     def model_setter(self, value):  # set model with model='model_name' (without file type extension)
+        if value is not getattr(self, '_model', None):
+            self._pending_model = None  # a newer model was set, so ignore the one still loading
         if value == '':
             value = None
         if value is None:
@@ -221,6 +342,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
                 self.model.removeNode()
                 # print('removed model')
             self._model = value
+            self._model_cache_key = self._swap_cached_asset(mesh_importer.imported_meshes, self._model_cache_key, None)
             return
 
         # if isinstance(value, Mesh) and value.mode == MeshModes.point:
@@ -230,6 +352,13 @@ class Entity(NodePath, metaclass=PostInitCaller):
         #     self.set_shader_input('thickness', value.thickness)
 
 
+        if isinstance(value, str) and self.async_load and value.split('.')[0] not in mesh_importer.imported_meshes:
+            # load in the background and show a placeholder until it's done
+            name = value
+            self._pending_model = name
+            load_model_async(name).add_done_callback(lambda future: self._on_async_load(future, '_pending_model', 'model', name))
+            value = copy(load_model(Entity.async_placeholder_model))   # a copy, since the first load_model() call returns the cached model itself
+
         if isinstance(value, NodePath): # pass procedural model
             if self.model and value != self.model:
                 self.model.detachNode()
@@ -257,6 +386,12 @@ class Entity(NodePath, metaclass=PostInitCaller):
         elif value is NineSlice:
             self._model = NineSlice(entity_scale=self.scale.xy, radius=getattr(self, 'radius', .1))
 
+        if isinstance(value, str):
+            cache_key = value.split('.')[0]     # load_model caches models by name, without the file type
+        else:
+            cache_key = self._model_cache_key if value is self._model else None
+        self._model_cache_key = self._swap_cached_asset(mesh_importer.imported_meshes, self._model_cache_key, cache_key)
+
         if self._model:
             self._model.reparentTo(self)
             self._model.setTransparency(TransparencyAttrib.M_dual)
@@ -330,11 +465,13 @@ class Entity(NodePath, metaclass=PostInitCaller):
             value._children.append(self)
 
         self._parent = value
+        self._invalidate_effective_enabled()
         if value is None:
             self.enabled = False
             return
         #     value = scene
         self.reparent_to(value)
+        self._transform_changed(reparented=True)
         self.enabled = self.enabled   # parenting will undo the .stash() done when setting .enabled to False, so reapply it here
 
 
@@ -363,8 +500,9 @@ class Entity(NodePath, metaclass=PostInitCaller):
             value._children.append(self)
 
         self.wrtReparentTo(value)
-        self.enabled = self._enabled   # parenting will undo the .stash() done when setting .enabled to False, so reapply it here
         self._parent = value
+        self._transform_changed(reparented=True)
+        self.enabled = self._enabled   # parenting will undo the .stash() done when setting .enabled to False, so reapply it here
 
 
     @property
@@ -460,15 +598,21 @@ class Entity(NodePath, metaclass=PostInitCaller):
         if not hasattr(self, 'collider') or not self.collider:
             if self in scene.collidables:
                 scene.collidables.remove(self)
+            if scene.collision_grid is not None:
+                scene.collision_grid.remove(self)
             return
 
         if value:
             self.collider.node_path.unstash()
             scene.collidables.add(self)
+            if scene.collision_grid is not None:
+                scene.collision_grid.add(self)
         else:
             self.collider.node_path.stash()
             if self in scene.collidables:
                 scene.collidables.remove(self)
+            if scene.collision_grid is not None:
+                scene.collision_grid.remove(self)
 
 
     def on_click_getter(self):
@@ -528,6 +672,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
             value = Vec3(*value, self.z)
 
         self.setPos(scene, Vec3(value[0], value[1], value[2]))
+        self._transform_changed()
 
     def world_x_getter(self):
         self._ensure_is_not_destroyed()
@@ -542,12 +687,15 @@ class Entity(NodePath, metaclass=PostInitCaller):
     def world_x_setter(self, value):
         self._ensure_is_not_destroyed()
         self.setX(scene, value)
+        self._transform_changed()
     def world_y_setter(self, value):
         self._ensure_is_not_destroyed()
         self.setY(scene, value)
+        self._transform_changed()
     def world_z_setter(self, value):
         self._ensure_is_not_destroyed()
         self.setZ(scene, value)
+        self._transform_changed()
 
     def position_getter(self):
         self._ensure_is_not_destroyed()
@@ -561,6 +709,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
             value = Vec3(*value, self.z)
 
         self.setPos(value[0], value[1], value[2])
+        self._transform_changed()
 
     def x_getter(self):
         self._ensure_is_not_destroyed()
@@ -568,6 +717,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
     def x_setter(self, value):
         self._ensure_is_not_destroyed()
         self.setX(value)
+        self._transform_changed()
 
     def y_getter(self):
         self._ensure_is_not_destroyed()
@@ -575,6 +725,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
     def y_setter(self, value):
         self._ensure_is_not_destroyed()
         self.setY(value)
+        self._transform_changed()
 
     def z_getter(self):
         self._ensure_is_not_destroyed()
@@ -582,6 +733,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
     def z_setter(self, value):
         self._ensure_is_not_destroyed()
         self.setZ(value)
+        self._transform_changed()
 
     @property
     def X(self):    # shortcut for int(entity.x)
@@ -601,6 +753,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
     def world_rotation_setter(self, value):
         self._ensure_is_not_destroyed()
         self.setHpr(scene, Vec3(value[1], value[0], value[2]) * Entity.rotation_directions)
+        self._transform_changed()
 
     def world_rotation_x_getter(self):
         self._ensure_is_not_destroyed()
@@ -639,6 +792,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
             value = Vec3(*value, self.rotation_z)
 
         self.setHpr(Vec3(value[1], value[0], value[2]) * Entity.rotation_directions)
+        self._transform_changed()
 
     def rotation_x_getter(self):
         self._ensure_is_not_destroyed()
@@ -667,6 +821,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
     def quaternion_setter(self, value):
         self._ensure_is_not_destroyed()
         self.set_quat(value)
+        self._transform_changed()
 
     def world_quaternion_getter(self):
         self._ensure_is_not_destroyed()
@@ -674,6 +829,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
     def world_quaternion_setter(self, value):
         self._ensure_is_not_destroyed()
         self.setQuat(scene, value)
+        self._transform_changed()
 
     def world_scale_getter(self):
         self._ensure_is_not_destroyed()
@@ -688,6 +844,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
 
         value = Vec3(*[e if e!=0 else .001 for e in value])
         self.setScale(scene, value)
+        self._transform_changed()
 
     def world_scale_x_getter(self):
         self._ensure_is_not_destroyed()
@@ -696,6 +853,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
         self._ensure_is_not_destroyed()
         value = value if value != 0 else .001 # prevent panda3d erroring when scale is 0
         self.setScale(scene, Vec3(value, self.world_scale_y, self.world_scale_z))
+        self._transform_changed()
 
     def world_scale_y_getter(self):
         self._ensure_is_not_destroyed()
@@ -704,6 +862,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
         self._ensure_is_not_destroyed()
         value = value if value != 0 else .001 # prevent panda3d erroring when scale is 0
         self.setScale(scene, Vec3(self.world_scale_x, value, self.world_scale_z))
+        self._transform_changed()
 
     def world_scale_z_getter(self):
         self._ensure_is_not_destroyed()
@@ -712,6 +871,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
         self._ensure_is_not_destroyed()
         value = value if value != 0 else .001 # prevent panda3d erroring when scale is 0
         self.setScale(scene, Vec3(self.world_scale_x, self.world_scale_y, value))
+        self._transform_changed()
 
     def scale_getter(self):
         self._ensure_is_not_destroyed()
@@ -727,6 +887,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
 
         value = [e if e!=0 else .001 for e in value]
         self.setScale(value[0], value[1], value[2])
+        self._transform_changed()
 
     def scale_x_getter(self):
         self._ensure_is_not_destroyed()
@@ -735,6 +896,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
         self._ensure_is_not_destroyed()
         value = value if value != 0 else .001 # prevent panda3d erroring when scale is 0
         self.setScale(value, self.scale_y, self.scale_z)
+        self._transform_changed()
 
     def scale_y_getter(self):
         self._ensure_is_not_destroyed()
@@ -743,6 +905,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
         self._ensure_is_not_destroyed()
         value = value if value != 0 else .001 # prevent panda3d erroring when scale is 0
         self.setScale(self.scale_x, value, self.scale_z)
+        self._transform_changed()
 
     def scale_z_getter(self):
         self._ensure_is_not_destroyed()
@@ -751,6 +914,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
         self._ensure_is_not_destroyed()
         value = value if value != 0 else .001 # prevent panda3d erroring when scale is 0
         self.setScale(self.scale_x, self.scale_y, value)
+        self._transform_changed()
 
     def transform_getter(self): # get/set position, rotation and scale
         self._ensure_is_not_destroyed()
@@ -805,11 +969,13 @@ class Entity(NodePath, metaclass=PostInitCaller):
 
         if value is None:
             self._shader = value
+            scene._refresh_dispatch(self)
             self.setShaderAuto()
             return
 
         if isinstance(value, Panda3dShader): # panda3d shader
             self._shader = value
+            scene._refresh_dispatch(self)
             self.setShader(value)
             return
 
@@ -822,6 +988,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
 
         if isinstance(value, Shader):
             self._shader = value
+            scene._refresh_dispatch(self)
             if not value.compiled:
                 value.compile()
 
@@ -880,13 +1047,23 @@ class Entity(NodePath, metaclass=PostInitCaller):
 
 
     def texture_setter(self, value):    # set model with texture='texture_name'. requires a model to be set beforehand.
+        if value is not getattr(self, '_texture', None):
+            self._pending_texture = None
+        if isinstance(value, str) and value and self.async_load and value not in texture_importer.imported_textures:
+            self._pending_texture = value
+            name = value
+            load_texture_async(name).add_done_callback(lambda future: self._on_async_load(future, '_pending_texture', 'texture', name))
+            value = None    # no texture until it's loaded
+
         if not value:
             # print('remove texture')
             self._texture = value
+            self._texture_cache_key = self._swap_cached_asset(texture_importer.imported_textures, self._texture_cache_key, None)
             if self.model:
                 self.model.clearTexture()
             return
 
+        cache_key = self._texture_cache_key if value is getattr(self, '_texture', None) else None
         if isinstance(value, str):
             texture_name = value
             value = load_texture(value)
@@ -897,6 +1074,8 @@ class Entity(NodePath, metaclass=PostInitCaller):
 
                 print_warning(f"missing texture: '{texture_name}'")
                 return
+            cache_key = texture_name
+        self._texture_cache_key = self._swap_cached_asset(texture_importer.imported_textures, self._texture_cache_key, cache_key)
 
         if self.model:
             self.model.setTextureOff(False)
@@ -1079,6 +1258,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
 
     def set_position(self, value, relative_to=scene): # set position relative to on other Entity. In most cases, use .position instead.
         self.setPos(relative_to, Vec3(value[0], value[1], value[2]))
+        self._transform_changed()
 
 
     def rotate(self, value, relative_to=None):  # rotate around local axis.
@@ -1086,6 +1266,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
             relative_to = self
 
         self.setHpr(relative_to, Vec3(value[1], value[0], value[2]) * Entity.rotation_directions)
+        self._transform_changed()
 
 
     def add_script(self, class_instance):
@@ -1093,6 +1274,7 @@ class Entity(NodePath, metaclass=PostInitCaller):
             class_instance.entity = self
             class_instance.enabled = True
             self.scripts.append(class_instance)
+            scene._refresh_dispatch(self)
             if hasattr(class_instance, 'on_script_added') and callable(class_instance.on_script_added):
                 class_instance.on_script_added()
             # print('added script:', camel_to_snake(name.__class__.__name__))
@@ -1300,8 +1482,8 @@ class Entity(NodePath, metaclass=PostInitCaller):
         return descendants
 
 
-    def has_disabled_ancestor(self):
-        return not self.get_stashed_ancestor().is_empty()
+    def has_disabled_ancestor(self):    # same as `not entity.effective_enabled`
+        return not self.effective_enabled
 
     def children_getter(self):
         return [e for e in getattr(self, '_children', []) if e]     # make sure list doesn't contain destroyed entities
@@ -1404,29 +1586,18 @@ class Entity(NodePath, metaclass=PostInitCaller):
         if hasattr(self, animator_name) and getattr(self, animator_name) in self.animations:
             self.animations.remove(getattr(self, animator_name))
 
-        sequence = Sequence(loop=loop, time_step=time_step, auto_destroy=auto_destroy, unscaled=unscaled, ignore_paused=ignore_paused, name=name)
-        sequence.append(Wait(delay))
-
-        setattr(self, animator_name, sequence)
-        self.animations.append(sequence)
-
-        if not resolution:
-            resolution = max(int(duration * 60), 1)
-
         # if no custom getattr and setattr functions are provided (for example  when using animate_shader_input), animate the entity's variable.
         if not getattr_function:
             getattr_function = self._getattr
         if not setattr_function:
             setattr_function = self._setattr
 
-        for i in range(resolution+1):
-            t = i / resolution
-            t = curve(t)
+        sequence = Tween(setattr_function, name, getattr_function(name), value, duration=duration, delay=delay, curve=curve, resolution=resolution, lerp_function=lerp_function,
+            loop=loop, time_step=time_step, auto_destroy=auto_destroy, unscaled=unscaled, ignore_paused=ignore_paused)
 
-            sequence.append(Wait(duration / resolution), regenerate=False)
-            sequence.append(Func(setattr_function, name, lerp_function(getattr_function(name), value, t)), regenerate=False)
+        setattr(self, animator_name, sequence)
+        self.animations.append(sequence)
 
-        sequence.generate()
         if auto_play:
             sequence.start()
         return sequence
@@ -1473,18 +1644,19 @@ class Entity(NodePath, metaclass=PostInitCaller):
         if hasattr(self, 'shake_sequence') and self.shake_sequence:
             getattr(self.shake_sequence, interrupt)()
 
-        self.shake_sequence = Sequence(Wait(delay))
         original_position = getattr(self, attr_name)
 
-        for _i in range(int(duration / speed)):
-            self.shake_sequence.append(Func(setattr, self, attr_name,
-                Vec3(
-                    original_position[0] + (random.uniform(-.1, .1) * magnitude * direction[0]),
-                    original_position[1] + (random.uniform(-.1, .1) * magnitude * direction[1]),
-                    original_position[2],
-                )))
-            self.shake_sequence.append(Wait(speed))
-            self.shake_sequence.append(Func(setattr, self, attr_name, original_position))
+        def _shake_offset(a, b, t):    # a new random offset for every step, then back to the original position at the end
+            if t >= 1:
+                return original_position
+            return Vec3(
+                original_position[0] + (random.uniform(-.1, .1) * magnitude * direction[0]),
+                original_position[1] + (random.uniform(-.1, .1) * magnitude * direction[1]),
+                original_position[2],
+                )
+
+        steps = max(int(duration / speed), 1)
+        self.shake_sequence = Tween(self._setattr, attr_name, original_position, original_position, duration=steps*speed, delay=delay, resolution=steps, lerp_function=_shake_offset)
 
         self.animations.append(self.shake_sequence)
         self.shake_sequence.unscaled = unscaled
@@ -1521,17 +1693,14 @@ class Entity(NodePath, metaclass=PostInitCaller):
 
 
 
-    def intersects(self, traverse_target=scene, ignore:list=None, debug=False):
-        if not ignore:
-            ignore = []
-        ignore = list(ignore)
-
+    def intersects(self, traverse_target=scene, ignore:list=None, debug=False, return_hit_only=False):    # with return_hit_only=True, returns a bool and stops at the first hit, instead of making a HitInfo
         if isinstance(self.collider, MeshCollider):
             raise Exception('''error: mesh colliders can't intersect other shapes, only primitive shapes can. Mesh colliders can "receive" collisions though.''')
 
-        from ursina.hit_info import HitInfo
-
         if not self.collision or not self.collider:
+            if return_hit_only:
+                return False
+            from ursina.hit_info import HitInfo
             self.hit = HitInfo(hit=False)
             return self.hit
 
@@ -1553,17 +1722,26 @@ class Entity(NodePath, metaclass=PostInitCaller):
         else:
             self._pickerNP.hide()
 
-        self._picker.traverse(traverse_target)
+        if return_hit_only:
+            return self._intersects_any(traverse_target, ignore if ignore else ())
+
+        from ursina.hit_info import HitInfo
+        ignore = list(ignore) if ignore else []
+        ignore.append(self)
 
-        if self._pq.get_num_entries() == 0:
+        if traverse_target is scene and scene.collision_grid is not None:   # only test the colliders near this one
+            bounds = scene.collision_grid.world_bounds(self)
+            candidates = scene.collision_grid.entities_in_box(*bounds) if bounds else ()
+            entries = scene.collision_grid.traverse(self._picker, self._pq, candidates, ignore, from_node_path=self._pickerNP)
+        else:
+            self._picker.traverse(traverse_target)
+            self._pq.sort_entries()
+            entries = self._pq.getEntries()
+
+        if len(entries) == 0:
             self.hit = HitInfo(hit=False)
             return self.hit
 
-        ignore.append(self)
-        ignore.extend(e for e in scene.entities if not e.collision)
-
-        self._pq.sort_entries()
-        entries = self._pq.getEntries()
         entities = [e.get_into_node_path().parent for e in entries]
 
         entries = [        # filter out ignored entities
@@ -1589,6 +1767,23 @@ class Entity(NodePath, metaclass=PostInitCaller):
 
         return hit_info
 
+    def _intersects_any(self, traverse_target, ignore):    # intersects(return_hit_only=True). no sorting, and no lists or HitInfo to make.
+        grid = scene.collision_grid
+        if traverse_target is scene and grid is not None:
+            bounds = grid.world_bounds(self)
+            if not bounds:
+                return False
+            candidates = grid.entities_in_box(*bounds)
+            candidates.discard(self)
+            return len(grid.traverse(self._picker, self._pq, candidates, ignore, from_node_path=self._pickerNP, first_only=True)) > 0
+
+        self._picker.traverse(traverse_target)
+        for i in range(self._pq.get_num_entries()):
+            entity = self._pq.get_entry(i).get_into_node_path().parent
+            if entity in scene.collidables and entity != self and entity not in ignore:
+                return True
+        return False
+
 if __name__ == '__main__':
     from ursina import *
     app = Ursina()
@@ -0,0 +1,141 @@
+from math import inf
+
+from panda3d.core import BoundingSphere, CollisionHandlerQueue, CollisionTraverser, Point3
+
+from ursina.entity import Entity
+from ursina.scene import instance as scene
+
+
+class IntersectionPool(Entity):
+    '''
+    Checks many entities against the scene once per frame, instead of each of them calling .intersects() in their update().
+    Add entities with .add(entity), then read .hits[entity], the entities it intersected during the last update,
+    or use .intersects(entity) to get a bool.
+
+    The entities' own colliders are used, so they need to have one, with .collision on. Like with .intersects(),
+    mesh colliders can only be hit, not check for hits.
+    '''
+    def __init__(self, entities=(), traverse_target=scene, **kwargs):
+        super().__init__(**kwargs)
+        self.traverse_target = traverse_target
+        self.traverser = CollisionTraverser()
+        self.queue = CollisionHandlerQueue()
+        self.hits = dict()  # entity -> list of entities it intersected. the lists get reused, so copy them if you want to keep them around.
+        for entity in entities:
+            self.add(entity)
+
+
+    def add(self, entity):
+        if entity not in self.hits:
+            self.hits[entity] = []
+
+    def remove(self, entity):
+        self.hits.pop(entity, None)
+
+    def intersects(self, entity):
+        return bool(self.hits.get(entity))
+
+
+    def update(self):
+        entities = []
+        destroyed = []
+        for entity, hits in self.hits.items():
+            hits.clear()
+            if entity.is_empty():
+                destroyed.append(entity)
+            elif entity.collision and entity.collider and entity.effective_enabled:
+                entities.append(entity)
+
+        for entity in destroyed:
+            del self.hits[entity]
+
+        grid = scene.collision_grid
+        if self.traverse_target is not scene or grid is None:
+            # one traversal with all the entities as colliders
+            for entity in entities:
+                self.traverser.add_collider(entity.collider.node_path, self.queue)
+            self.traverser.traverse(self.traverse_target)
+            self.traverser.clear_colliders()
+            self._add_hits()
+            return
+
+        # group the entities by the candidates near them, then traverse each candidate once with all of its entities.
+        # the traversal starts at the candidate, so do the bounding volume check panda would normally do before testing the solids.
+        entities_per_candidate = dict()
+        spheres = grid.spheres
+        for entity in entities:
+            volume = grid.world_volume(entity)
+            if volume is None:
+                continue
+            if volume is inf:
+                bounds = ((-inf, -inf, -inf), (inf, inf, inf))
+                from_sphere = None
+            else:
+                bounds = (volume.get_min(), volume.get_max())
+                from_sphere = (*volume.get_center(), volume.get_radius()) if isinstance(volume, BoundingSphere) else None
+
+            for candidate in grid.entities_in_box(*bounds):
+                if candidate is entity:
+                    continue
+                sphere = spheres.get(candidate)
+                if sphere is not None and volume is not inf:
+                    if from_sphere is not None:
+                        x, y, z = sphere[0]-from_sphere[0], sphere[1]-from_sphere[1], sphere[2]-from_sphere[2]
+                        if x*x + y*y + z*z > (sphere[3]+from_sphere[3]) ** 2:
+                            continue
+                    elif not volume.contains(BoundingSphere(Point3(sphere[0], sphere[1], sphere[2]), sphere[3])):
+                        continue
+
+                if candidate in entities_per_candidate:
+                    entities_per_candidate[candidate].append(entity)
+                else:
+                    entities_per_candidate[candidate] = [entity, ]
+
+        for candidate, candidate_entities in entities_per_candidate.items():
+            if not candidate.effective_enabled:
+                continue
+            node_path = getattr(candidate.collider, 'node_path', None)
+            if node_path is None or node_path.is_empty():
+                continue
+
+            for entity in candidate_entities:
+                self.traverser.add_collider(entity.collider.node_path, self.queue)
+            self.traverser.traverse(node_path)
+            self.traverser.clear_colliders()
+            self._add_hits(candidate)
+
+
+    def _add_hits(self, candidate=None):
+        for entry in self.queue.get_entries():
+            hit = candidate
+            if hit is None:
+                into = entry.get_into_node_path().parent
+                if into not in scene.collidables:
+                    continue
+                hit = into.getPythonTag('Entity')
+
+            entity = entry.get_from_node_path().parent.getPythonTag('Entity')
+            hits = self.hits.get(entity)
+            if hits is not None and hit is not entity and hit not in hits:
+                hits.append(hit)
+
+
+
+if __name__ == '__main__':
+    import random
+
+    from ursina import EditorCamera, Ursina, color, time
+    app = Ursina()
+
+    walls = [Entity(model='cube', collider='box', position=(random.uniform(-20,20), 0, random.uniform(-20,20)), scale=(1,2,4), color=color.gray) for i in range(100)]
+    movers = [Entity(model='sphere', collider='sphere', position=(random.uniform(-20,20), 0, random.uniform(-20,20)), color=color.azure) for i in range(200)]
+    pool = IntersectionPool(entities=movers)
+
+    def update():
+        for i, e in enumerate(movers):
+            e.x += ((i % 3) - 1) * time.dt * 2
+            e.z += ((i % 5) - 2) * time.dt
+            e.color = color.red if pool.intersects(e) else color.azure
+
+    EditorCamera(rotation_x=60)
+    app.run()
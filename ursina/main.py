@@ -13,6 +13,8 @@ from ursina.camera import instance as camera
 from ursina.mouse import instance as mouse
 from ursina import entity
 from ursina import shader
+from ursina import async_loading
+from ursina.sequence import sequence_scheduler
 from ursina.audio import _audio_manager
 
 
@@ -182,26 +184,28 @@ class Ursina(ShowBase):
             time.dt_unscaled = globalClock.getDt()
             time.dt = time.dt_unscaled * application.time_scale          # time between frames
         mouse.update()
+        async_loading.run_main_thread_tasks()   # finish loads from load_model_async/load_texture_async
 
         if hasattr(__main__, 'update') and __main__.update and not application.paused:
             __main__.update()
 
-        for seq in application.sequences:
-            seq.update()
+        sequence_scheduler.update()
 
         if scene._entities_marked_for_removal:
-            scene.entities = [e for e in scene.entities if e not in scene._entities_marked_for_removal]
+            scene.entities.difference_update(scene._entities_marked_for_removal)
             scene._entities_marked_for_removal.clear()
 
-        for e in scene.entities:
-            if e in scene._entities_marked_for_removal:
+        # only visit entities with an update function or scripts, instead of all of scene.entities. see Scene._refresh_dispatch()
+        if scene._dispatch_needs_sorting:
+            scene._sort_dispatch()
+
+        for e in tuple(scene._updaters):
+            if e not in scene._updaters:    # destroyed or disabled earlier this frame
                 continue
-            if not e.enabled or e.ignore:
+            if not e.effective_enabled or e.ignore:
                 continue
             if application.paused and e.ignore_paused is False:
                 continue
-            if e.has_disabled_ancestor():
-                continue
 
             if hasattr(e, 'update') and callable(e.update):
                 e.update()
@@ -212,12 +216,18 @@ class Ursina(ShowBase):
                 for script in e.scripts:
                     if script.enabled and hasattr(script, 'update') and callable(script.update):
                         script.update()
-            if not e:
-                continue
 
-            if e.shader and hasattr(e.shader, "continuous_input"):
-                for key, value in e.shader.continuous_input.items():
-                    e.set_shader_input(key, value())
+        for _shader, entities in scene._shader_users.items():
+            if not _shader.continuous_input:
+                continue
+            values = {key: value() for key, value in _shader.continuous_input.items()}
+            for e in entities:
+                if not e.effective_enabled or e.ignore:
+                    continue
+                if application.paused and e.ignore_paused is False:
+                    continue
+                for key, value in values.items():
+                    e.set_shader_input(key, value)
 
         _audio_manager.update()
 
@@ -283,19 +293,23 @@ class Ursina(ShowBase):
         break_outer = False
 
 
-        for e in scene.entities:
-            if e.enabled is False or e.ignore or e.ignore_input:
+        # only visit entities with an input function or scripts, and skip the ones with input_keys that don't include any of these keys. see Scene._refresh_dispatch()
+        for e in scene._get_input_listeners(bound_keys):
+            if getattr(e, '_scene_index', None) is None:    # destroyed by an earlier input function
                 continue
-            if application.paused and e.ignore_paused is False:
+            if not e.effective_enabled or e.ignore or e.ignore_input:
                 continue
-            if e.has_disabled_ancestor():
+            if application.paused and e.ignore_paused is False:
                 continue
 
             if break_outer:
                 break
 
+            input_keys = getattr(e, 'input_keys', None)
+            keys = bound_keys if input_keys is None else [key for key in bound_keys if key in input_keys]
+
             if hasattr(e, 'input') and callable(e.input):
-                for key in bound_keys:
+                for key in keys:
                     if break_outer:
                         break
                     if e.input(key):    # if the input function returns True, eat the input
@@ -311,7 +325,7 @@ class Ursina(ShowBase):
                         break
 
                     if script.enabled and hasattr(script, 'input') and callable(script.input):
-                        for key in bound_keys:
+                        for key in keys:
                             if script.input(key): # if the input function returns True, eat the input
                                 break_outer = True
                                 break
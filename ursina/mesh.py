@@ -3,6 +3,7 @@ from enum import Enum
 from textwrap import dedent
 import numbers
 import array
+from itertools import chain
 
 from ursina import application
 from ursina import color
@@ -41,6 +42,35 @@ class MeshModes(Enum):
 
 
 
+def _is_array(data):   # numpy arrays can be used for vertices, triangles, colors, uvs and normals. checked without importing numpy.
+    return hasattr(data, '__array_interface__')
+
+def _as_rows(data, width=None):     # numpy arrays to lists of rows, for serializing
+    if not _is_array(data):
+        return data
+    if width and data.ndim == 1:
+        data = data.reshape(-1, width)
+    return data.tolist()
+
+def _copy_array_or_list(data):
+    if _is_array(data):
+        return data.copy()
+    return list(data)
+
+def _concatenate(a, b, width=None):    # for adding meshes, where either of them can use numpy arrays
+    a, b = (e if e is not None else [] for e in (a, b))
+    if not _is_array(a) and not _is_array(b):
+        return list(a) + list(b)
+    import numpy as np
+    dtype = (a if _is_array(a) else b).dtype
+    a, b = np.asarray(a, dtype=dtype), np.asarray(b, dtype=dtype)
+    if width:
+        a, b = a.reshape(-1, width), b.reshape(-1, width)
+    elif a.ndim != b.ndim:
+        a, b = a.reshape(-1), b.reshape(-1)
+    return np.concatenate((a, b))
+
+
 class Mesh(p3d.NodePath):
     _modes = {
         'triangle' : p3d.GeomTriangles,
@@ -66,6 +96,8 @@ class Mesh(p3d.NodePath):
         self.vertex_buffer_format = vertex_buffer_format
 
         self._generated_vertices = None
+        self._array_indices = dict()    # which GeomVertexData array each of vertices, colors, uvs and normals was written to, for updating them in place.
+        self._row_count = 0
 
         for var in (('vertices', vertices), ('triangles', triangles), ('colors', colors), ('uvs', uvs), ('normals', normals)):
             name, value = var
@@ -85,12 +117,23 @@ class Mesh(p3d.NodePath):
         return data
 
 
+    @staticmethod
+    def _as_buffer(data, dtype_string='f'):  # get the data as a flat buffer of floats ('f') or uint32 ('I'), without copying it if it's already that.
+        if _is_array(data):
+            import numpy as np
+            return np.ascontiguousarray(data, dtype=np.float32 if dtype_string == 'f' else np.uint32).reshape(-1)
+
+        if isinstance(data, array.array) and data.typecode == dtype_string:
+            return data
+
+        if len(data) > 0 and not isinstance(data[0], numbers.Real):    # list of Vec3, tuples and so on
+            return array.array(dtype_string, chain.from_iterable(data))
+
+        return array.array(dtype_string, data)
+
+
     def _set_array_data(self, array_handle, data, dtype_string='f'):
-        a = None
-        try:
-            a = memoryview(data).cast('B').cast(dtype_string)
-        except:
-            a = array.array(dtype_string, data)
+        a = memoryview(self._as_buffer(data, dtype_string)).cast('B').cast(dtype_string)
 
         vmem = memoryview(array_handle).cast('B').cast(dtype_string)
         try:
@@ -100,6 +143,8 @@ class Mesh(p3d.NodePath):
 
     def generate(self): # Must be called after a mesh's values has been updated in order to update visually
         self._generated_vertices = None
+        self._array_indices = dict()
+        self._row_count = 0
 
         if hasattr(self, 'geomNode'):
             self.geomNode.removeAllGeoms()
@@ -181,16 +226,22 @@ class Mesh(p3d.NodePath):
             else:
                 vdata.unclean_set_num_rows(len(self.vertices))
 
-            self._set_array_data(vdata.modify_array(0), self._ravel(self.vertices), 'f')
+            self._set_array_data(vdata.modify_array(0), self.vertices, 'f')
+            self._array_indices['vertices'] = 0
 
             if self.colors is not None and len(self.colors) > 0:
-                self._set_array_data(vdata.modify_array(color_attribute_index), self._ravel(self.colors), 'f')
+                self._set_array_data(vdata.modify_array(color_attribute_index), self.colors, 'f')
+                self._array_indices['colors'] = color_attribute_index
 
             if self.uvs is not None and len(self.uvs) > 0 and self.mode not in ['line', 'point']:
-                self._set_array_data(vdata.modify_array(uv_attribute_index), self._ravel(self.uvs), 'f')
+                self._set_array_data(vdata.modify_array(uv_attribute_index), self.uvs, 'f')
+                self._array_indices['uvs'] = uv_attribute_index
 
             if self.normals is not None and len(self.normals) > 0 and self.mode not in ['line', 'point']:
-                self._set_array_data(vdata.modify_array(normal_attribute_index), self._ravel(self.normals), 'f')
+                self._set_array_data(vdata.modify_array(normal_attribute_index), self.normals, 'f')
+                self._array_indices['normals'] = normal_attribute_index
+
+            self._row_count = vdata.get_num_rows()
 
         geom = p3d.Geom(vdata)
         self.geom = geom
@@ -203,15 +254,23 @@ class Mesh(p3d.NodePath):
             n = len(self.vertices)
             if isinstance(self.vertices[0], numbers.Real):
                 n = n // 3
-            triangles = [i for i in range(n)]
             parray.unclean_set_num_rows(n)
-            self._set_array_data(parray, triangles, 'I')
+            self._set_array_data(parray, array.array('I', range(n)), 'I')
 
             prim.close_primitive()
             geom.addPrimitive(prim)
 
+        elif _is_array(self.triangles) and self.triangles.ndim == 2 and self.triangles.shape[1] == 2:   # line segments as a numpy array, add them all at once
+            prim = p3d.GeomLines(static_mode)
+            prim.set_index_type(p3d.GeomEnums.NT_uint32)
+            parray = prim.modify_vertices()
+            parray.unclean_set_num_rows(self.triangles.size)
+            self._set_array_data(parray, self.triangles, 'I')
+            prim.close_primitive()
+            geom.addPrimitive(prim)
+
         else:
-            if not isinstance(self.triangles[0], numbers.Real): # triangles provided as [(0,1,2), (3,4,5,6), ...] etc., so unpack them
+            if not _is_array(self.triangles) and not isinstance(self.triangles[0], numbers.Real): # triangles provided as [(0,1,2), (3,4,5,6), ...] etc., so unpack them
                 line_segments = []
                 indices = self.indices
                 for tup in self.triangles:
@@ -237,14 +296,18 @@ class Mesh(p3d.NodePath):
                     prim.close_primitive()
                     geom.addPrimitive(prim)
 
-            else:   # got triangles as [0,1,2,3,4,5], ie. flat
+            else:   # got triangles as [0,1,2,3,4,5], ie. flat, or as a numpy array
+                indices = self.triangles
+                if _is_array(indices) and indices.ndim == 2:
+                    indices = self.indices
+
                 prim = Mesh._modes[self.mode](static_mode)
                 prim.set_index_type(p3d.GeomEnums.NT_uint32)
 
                 parray = prim.modify_vertices()
 
-                parray.unclean_set_num_rows(len(self.triangles))
-                self._set_array_data(parray, self._ravel(self.triangles), 'I')
+                parray.unclean_set_num_rows(len(indices))
+                self._set_array_data(parray, indices, 'I')
 
                 prim.close_primitive()
                 geom.addPrimitive(prim)
@@ -256,12 +319,98 @@ class Mesh(p3d.NodePath):
             # self.setShaderAuto()
 
 
+    # Update part of the vertices, colors, uvs or normals without calling generate(). Writes the new rows straight into the existing vertex arrays,
+    # so the Geom and triangles are kept and the cost depends on how many rows changed. Works best with static=False.
+    # start can be an index or a slice. If the mesh doesn't have that array yet or the data doesn't fit, it falls back to generate().
+    # example: mesh.update_vertices(4, [Vec3(0,1,0), Vec3(1,1,0)])
+    def update_vertices(self, start, data):
+        self._update_rows('vertices', start, data)
+
+    def update_colors(self, start, data):
+        self._update_rows('colors', start, data)
+
+    def update_uvs(self, start, data):
+        self._update_rows('uvs', start, data)
+
+    def update_normals(self, start, data):
+        self._update_rows('normals', start, data)
+
+
+    _row_widths = {'vertices':3, 'colors':4, 'uvs':2, 'normals':3}
+
+    def _update_rows(self, name, start, data):
+        stop = None
+        if isinstance(start, slice):
+            if start.step not in (None, 1):
+                raise ValueError(f'update_{name}() only supports slices with a step of 1, not {start.step}')
+            start, stop = start.start or 0, start.stop
+
+        width = Mesh._row_widths[name]
+        buffer = self._as_buffer(data, 'f')
+        rows = len(buffer) // width
+        if stop is not None and stop - start != rows:
+            raise ValueError(f'update_{name}() got {rows} rows of data for the slice {start}:{stop}')
+        if rows == 0:
+            return
+
+        # keep the python side in sync
+        target = getattr(self, name)
+        if isinstance(target, tuple):   # can't be changed in place
+            target = list(target)
+            setattr(self, name, target)
+
+        if _is_array(target):
+            import numpy as np
+            target.reshape(-1, width)[start:start+rows] = np.asarray(buffer).reshape(rows, width)
+        elif len(target) > 0 and isinstance(target[0], numbers.Real):   # flat list
+            target[start*width : (start+rows)*width] = array.array(target.typecode, buffer) if isinstance(target, array.array) else buffer.tolist()
+        else:
+            new_rows = data.tolist() if _is_array(data) else list(data)
+            if len(new_rows) != rows:   # flat data for a list of rows
+                new_rows = [tuple(buffer[i*width : (i+1)*width].tolist()) for i in range(rows)]
+            target[start:start+rows] = new_rows
+
+        if name == 'vertices':
+            self._generated_vertices = None
+
+        if name not in self._array_indices:
+            if name in ('uvs', 'normals') and self.mode in ('line', 'point'):   # not used for lines and points
+                return
+            self.generate()
+            return
+
+        if start + rows > self._row_count:
+            self.generate()
+            return
+
+        array_handle = self.geom.modify_vertex_data().modify_array(self._array_indices[name])
+        vmem = memoryview(array_handle).cast('B').cast('f')
+        vmem[start*width : (start+rows)*width] = memoryview(buffer).cast('B').cast('f')
+
+
     @property
     def indices(self):  # Get the vertex indices as a flat list. For example if you have tuples in triangles :((0,1,2),(3,4,5)) -> (0,1,2,3,4,5). Or with quads: ((0,1,2,3),) -> (0,1,2,2,3,0).
-        if not self.triangles:
+        if len(self.triangles) == 0:
+            if _is_array(self.vertices):
+                import numpy as np
+                return np.arange(len(self.vertices), dtype=np.uint32)
             return list(range(len(self.vertices)))
 
-        if self.triangles and isinstance(self.triangles[0], numbers.Real):
+        if _is_array(self.triangles):   # numpy array of triangles, quads or ngons, all with the same number of indices
+            import numpy as np
+            if self.triangles.ndim == 1:
+                return self.triangles
+            corners = self.triangles.shape[1]
+            if corners == 3:
+                return self.triangles.reshape(-1)
+            if corners == 4:
+                return self.triangles[:, (0,1,2, 2,3,0)].reshape(-1)
+            if corners > 4:   # same triangle fan as for lists
+                fan = [(0, i, (i+1) % corners) for i in range(1, corners)]
+                return self.triangles[:, np.array(fan).reshape(-1)].reshape(-1)
+            return np.zeros(0, dtype=np.uint32)
+
+        if isinstance(self.triangles[0], numbers.Real):
             return self.triangles
 
         indices = []
@@ -284,7 +433,10 @@ class Mesh(p3d.NodePath):
     @property
     def generated_vertices(self):
         if self._generated_vertices is None:
-            if self.triangles is not None and len(self.triangles) > 0:
+            if _is_array(self.vertices) or _is_array(self.triangles):
+                self._generated_vertices = self._generated_vertices_array()
+
+            elif self.triangles is not None and len(self.triangles) > 0:
                 if not isinstance(self.triangles[0], numbers.Real):
                     tris = []
                     for tup in self.triangles:
@@ -304,18 +456,36 @@ class Mesh(p3d.NodePath):
     def generated_vertices(self, value):
         self._generated_vertices = value
 
+    def _generated_vertices_array(self):
+        import numpy as np
+        vertices = np.asarray(self.vertices, dtype=np.float32).reshape(-1, 3)
+        if self.triangles is None or len(self.triangles) == 0:
+            return vertices
+
+        triangles = self.triangles
+        if not _is_array(triangles):
+            if isinstance(triangles[0], numbers.Real):
+                triangles = np.asarray(triangles, dtype=np.uint32)
+            else:
+                return vertices[np.fromiter(chain.from_iterable((t[0], t[1], t[2], t[2], t[3], t[0]) if len(t) == 4 else t for t in triangles), dtype=np.uint32)]
+
+        if triangles.ndim == 2 and triangles.shape[1] == 4:
+            return vertices[triangles[:, (0,1,2, 2,3,0)].reshape(-1)]
+        return vertices[triangles.reshape(-1)]
+
 
     def serialize(self, vertex_decimal_limit=4, color_decimal_limit=4, uv_decimal_limit=4, normal_decimal_limit=4):
         vbuf_format = self.vertex_buffer_format
         if vbuf_format is not None:
             vbuf_format = f'"{vbuf_format}"'
 
+        vertices, triangles, colors, uvs, normals = (_as_rows(self.vertices, 3), _as_rows(self.triangles), _as_rows(self.colors, 4), _as_rows(self.uvs, 2), _as_rows(self.normals, 3))
         mesh_as_string = 'Mesh('
-        mesh_as_string += f'\n    vertices={[tuple(round(e, vertex_decimal_limit) for e in vert) for vert in self.vertices]},' if self.vertices else ''
-        mesh_as_string += f'\n    triangles={self.triangles},' if self.triangles else ''
-        mesh_as_string += f'\n    colors={[tuple(round(e, color_decimal_limit) for e in col) for col in self.colors]},' if self.colors else ''
-        mesh_as_string += f'\n    uvs={[tuple(round(e, uv_decimal_limit) for e in uv) for uv in self.uvs]},' if self.uvs else ''
-        mesh_as_string += f'\n    normals={[tuple(round(e, normal_decimal_limit) for e in norm) for norm in self.normals]},' if self.normals else ''
+        mesh_as_string += f'\n    vertices={[tuple(round(e, vertex_decimal_limit) for e in vert) for vert in vertices]},' if vertices else ''
+        mesh_as_string += f'\n    triangles={triangles},' if triangles else ''
+        mesh_as_string += f'\n    colors={[tuple(round(e, color_decimal_limit) for e in col) for col in colors]},' if colors else ''
+        mesh_as_string += f'\n    uvs={[tuple(round(e, uv_decimal_limit) for e in uv) for uv in uvs]},' if uvs else ''
+        mesh_as_string += f'\n    normals={[tuple(round(e, normal_decimal_limit) for e in norm) for norm in normals]},' if normals else ''
         mesh_as_string += f'\n    static={self.static},' if not self.static else ''
         mesh_as_string += f'\n    mode="{self.mode}",' if self.mode != 'triangle' else ''
         mesh_as_string += f'\n    thickness={self.thickness},' if self.thickness != 1 else ''
@@ -351,16 +521,31 @@ class Mesh(p3d.NodePath):
         if self.vertex_buffer is not None:
             raise Exception("Can't add mesh with vertex buffer to another mesh (operation not supported).")
 
-        self.vertices += other.vertices
-        self.triangles += other.triangles
-        if other.colors:
-            self.colors += other.colors
+        self.vertices = _concatenate(self.vertices, other.vertices, 3)
+        self.triangles = _concatenate(self.triangles, other.triangles)
+        if other.colors is not None and len(other.colors):
+            self.colors = _concatenate(self.colors, other.colors, 4)
         else:
-            self.colors += (color.white, ) * len(other.vertices)
-        self.normals += other.normals
-        self.uvs += other.uvs
+            self.colors = _concatenate(self.colors, (color.white, ) * len(other.vertices), 4)
+        self.normals = _concatenate(self.normals, other.normals, 3)
+        self.uvs = _concatenate(self.uvs, other.uvs, 2)
 
     def __deepcopy__(self, memo):
+        if any(_is_array(e) for e in (self.vertices, self.triangles, self.colors, self.uvs, self.normals)):
+            m = Mesh(
+                vertices=_copy_array_or_list(self.vertices),
+                triangles=_copy_array_or_list(self.triangles),
+                colors=_copy_array_or_list(self.colors),
+                uvs=_copy_array_or_list(self.uvs),
+                normals=_copy_array_or_list(self.normals),
+                static=self.static,
+                mode=self.mode,
+                thickness=self.thickness,
+                render_points_in_3d=self.render_points_in_3d,
+            )
+            m.name = self.name
+            return m
+
         m = Mesh(
             vertices=[Vec3(*e) for e in self.vertices],
             triangles=self.triangles,
@@ -387,7 +572,9 @@ class Mesh(p3d.NodePath):
         self.setRenderModeThickness(value)
 
     def generate_normals(self, smooth=True, regenerate=True):
-        self.normals = list(generate_normals(self.vertices, self.indices, smooth))
+        self.normals = generate_normals(self.vertices, self.indices, smooth)
+        if not _is_array(self.vertices):
+            self.normals = list(self.normals)
         if regenerate:
             self.generate()
         return self.normals
@@ -411,7 +598,7 @@ class Mesh(p3d.NodePath):
         if regenerate:
             self.generate()
 
-    def save(self, name='', folder:Path=Func(getattr, application, 'models_compressed_folder'), flip_faces=False, vertex_decimal_limit=5, color_decimal_limit=4):
+    def save(self, name='', folder:Path=Func(getattr, application, 'models_compressed_folder'), flip_faces=False, vertex_decimal_limit=5, color_decimal_limit=4, binary=False):  # binary=True saves .ursinamesh in the binary format, which loads much faster
         if callable(folder):
             folder = folder()
         if not folder.exists():
@@ -422,7 +609,12 @@ class Mesh(p3d.NodePath):
         if '.' not in name:
             name += '.ursinamesh'
 
-        if name.endswith('ursinamesh'):
+        if name.endswith('ursinamesh') and binary:
+            from ursina.scripts.binary_ursinamesh import write_binary_ursinamesh
+            write_binary_ursinamesh(self, folder / name)
+            print('saved binary .ursinamesh to:', folder / name)
+
+        elif name.endswith('ursinamesh'):
             with open(folder / name, 'w') as f:
                 f.write(self.serialize(vertex_decimal_limit=vertex_decimal_limit, color_decimal_limit=color_decimal_limit))
             print('saved .ursinamesh to:', folder / name, 'vertex_decimal_limit:', vertex_decimal_limit, 'color_decimal_limit:', color_decimal_limit)
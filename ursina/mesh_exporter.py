@@ -22,13 +22,13 @@ def ursinamesh_to_obj(mesh, name='', out_path:Path=None, max_decimals=5, flip_fa
         obj += f'v {round(v[0], max_decimals)} {round(v[1], max_decimals)} {round(v[2], max_decimals)}\n'
 
     # UVs
-    has_uvs = bool(mesh.uvs)
+    has_uvs = len(mesh.uvs) > 0
     if has_uvs:
         for uv in mesh.uvs:
             obj += f'vt {round(uv[0], max_decimals)} {round(uv[1], max_decimals)}\n'
 
     # Normals
-    has_normals = bool(mesh.normals)
+    has_normals = len(mesh.normals) > 0
     if has_normals:
         for n in mesh.normals:
             obj += f'vn {round(n[0], max_decimals)} {round(n[1], max_decimals)} {round(n[2], max_decimals)}\n'
@@ -36,7 +36,7 @@ def ursinamesh_to_obj(mesh, name='', out_path:Path=None, max_decimals=5, flip_fa
     obj += 's off\n'
 
     # Triangles
-    tris = mesh.triangles if mesh.triangles else chunk_list(mesh.indices, 3)
+    tris = mesh.triangles if len(mesh.triangles) > 0 else chunk_list(mesh.indices, 3)
 
     for tri in tris:
         if flip_faces:
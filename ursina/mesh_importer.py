@@ -1,10 +1,12 @@
+import importlib.util
 import os
 import platform
 import subprocess
 from copy import copy, deepcopy
 from pathlib import Path
-from ursina.mesh import Mesh
-from ursina import application, color
+from ursina.mesh import Mesh, _as_rows, _is_array
+from ursina.asset_cache import AssetCache, model_size
+from ursina import application, asset_index, async_loading, color
 from time import perf_counter
 from ursina.string_utilities import print_info, print_warning
 from ursina.vec3 import Vec3
@@ -12,9 +14,12 @@ import panda3d.core as p3d
 import gltf
 import builtins
 from ursina.sequence import Func
+from ursina.scripts.binary_ursinamesh import is_binary_ursinamesh, read_binary_ursinamesh, write_binary_ursinamesh
+from ursina.scripts.obj_reader import read_obj
 
 
-imported_meshes = dict()
+imported_meshes = AssetCache(size_of=model_size, name='models')    # set imported_meshes.budget to limit how much memory loaded models can use
+_loading_models = dict()    # (name, use_deepcopy) -> Future, for load_model_async calls that haven't finished yet
 blender_scenes = dict()
 # folders = (application.asset_folder, )
 
@@ -22,6 +27,55 @@ def load_model(name, folder=None, file_types=('.bam', '.ursinamesh', '.obj', '.g
     if callable(gltf_no_srgb):
         gltf_no_srgb = gltf_no_srgb()
 
+    name, file_types = _split_model_name(name, file_types)
+    instance = _load_cached_model(name, use_deepcopy)
+    if instance is not None:
+        return instance
+
+    if isinstance(name, Path):
+        m = builtins.loader.loadModel(name)
+        imported_meshes[name] = m
+        return m  # type: ignore
+
+    m = _load_model_file(name, _model_folders(folder), file_types, use_deepcopy, gltf_no_srgb)
+    if m is not None:
+        imported_meshes[name] = m
+    return m
+
+
+def load_model_async(name, folder=None, file_types=('.bam', '.ursinamesh', '.obj', '.glb', '.gltf', '.blend'), use_deepcopy=False, gltf_no_srgb=Func(getattr, application, 'gltf_no_srgb')):  # noqa: B008
+    # like load_model, but finds and parses the file on a background thread. returns a Future with the model, or None if it's missing.
+    # the model gets added to imported_meshes on the main thread, at the start of a frame. example:
+    # load_model_async('castle').add_done_callback(lambda future: setattr(castle, 'model', future.result()))
+    if callable(gltf_no_srgb):
+        gltf_no_srgb = gltf_no_srgb()
+
+    name, file_types = _split_model_name(name, file_types)
+    instance = _load_cached_model(name, use_deepcopy)
+    if instance is not None:
+        return async_loading.resolved(instance)
+
+    def finish(m):
+        if m is None:
+            return None
+        if name not in imported_meshes:     # could have been loaded by load_model while we were waiting
+            imported_meshes[name] = m
+            return m
+        return _load_cached_model(name, use_deepcopy)
+
+    key = (name, use_deepcopy)
+    if key in _loading_models:  # already loading, so don't do it twice
+        return _loading_models[key]
+    if isinstance(name, Path):
+        future = async_loading.submit(builtins.loader.loadModel, name, on_main_thread=finish)
+    else:
+        future = async_loading.submit(_load_model_file, name, _model_folders(folder), file_types, use_deepcopy, gltf_no_srgb, on_main_thread=finish)
+    _loading_models[key] = future
+    future.add_done_callback(lambda future: _loading_models.pop(key, None))
+    return future
+
+
+def _split_model_name(name, file_types):
     if not isinstance(name, str |  Path):
         raise TypeError(f"Argument name must be of type str or Path, not {type(str)}")
 
@@ -29,97 +83,94 @@ def load_model(name, folder=None, file_types=('.bam', '.ursinamesh', '.obj', '.g
         full_name = name
         name = full_name.split('.')[0]
         file_types = ('.' + full_name.split('.',1)[1],)
+    return name, file_types
+
 
-    if name in imported_meshes:
+def _load_cached_model(name, use_deepcopy):
+    cached = imported_meshes.get(name)
+    if cached is not None:
         # print('load cached model', name)
         try:
             if not use_deepcopy:
-                instance = copy(imported_meshes[name])
+                instance = copy(cached)
             else:
-                instance = deepcopy(imported_meshes[name])
+                instance = deepcopy(cached)
 
             instance.clearTexture()
             return instance
 
         except:
             pass
-
-    if isinstance(name, Path):
-        m = builtins.loader.loadModel(name)
-        imported_meshes[name] = m
-        return m  # type: ignore
+    return None
 
 
+def _model_folders(folder):
     if folder is not None:
         if not isinstance(folder, Path):
             raise TypeError(f'folder must be a Path, not a {type(folder)}')
-        _folders = (folder,)
-
-    else:
-        _folders = (application.models_compressed_folder, application.asset_folder, application.internal_models_compressed_folder)
-
-    for filetype in file_types:
-        if use_deepcopy and filetype == '.bam':
-            continue
-        for folder in _folders:
-            # warning: glob is case-insensitive on windows, so m.path will be all lowercase
-            for file_path in folder.glob(f'**/{name}{filetype}'):
-                if filetype == '.bam':
-                    # print_info('loading bam')
-                    m = builtins.loader.loadModel(file_path)
-                    imported_meshes[name] = m
-                    return m  # type: ignore
-
-                if filetype == '.gltf' or filetype == '.glb':
-                    gltf_settings = gltf.GltfSettings()
-                    gltf_settings.no_srgb = gltf_no_srgb
-                    model_root = gltf.load_model(str(file_path), gltf_settings=gltf_settings)
-                    imported_meshes[name] = p3d.NodePath(model_root)
-                    return p3d.NodePath(model_root)
-
-                if filetype == '.ursinamesh':
-                    try:
-                        with open(file_path) as f:
-                            m = eval(f.read())
-                            m.path = file_path
-                            m.name = name
-                            m.vertices = [Vec3(*v) for v in m.vertices]
-                            imported_meshes[name] = m
-                            return m
-                    except Exception as e:
-                        raise Exception('invalid ursinamesh file:', file_path, e)
-
-
-                if filetype == '.obj':
-                    # print('found obj', file_path)
-                    m = obj_to_ursinamesh(folder=folder, name=name, return_mesh=True)
+        return (folder,)
+
+    return (application.models_compressed_folder, application.asset_folder, application.internal_models_compressed_folder)
+
+
+def _load_model_file(name, _folders, file_types, use_deepcopy, gltf_no_srgb):    # finds and loads the model, without touching imported_meshes, so it can run on a background thread
+    # warning: the lookup is case-insensitive on windows, like glob, so m.path might not match the case of name
+    for file_path, filetype, _ in asset_index.search(name, _folders, [e for e in file_types if not (use_deepcopy and e == '.bam')]):
+        if filetype in ('.bam', '.obj', '.blend'):
+            # imported here, so importing ursina doesn't import it and python -m ursina.conversion_cache works without warnings
+            from ursina import conversion_cache
+
+        if filetype == '.bam':
+            source = conversion_cache.stale_source(file_path)    # converted from a .obj or .blend file that changed since
+            if source is None:
+                # print_info('loading bam')
+                return builtins.loader.loadModel(file_path, noCache=True)    # imported_meshes caches it, so panda's ModelPool doesn't have to
+            file_path, filetype = source, source.suffix
+
+        if filetype == '.gltf' or filetype == '.glb':
+            gltf_settings = gltf.GltfSettings()
+            gltf_settings.no_srgb = gltf_no_srgb
+            model_root = gltf.load_model(str(file_path), gltf_settings=gltf_settings)
+            return p3d.NodePath(model_root)
+
+        if filetype == '.ursinamesh' and is_binary_ursinamesh(file_path):
+            m = read_binary_ursinamesh(file_path)
+            m.path = file_path
+            m.name = name
+            return m
+
+        if filetype == '.ursinamesh':
+            try:
+                with open(file_path) as f:
+                    m = eval(f.read())
                     m.path = file_path
                     m.name = name
-                    imported_meshes[name] = m
-                    if not use_deepcopy:
-                        m.save(f'{name}.bam')
-
+                    m.vertices = [Vec3(*v) for v in m.vertices]
                     return m
+            except Exception as e:
+                raise Exception('invalid ursinamesh file:', file_path, e)
+
 
-                elif filetype == '.blend':
-                    print_info('found blend file:', file_path)
-                    if blend_to_obj(file_path):
-                        m = obj_to_ursinamesh(folder=folder, name=name, return_mesh=True)
-                        if not m:
-                            raise ValueError('obj_to_ursinamesh failed to convert:', file_path)
-                        m.path = file_path
-                        m.name = name
-                        imported_meshes[name] = m
-                        if not use_deepcopy:
-                            m.save(f'{name}.bam')
-
-                        return m
-                        # return load_model(name, folder, use_deepcopy=use_deepcopy)
-                else:
-                    try:
-                        return builtins.loader.loadModel(file_path)  # type: ignore
-                    except:
-                        pass
+        if filetype in conversion_cache.file_types:
+            if filetype == '.blend':
+                print_info('found blend file:', file_path)
+            if use_deepcopy:
+                m = conversion_cache.convert_file(file_path)
+            else:
+                bam_path, m, _ = conversion_cache.update(file_path, name)    # only converts it if the file changed since last time
+                if bam_path is not None and m is None:
+                    return builtins.loader.loadModel(bam_path, noCache=True)
+            if not m:
+                raise ValueError('failed to convert:', file_path)
+            m.path = file_path
+            m.name = name
+            return m
+
+        else:
+            try:
+                return builtins.loader.loadModel(file_path)  # type: ignore
+            except:
+                pass
 
     return None
 
@@ -264,7 +315,145 @@ def blend_to_obj(blend_file:Path, out_folder=Func(getattr, application, 'models_
     return exported
 
 
-def obj_to_ursinamesh(folder=Func(getattr, application, 'models_compressed_folder'), out_folder=Func(getattr, application, 'models_compressed_folder'), name='*', return_mesh=True, save_to_file=False, delete_obj=False):
+def _parse_obj_lines(file_path):    # the line by line .obj parser, for when numpy isn't installed or obj_reader.read_obj() can't handle the file
+    with file_path.open('r') as file:
+        lines = file.readlines()
+
+    verts = []
+    tris = []
+
+    uv_indices = []
+    uvs = []
+    norm_indices = []
+    norms = []
+    normals = [] # final normals made getting norms with norm_indices
+
+    vertex_colors = []
+    vertex_colors_packed = []
+    current_color = None
+    mtl_data = None
+    mtl_dict = {}
+
+    # parse the obj file to a Mesh
+    for i, l in enumerate(lines):  # noqa: E741
+        if l.startswith('v '):
+            parts = [float(v) for v in l[2:].strip().split(' ')]
+            vert = parts[:3]
+            vert[0] = -vert[0]
+            verts.append(tuple(vert))
+            if len(parts) > 3:
+                # current_color = color.rgb(*parts[3:])
+                vertex_colors_packed.append(color.rgb(*parts[3:]))
+
+        elif l.startswith('vn '):
+            n = l[3:].strip().split(' ')
+            norms.append(tuple(float(e) for e in n))
+
+        elif l.startswith('vt '):
+            uv = l[3:].strip()
+            uv = uv.split(' ')
+            uvs.append(tuple(float(e) for e in uv))
+
+        elif l.startswith('f '):
+            l = l[2:]  # noqa: E741
+            l = l.split(' ')  # noqa: E741
+
+            try:
+                tri = tuple(int(t.split('/')[0])-1 for t in l if t != '\n')
+            except:
+                print_warning('error in obj file line:', i, ':', l)
+                return
+            if len(tri) == 3:
+                tris.extend(tri)
+                if current_color:
+                    vertex_colors.extend([current_color for i in range(3)])
+                elif vertex_colors_packed:
+                    vertex_colors.extend([vertex_colors_packed[idx] if idx < len(vertex_colors_packed) else color.white for idx in tri])
+
+            elif len(tri) == 4:
+                tris.extend((tri[0], tri[1], tri[2], tri[2], tri[3], tri[0]))
+                if current_color:
+                    vertex_colors.extend([current_color for i in range(6)])
+                elif vertex_colors_packed:
+                    vertex_colors.extend([vertex_colors_packed[idx] for idx in (tri[0], tri[1], tri[2], tri[2], tri[3], tri[0])])
+
+            else: # ngon
+                for i in range(1, len(tri)-1):
+                    tris.extend((tri[i], tri[i+1], tri[0]))
+                if current_color:
+                    vertex_colors.extend([current_color for i in range(len(tri))])
+                elif vertex_colors_packed:
+                    for i in range(1, len(tri)-1):
+                        vertex_colors.extend([vertex_colors_packed[idx] for idx in (tri[i], tri[i+1], tri[0])])
+
+            try:
+                uv = tuple(int(t.split('/')[1])-1 for t in l)
+                if len(uv) == 3:
+                    uv_indices.extend(uv)
+                elif len(uv) == 4:
+                    uv_indices.extend((uv[0], uv[1], uv[2], uv[2], uv[3], uv[0]))
+                else: # ngon
+                    for i in range(1, len(uv)-1):
+                        uv_indices.extend((uv[i], uv[i+1], uv[0]))
+            except: # if no uvs
+                pass
+
+            try:
+                n = tuple(int(t.split('/')[2])-1 for t in l)
+                if len(n) == 3:
+                    norm_indices.extend(n)
+                elif len(uv) == 4:
+                    norm_indices.extend((n[0], n[1], n[2], n[2], n[3], n[0]))
+                else: # ngon
+                    for i in range(1, len(n)-1):
+                        norm_indices.extend((n[i], n[i+1], n[0]))
+            except: # if no normals
+                pass
+
+        elif l.startswith('mtllib '):    # load mtl file
+            mtl_file_name = file_path.with_suffix('.mtl')
+            if mtl_file_name.exists():
+                with open(mtl_file_name, mode='r', encoding='utf-8') as mtl_file:
+                    mtl_data = mtl_file.readlines()
+
+                    for i in range(len(mtl_data)-1):
+                        if mtl_data[i].startswith('newmtl '):
+                            material_name = mtl_data[i].strip()[7:] # remove 'newmtl '
+                            for j in range(i+1, min(i+8, len(mtl_data))):
+                                if mtl_data[j].startswith('newmtl'):
+                                    break
+                                if mtl_data[j].startswith('Kd '):
+                                    material_color = [float(e) for e in mtl_data[j].strip()[3:].split(' ')]
+                                    mtl_dict[material_name] = *material_color, 1
+
+
+        elif l.startswith('usemtl ') and mtl_data: # apply material color
+            material_name = l[7:].strip()    # remove 'usemtl '
+            if material_name in mtl_dict:
+                current_color = mtl_dict[material_name]
+
+
+    if norms: # make sure we have normals and not just normal indices (weird edge case).
+        normals = [(-norms[nid][0], norms[nid][1], norms[nid][2]) for nid in norm_indices]
+
+    return Mesh(
+        vertices=[verts[t] for t in tris],
+        normals=normals,
+        uvs=[uvs[uid] for uid in uv_indices],
+        colors=vertex_colors
+        )
+
+
+def obj_file_to_mesh(file_path, use_numpy=True):    # parses a single .obj file. returns None if it couldn't be parsed.
+    mesh = None
+    if use_numpy and importlib.util.find_spec('numpy'):
+        mesh = read_obj(file_path)
+    if mesh is None:
+        mesh = _parse_obj_lines(file_path)
+    return mesh
+
+
+def obj_to_ursinamesh(folder=Func(getattr, application, 'models_compressed_folder'), out_folder=Func(getattr, application, 'models_compressed_folder'), name='*', return_mesh=True, save_to_file=False, delete_obj=False, use_numpy=True):   # use_numpy=False to use the slower line by line parser
     if callable(folder):
         folder = folder()
     if callable(out_folder):
@@ -278,135 +467,9 @@ def obj_to_ursinamesh(folder=Func(getattr, application, 'models_compressed_folde
         print('read obj at:', file_path)
 
 
-        with file_path.open('r') as file:
-            lines = file.readlines()
-
-        verts = []
-        tris = []
-
-        uv_indices = []
-        uvs = []
-        norm_indices = []
-        norms = []
-        normals = [] # final normals made getting norms with norm_indices
-
-        vertex_colors = []
-        vertex_colors_packed = []
-        current_color = None
-        mtl_data = None
-        mtl_dict = {}
-
-        # parse the obj file to a Mesh
-        for i, l in enumerate(lines):  # noqa: E741
-            if l.startswith('v '):
-                parts = [float(v) for v in l[2:].strip().split(' ')]
-                vert = parts[:3]
-                vert[0] = -vert[0]
-                verts.append(tuple(vert))
-                if len(parts) > 3:
-                    # current_color = color.rgb(*parts[3:])
-                    vertex_colors_packed.append(color.rgb(*parts[3:]))
-
-            elif l.startswith('vn '):
-                n = l[3:].strip().split(' ')
-                norms.append(tuple(float(e) for e in n))
-
-            elif l.startswith('vt '):
-                uv = l[3:].strip()
-                uv = uv.split(' ')
-                uvs.append(tuple(float(e) for e in uv))
-
-            elif l.startswith('f '):
-                l = l[2:]  # noqa: E741
-                l = l.split(' ')  # noqa: E741
-
-                try:
-                    tri = tuple(int(t.split('/')[0])-1 for t in l if t != '\n')
-                except:
-                    print_warning('error in obj file line:', i, ':', l)
-                    return
-                if len(tri) == 3:
-                    tris.extend(tri)
-                    if current_color:
-                        vertex_colors.extend([current_color for i in range(3)])
-                    elif vertex_colors_packed:
-                        vertex_colors.extend([vertex_colors_packed[idx] if idx < len(vertex_colors_packed) else color.white for idx in tri])
-
-                elif len(tri) == 4:
-                    tris.extend((tri[0], tri[1], tri[2], tri[2], tri[3], tri[0]))
-                    if current_color:
-                        vertex_colors.extend([current_color for i in range(6)])
-                    elif vertex_colors_packed:
-                        vertex_colors.extend([vertex_colors_packed[idx] for idx in (tri[0], tri[1], tri[2], tri[2], tri[3], tri[0])])
-
-                else: # ngon
-                    for i in range(1, len(tri)-1):
-                        tris.extend((tri[i], tri[i+1], tri[0]))
-                    if current_color:
-                        vertex_colors.extend([current_color for i in range(len(tri))])
-                    elif vertex_colors_packed:
-                        for i in range(1, len(tri)-1):
-                            vertex_colors.extend([vertex_colors_packed[idx] for idx in (tri[i], tri[i+1], tri[0])])
-
-                try:
-                    uv = tuple(int(t.split('/')[1])-1 for t in l)
-                    if len(uv) == 3:
-                        uv_indices.extend(uv)
-                    elif len(uv) == 4:
-                        uv_indices.extend((uv[0], uv[1], uv[2], uv[2], uv[3], uv[0]))
-                    else: # ngon
-                        for i in range(1, len(uv)-1):
-                            uv_indices.extend((uv[i], uv[i+1], uv[0]))
-                except: # if no uvs
-                    pass
-
-                try:
-                    n = tuple(int(t.split('/')[2])-1 for t in l)
-                    if len(n) == 3:
-                        norm_indices.extend(n)
-                    elif len(uv) == 4:
-                        norm_indices.extend((n[0], n[1], n[2], n[2], n[3], n[0]))
-                    else: # ngon
-                        for i in range(1, len(n)-1):
-                            norm_indices.extend((n[i], n[i+1], n[0]))
-                except: # if no normals
-                    pass
-
-            elif l.startswith('mtllib '):    # load mtl file
-                mtl_file_name = file_path.with_suffix('.mtl')
-                if mtl_file_name.exists():
-                    with open(mtl_file_name, mode='r', encoding='utf-8') as mtl_file:
-                        mtl_data = mtl_file.readlines()
-
-                        for i in range(len(mtl_data)-1):
-                            if mtl_data[i].startswith('newmtl '):
-                                material_name = mtl_data[i].strip()[7:] # remove 'newmtl '
-                                for j in range(i+1, min(i+8, len(mtl_data))):
-                                    if mtl_data[j].startswith('newmtl'):
-                                        break
-                                    if mtl_data[j].startswith('Kd '):
-                                        material_color = [float(e) for e in mtl_data[j].strip()[3:].split(' ')]
-                                        mtl_dict[material_name] = *material_color, 1
-
-
-            elif l.startswith('usemtl ') and mtl_data: # apply material color
-                material_name = l[7:].strip()    # remove 'usemtl '
-                if material_name in mtl_dict:
-                    current_color = mtl_dict[material_name]
-
-
-        if norms: # make sure we have normals and not just normal indices (weird edge case).
-            normals = [(-norms[nid][0], norms[nid][1], norms[nid][2]) for nid in norm_indices]
-
-        if return_mesh:
-            return Mesh(
-                vertices=[verts[t] for t in tris],
-                normals=normals,
-                uvs=[uvs[uid] for uid in uv_indices],
-                colors=vertex_colors
-                )
-
-        mesh = Mesh(vertices=tuple(verts[t] for t in tris), colors=tuple(col for col in vertex_colors), uvs=tuple(uvs[uid] for uid in uv_indices), normals=normals)
+        mesh = obj_file_to_mesh(file_path, use_numpy=use_numpy)
+        if mesh is None or return_mesh:
+            return mesh
 
         if not save_to_file:
             return mesh
@@ -421,6 +484,32 @@ def obj_to_ursinamesh(folder=Func(getattr, application, 'models_compressed_folde
 
         print_info('saved ursinamesh to:', out_path)
 
+def ursinamesh_to_binary(folder=None, out_folder=None, name='*'):   # convert text .ursinamesh files to the binary format. overwrites them if out_folder isn't set.
+    if folder is None:
+        folder = application.models_compressed_folder
+    if out_folder is None:
+        out_folder = folder
+
+    if name.endswith('.ursinamesh'):
+        name = name[:-len('.ursinamesh')]
+
+    converted = []
+    for file_path in folder.glob(f'**/{name}.ursinamesh'):
+        if is_binary_ursinamesh(file_path):
+            continue
+
+        with open(file_path) as f:
+            mesh = eval(f.read())
+
+        out_path = out_folder / file_path.relative_to(folder)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        write_binary_ursinamesh(mesh, out_path)
+        print_info('converted to binary ursinamesh:', out_path)
+        converted.append(out_path)
+
+    return converted
+
+
 # faster, but does not apply modifiers
 def blend_to_obj_fast(model_name=None, write_to_disk=False):
     print_info('find models')
@@ -489,21 +578,25 @@ def ursina_mesh_to_obj(mesh, name='', out_path=Func(getattr, application, 'model
     if not name:
         name = camel_to_snake(mesh.__class__.__name__)
     obj += 'o ' + name + '\n'
-    verts = mesh.vertices
+    verts = _as_rows(mesh.vertices, 3)
+    uvs = _as_rows(mesh.uvs, 2)
+    has_uvs = uvs is not None and len(uvs) > 0
 
     for v in verts:
         v = [round(e, max_decimals) for e in v]
         obj += f'v {v[0]} {v[1]} {v[2]}\n'
 
-    if mesh.uvs:
-        for uv in mesh.uvs:
+    if has_uvs:
+        for uv in uvs:
             uv = [round(e, max_decimals) for e in uv]
             obj += f'vt {uv[0]} {uv[1]}\n'
 
     obj += 's off\n'
 
-    if mesh.triangles:
+    if mesh.triangles is not None and len(mesh.triangles):
         tris = mesh.triangles
+        if _is_array(tris):
+            tris = [tuple(t) for t in tris.tolist()] if tris.ndim == 2 else tris.tolist()
 
         if isinstance(tris[0], tuple): # convert from tuples to flat
             new_tris = []
@@ -533,7 +626,7 @@ def ursina_mesh_to_obj(mesh, name='', out_path=Func(getattr, application, 'model
         if i % 3 == 0:
             obj += '\nf '
         obj += str(t+1)
-        if mesh.uvs:
+        if has_uvs:
             obj += '/'+str(t+1)
         obj += ' '
 
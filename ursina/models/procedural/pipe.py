@@ -128,6 +128,13 @@ class Pipe(Mesh):
                     self.colors.extend([self.color_gradient[-1], ]*3)
                 self.uvs.extend([(0,0) for i in range(3)])
 
+        if not self.static and self._row_count == len(verts) and 'vertices' in self._array_indices:  # same size as before, like a full TrailRenderer, so just update the data
+            self.update_vertices(0, verts)
+            if self.colors:
+                self.update_colors(0, self.colors)
+            self.update_uvs(0, self.uvs)
+            return
+
         self.vertices = verts
         super().generate()
         # destroy(b)
@@ -1,6 +1,7 @@
 from ursina.vec2 import Vec2
 from ursina.vec3 import Vec3
 from ursina.vec4 import Vec4
+from ursina.ursinamath import lerp
 
 import panda3d.core as p3d
 
@@ -22,17 +23,23 @@ import inspect
 import socket
 import ssl
 import select
+import selectors
 import errno
 
 import struct
 
 import time
+import itertools
+import random
+import heapq
+from math import floor, ceil
 
 import atexit
 import signal
 
 import threading
 import asyncio
+import functools
 
 # Used internally by Peer.
 class PeerEvent(Enum):
@@ -42,6 +49,77 @@ class PeerEvent(Enum):
     DATA = auto()
 
 
+# The channels a message can be sent on with the "udp" transport, see Peer. The "tcp" transport sends everything reliable and ordered.
+class Channel(Enum):
+    UNRELIABLE = 0              # may be lost, duplicates are dropped but the order isn't kept
+    UNRELIABLE_SEQUENCED = 1    # may be lost, messages older than the last one received are dropped
+    RELIABLE = 2                # resent until acked, and received in the order they were sent
+
+
+# The length headers that can come before each message, see Peer.
+length_headers = ("uint16", "uint32", "varint")
+# Sent as the first message by a peer that doesn't use the default "uint16" length header, followed by the index of the one it uses.
+# RPC messages start with a 31 bit procedure hash, so they can't start with 0xff.
+length_header_announcement = b"\xffursina\xff"
+
+
+def encode_varint(value):
+    b = bytearray()
+    while value >= 0x80:
+        b.append((value & 0x7f) | 0x80)
+        value >>= 7
+    b.append(value)
+    return b
+
+
+# Returns the value and the offset after it. Raises IndexError if the buffer ends before the varint does.
+def decode_varint(buffer, offset=0, max_byte_count=10):
+    value = 0
+    shift = 0
+    for i in range(max_byte_count):
+        byte = buffer[offset + i]
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset + i + 1
+        shift += 7
+    raise Exception("Varint is too long.")
+
+
+def pack_length_header(length_header, length):
+    if length_header == "uint16":
+        if length > 0xffff:
+            raise Exception(f"Message of {length} bytes is too big for a uint16 length header, use Peer(length_header='uint32') or 'varint' to send it.")
+        return struct.pack(">H", length)
+    elif length_header == "uint32":
+        return struct.pack(">I", length)
+    return encode_varint(length)
+
+
+# Returns the message length and the offset after the header, or None if the buffer ends before the header does.
+def unpack_length_header(length_header, buffer, offset):
+    try:
+        if length_header == "uint16":
+            return struct.unpack_from(">H", buffer, offset)[0], offset + 2
+        elif length_header == "uint32":
+            return struct.unpack_from(">I", buffer, offset)[0], offset + 4
+        return decode_varint(buffer, offset, max_byte_count=5)
+    except (struct.error, IndexError):
+        return None
+
+
+# Most systems can't write more buffers than this at once with sendmsg.
+max_buffers_per_write = 1024
+
+
+# Returns the buffers that are left after the first byte_count bytes of them were sent.
+def remaining_buffers(buffers, byte_count):
+    for i, b in enumerate(buffers):
+        if byte_count < len(b):
+            return [memoryview(b)[byte_count:]] + buffers[i+1:]
+        byte_count -= len(b)
+    return []
+
+
 # This class represents and single connection.
 # It can be hashed and compared so that it may be used as a dictionary key.
 # This is useful for mapping from a connection to player data.
@@ -56,14 +134,35 @@ class Connection:
         self.connected = True
         self.timed_out = False
 
-        self.state = "l"
-        self.length_byte_count = 2
-        self.expected_byte_count = self.length_byte_count
-        self.bytes_received = bytearray()
+        # Length header of the messages received and sent. They start as "uint16" and change when a length header is announced, see Peer.
+        self.length_header = "uint16"
+        self.send_length_header = "uint16"
+        self.expecting_announcement = True
+        # Received bytes that end in the middle of a length header.
+        self.bytes_received = b""
+        # A message that has only partially been received, it gets filled in by the next reads.
+        self.message = None
+        self.message_view = None
+        self.message_byte_count = 0
 
         self.uid = str(uuid.uuid4())
 
         self.receiving_thread = None
+        self.last_receive_time = time.time()
+
+        # Messages waiting for flush(), when the peer uses batch_sends.
+        self.outgoing_messages = []
+        self.outgoing_byte_count = 0
+        self.send_lock = threading.Lock()
+        # Used by the selectors backend, where the peer's loop thread does all the socket io.
+        self.send_buffer = bytearray()
+
+        # Send stats. flush_count is the number of writes, which is one per message unless the peer uses batch_sends.
+        self.bytes_sent = 0
+        self.flush_count = 0
+        self.bytes_per_second = 0
+        self.send_rate_start_time = time.time()
+        self.send_rate_start_byte_count = 0
 
     def __hash__(self):
         return hash(self.uid)
@@ -71,23 +170,98 @@ class Connection:
     def __eq__(self, other):
         return self.uid == other.uid
 
-    def send(self, data):
-        b = bytearray()
-        b += struct.pack(">H", len(data))
-        b += data
-        try:
-            self.socket.sendall(b)
-        except:
-            pass
+    # Returns False if the message wasn't sent, because the connection is closed or has more than send_high_water_mark bytes waiting to be sent.
+    # channel is only used by the "udp" transport, see UDPConnection.
+    def send(self, data, channel=None):
+        if not self.connected:
+            return False
+        if self.peer.send_high_water_mark is not None and self.queued_byte_count() >= self.peer.send_high_water_mark:
+            return False
+        header = pack_length_header(self.send_length_header, len(data))
+        if self.peer.batch_sends:
+            with self.send_lock:
+                self.outgoing_messages.append(header)
+                self.outgoing_messages.append(data)
+                self.outgoing_byte_count += len(header) + len(data)
+            return True
+        return self._write([header, data])
+
+    # Sends the messages queued with batch_sends in as few writes as possible. Peer.update() calls this for every connection.
+    def flush(self):
+        with self.send_lock:
+            if not self.outgoing_messages:
+                return True
+            buffers = self.outgoing_messages
+            self.outgoing_messages = []
+            self.outgoing_byte_count = 0
+        return self._write(buffers)
+
+    def queued_byte_count(self):
+        return self.outgoing_byte_count + len(self.send_buffer)
+
+    def _count_write(self, byte_count):
+        self.flush_count += 1
+        self.bytes_sent += byte_count
+        now = time.time()
+        if now - self.send_rate_start_time >= 1:
+            self.bytes_per_second = (self.bytes_sent - self.send_rate_start_byte_count) / (now - self.send_rate_start_time)
+            self.send_rate_start_time = now
+            self.send_rate_start_byte_count = self.bytes_sent
+
+    def _write(self, buffers):
+        self._count_write(sum(len(b) for b in buffers))
+
+        if self.peer.backend == "threads":
+            try:
+                if self.peer.use_tls or not hasattr(self.socket, "sendmsg"):
+                    self.socket.sendall(b"".join(buffers))
+                else:
+                    while buffers:
+                        buffers = remaining_buffers(buffers, self.socket.sendmsg(buffers[:max_buffers_per_write]))
+            except:
+                return False
+            return True
+
+        if not self.connected:
+            return False
+        with self.send_lock:
+            if self.send_buffer:
+                # The loop is already waiting to write the rest of the buffer, so it will write this too.
+                for b in buffers:
+                    self.send_buffer += b
+                return True
+            if not self.peer.use_tls:
+                # Plain sockets can be written to while the loop is reading from them, which saves waking the loop up.
+                if not hasattr(self.socket, "sendmsg"):
+                    buffers = [b"".join(buffers)]
+                try:
+                    if len(buffers) == 1:
+                        buffers = remaining_buffers(buffers, self.socket.send(buffers[0]))
+                    else:
+                        buffers = remaining_buffers(buffers, self.socket.sendmsg(buffers[:max_buffers_per_write]))
+                except BlockingIOError:
+                    pass
+                except:
+                    return False
+                if not buffers:
+                    return True
+            for b in buffers:
+                self.send_buffer += b
+        self.peer._call_in_loop(self.peer._selector_write, self)
+        return True
 
     def disconnect(self):
         if self.connected:
-            try:
-                self.socket.shutdown(socket.SHUT_RDWR)
-                self.socket.close()
-            except:
-                pass
+            self.flush()
             self.connected = False
+            if self.peer.backend == "selectors":
+                self.peer._call_in_loop(self.peer._selector_close, self)
+            else:
+                try:
+                    self.socket.shutdown(socket.SHUT_RDWR)
+                    self.socket.close()
+                except:
+                    pass
             self.peer._remove_connection(self)
 
     def is_timed_out(self):
@@ -99,42 +273,484 @@ class Connection:
     def _receive(self):
         try:
             while True:
-                data = None
                 try:
                     if self.connection_timeout is not None:
                         self.socket.settimeout(self.connection_timeout)
-                    data = self.socket.recv(self.expected_byte_count)
+                    byte_count = self._read_socket()
                 except socket.timeout:
                     self.timed_out = True
                     raise
-                except Exception as e:
-                    raise
-                if data is None:
+                if byte_count == 0:
                     break
-                if len(data) == 0:
-                    break
-                self.bytes_received += data
-                self.expected_byte_count -= len(data)
-
-                if self.expected_byte_count == 0:
-                    if self.state == "l":
-                        l = struct.unpack(">H", self.bytes_received)[0]
-                        self.state = "c"
-                        self.expected_byte_count = l
-                        self.bytes_received.clear()
-                    elif self.state == "c":
-                        d = bytes(self.bytes_received.copy())
-                        self.peer.output_event_queue.put((PeerEvent.DATA, self, d, time.time()))
-                        self.state = "l"
-                        self.expected_byte_count = self.length_byte_count
-                        self.bytes_received.clear()
         except:
             pass
         finally:
             self.disconnect()
-            self.state = "l"
-            self.bytes_received.clear()
-            self.expected_byte_count = self.length_byte_count
+            self.bytes_received = b""
+            self.message = None
+            self.message_view = None
+
+    # Does one read from the socket and returns the number of bytes read, 0 means the other side closed the connection.
+    # It reads as much as is available, so the data can contain several messages and end with part of the next one.
+    def _read_socket(self):
+        if self.message is not None:
+            # Read the rest of a big message straight into its buffer.
+            byte_count = self.socket.recv_into(self.message_view[self.message_byte_count:])
+            self.message_byte_count += byte_count
+            if byte_count and self.message_byte_count == len(self.message):
+                self._message_received(self.message_view.toreadonly())
+                self.message = None
+                self.message_view = None
+            return byte_count
+        # A new buffer for every read, since the messages handed out can be views into it.
+        data = self.socket.recv(self.peer.receive_buffer_size)
+        if data:
+            self._receive_data(data)
+        return len(data)
+
+    def _receive_data(self, data):
+        self.last_receive_time = time.time()
+        if self.bytes_received:
+            data = self.bytes_received + data
+            self.bytes_received = b""
+        view = memoryview(data)
+        offset = 0
+        while offset < len(view):
+            header = unpack_length_header(self.length_header, view, offset)
+            if header is None:
+                self.bytes_received = bytes(view[offset:])
+                return
+            length, start = header
+            if length > self.peer.max_message_size:
+                raise Exception(f"Received a message of {length} bytes, which is more than the max message size of {self.peer.max_message_size}.")
+            end = start + length
+            if end > len(view):
+                self.message = bytearray(length)
+                self.message_view = memoryview(self.message)
+                self.message_byte_count = len(view) - start
+                self.message_view[:self.message_byte_count] = view[start:]
+                return
+            self._message_received(view[start:end])
+            offset = end
+
+    def _message_received(self, message):
+        if self.expecting_announcement:
+            self.expecting_announcement = False
+            if len(message) == len(length_header_announcement) + 1 and message[:-1] == length_header_announcement:
+                self.length_header = length_headers[message[-1]]
+                return
+        if not self.peer.memoryview_data:
+            message = bytes(message)
+        self.peer.output_event_queue.put((PeerEvent.DATA, self, message, time.time()))
+
+    def _announce_length_header(self):
+        self.send(length_header_announcement + bytes((length_headers.index(self.peer.length_header), )))
+        self.send_length_header = self.peer.length_header
+
+
+# -- UDP transport --
+# Every datagram starts with udp_protocol_id, the packet type and the token the client picked when connecting,
+# so packets from other programs or from an earlier connection on the same address are ignored.
+udp_protocol_id = b"URSU"
+UDP_CONNECT, UDP_ACCEPT, UDP_DISCONNECT, UDP_DATA = range(4)
+udp_header = struct.Struct(">4sBI")
+# Data packets add their own sequence number, the last sequence number received and a bitfield of the 32 before that, which is how packets get acked.
+udp_data_header = struct.Struct(">4sBIHHI")
+# Then come the messages. The flags are the channel, plus udp_fragment_flag for the fragments of a message that doesn't fit in a packet.
+udp_message_header = struct.Struct(">BHH")
+udp_fragment_header = struct.Struct(">HH")
+udp_fragment_flag = 0x80
+# Reliable messages are only sent up to this many ids ahead of the oldest unacked one, so the ids can wrap around without mixing up old and new ones.
+udp_reliable_window = 1024
+# Fragments of unreliable messages are thrown away if the rest of them don't arrive within this many seconds.
+udp_fragment_timeout = 2
+# An empty packet is sent when nothing else was sent for this long, so the other side knows the connection is still there.
+udp_keepalive_interval = .1
+# How often the loop checks for packets to resend.
+udp_update_interval = .01
+# The max number of packets sent to a connection per update, the rest waits for the next one, so a big burst doesn't overflow the socket buffers.
+udp_max_packets_per_update = 32
+# Received packets only get acked by the 32 packets after them, so an ack is sent after this many, before they fall out of it.
+udp_ack_every = 16
+udp_connect_attempt_interval = .25
+udp_connect_timeout = 5
+# Bigger than the default on most systems, since one socket is used for all the connections.
+udp_socket_buffer_size = 1024 * 1024
+# There's no connection to close with udp, so connections without packets for this long time out, unless the peer has a connection_timeout.
+udp_default_connection_timeout = 10
+
+
+# Returns True if the 16 bit sequence number a is newer than b, taking wrapping around into account.
+def sequence_greater(a, b):
+    return 0 < ((a - b) & 0xffff) < 0x8000
+
+
+# -- Description --
+# A connection of a peer using the "udp" transport. Works like Connection, but send() takes a Channel.
+# The peer's loop thread puts the queued messages in packets of up to peer.mtu bytes, resends the reliable ones until they're acked,
+# and splits messages that don't fit in a packet into fragments.
+# -- Stats --
+# On top of the send stats of Connection: rtt (smoothed round trip time in seconds, None until the first ack),
+# rtt_deviation, packet_loss (the fraction of the packets that weren't acked, over the last second or so), packets_sent, packets_received, packets_lost and resent_count.
+class UDPConnection(Connection):
+    def __init__(self, peer, address, token, connection_timeout):
+        super().__init__(peer, peer.socket, address, connection_timeout)
+        self.token = token
+        self.expecting_announcement = False
+        if self.connection_timeout is None:
+            self.connection_timeout = udp_default_connection_timeout
+
+        # outgoing_messages gets (channel, message id, message) from send(), everything else is only touched by the loop thread.
+        self.next_message_ids = [0, 0, 0]
+        self.local_sequence = 0
+        self.remote_sequence = None
+        self.received_packet_bits = 0
+        self.acks_owed = 0
+        self.last_send_time = 0
+        self.unreliable_queue = deque()
+        self.unreliable_queue_byte_count = 0
+        self.sent_packets = dict()          # sequence -> (time sent, ids of the reliable messages in it, if it had any messages)
+        self.reliable_unacked = dict()      # message id -> [message, time last sent]
+        self.reliable_unacked_byte_count = 0
+        self.reliable_expected_id = 0
+        self.reliable_received = dict()     # message id -> (fragment, payload), for the ones received before the ones before them
+        self.reliable_fragments = []
+        self.sequenced_last_id = None
+        self.fragment_groups = dict()       # (channel, message id) -> [time first fragment received, fragments, fragment count received]
+
+        self.rtt = None
+        self.rtt_deviation = 0
+        self.packet_loss = 0
+        self.loss_interval_start_time = time.time()
+        self.loss_interval_acked_count = 0
+        self.loss_interval_lost_count = 0
+        self.packets_sent = 0
+        self.packets_received = 0
+        self.packets_lost = 0
+        self.resent_count = 0
+
+    def send(self, data, channel=None):
+        if not self.connected:
+            return False
+        if self.peer.send_high_water_mark is not None and self.queued_byte_count() >= self.peer.send_high_water_mark:
+            return False
+        if len(data) > self.peer.max_message_size:
+            raise Exception(f"Can't send a message of {len(data)} bytes, the max message size is {self.peer.max_message_size}.")
+        if channel is None:
+            channel = Channel.RELIABLE
+        channel = channel.value
+        max_payload_size = self.peer.mtu - udp_data_header.size - udp_message_header.size - udp_fragment_header.size
+        with self.send_lock:
+            message_id = self.next_message_ids[channel]
+            if len(data) <= max_payload_size:
+                self.outgoing_messages.append((channel, message_id, udp_message_header.pack(channel, message_id, len(data)) + data))
+                message_id = (message_id + 1) & 0xffff
+                self.outgoing_byte_count += len(data)
+            else:
+                fragment_count = ceil(len(data) / max_payload_size)
+                # The unreliable channels use one id for all the fragments, reliable fragments are separate reliable messages.
+                for i in range(fragment_count):
+                    fragment = data[i * max_payload_size:(i + 1) * max_payload_size]
+                    self.outgoing_messages.append((channel, message_id, udp_message_header.pack(channel | udp_fragment_flag, message_id, len(fragment)) + udp_fragment_header.pack(i, fragment_count) + fragment))
+                    if channel == Channel.RELIABLE.value:
+                        message_id = (message_id + 1) & 0xffff
+                if channel != Channel.RELIABLE.value:
+                    message_id = (message_id + 1) & 0xffff
+                self.outgoing_byte_count += len(data)
+            self.next_message_ids[channel] = message_id
+        if not self.peer.batch_sends:
+            self.peer._wake_loop()
+        return True
+
+    def flush(self):
+        if self.outgoing_messages:
+            self.peer._wake_loop()
+        return True
+
+    def queued_byte_count(self):
+        return self.outgoing_byte_count + self.unreliable_queue_byte_count + self.reliable_unacked_byte_count
+
+    def disconnect(self):
+        if self.connected:
+            self.connected = False
+            self.peer._call_in_loop(self.peer._udp_close, self)
+            self.peer._remove_connection(self)
+
+    # Called by the loop thread every udp_update_interval and whenever it's woken up.
+    def _update(self, now):
+        if now - self.last_receive_time > self.connection_timeout:
+            self.timed_out = True
+            self.disconnect()
+            return
+        # Packets that weren't acked in time are counted as lost, for when nothing is received to ack them. Their reliable messages get resent before that anyway.
+        loss_timeout = 1 if self.rtt is None else max(1, self.rtt * 4)
+        while self.sent_packets:
+            sequence, (time_sent, reliable_ids, has_messages) = next(iter(self.sent_packets.items()))
+            if now - time_sent < loss_timeout:
+                break
+            del self.sent_packets[sequence]
+            self.packets_lost += 1
+            self.loss_interval_lost_count += 1
+        if now - self.loss_interval_start_time >= 1:
+            packet_count = self.loss_interval_acked_count + self.loss_interval_lost_count
+            if packet_count:
+                self.packet_loss = self.loss_interval_lost_count / packet_count
+            self.loss_interval_start_time = now
+            self.loss_interval_acked_count = 0
+            self.loss_interval_lost_count = 0
+        for key, group in list(self.fragment_groups.items()):
+            if now - group[0] > udp_fragment_timeout:
+                del self.fragment_groups[key]
+        self._send_packets(now)
+
+    def _send_packets(self, now):
+        with self.send_lock:
+            messages = self.outgoing_messages
+            self.outgoing_messages = []
+            self.outgoing_byte_count = 0
+        for channel, message_id, message in messages:
+            if channel == Channel.RELIABLE.value:
+                self.reliable_unacked[message_id] = [message, 0]
+                self.reliable_unacked_byte_count += len(message)
+            else:
+                self.unreliable_queue.append(message)
+                self.unreliable_queue_byte_count += len(message)
+
+        packet_count = 0
+        packet = []
+        reliable_ids = []
+        packet_size = udp_data_header.size
+        resend_timeout = .1 if self.rtt is None else max(.03, self.rtt + self.rtt_deviation * 4)
+        oldest_id = next(iter(self.reliable_unacked), 0)
+        for message_id, unacked in self.reliable_unacked.items():
+            # The receiver drops the ones too far ahead of the first one it's missing, which is at least the oldest unacked one.
+            if (message_id - oldest_id) & 0xffff >= udp_reliable_window:
+                break
+            if now - unacked[1] < resend_timeout:
+                continue
+            message = unacked[0]
+            if packet and packet_size + len(message) > self.peer.mtu:
+                self._send_packet(packet, reliable_ids, now)
+                packet = []
+                reliable_ids = []
+                packet_size = udp_data_header.size
+                packet_count += 1
+                if packet_count == udp_max_packets_per_update:
+                    return
+            if unacked[1]:
+                self.resent_count += 1
+            unacked[1] = now
+            packet.append(message)
+            packet_size += len(message)
+            reliable_ids.append(message_id)
+
+        while self.unreliable_queue:
+            message = self.unreliable_queue[0]
+            if packet and packet_size + len(message) > self.peer.mtu:
+                self._send_packet(packet, reliable_ids, now)
+                packet = []
+                reliable_ids = []
+                packet_size = udp_data_header.size
+                packet_count += 1
+                if packet_count == udp_max_packets_per_update:
+                    return
+            self.unreliable_queue.popleft()
+            self.unreliable_queue_byte_count -= len(message)
+            packet.append(message)
+            packet_size += len(message)
+
+        if packet or self.acks_owed or now - self.last_send_time >= udp_keepalive_interval:
+            self._send_packet(packet, reliable_ids, now)
+
+    def _send_packet(self, messages, reliable_ids, now):
+        sequence = self.local_sequence
+        self.local_sequence = (sequence + 1) & 0xffff
+        ack = self.remote_sequence if self.remote_sequence is not None else 0xffff
+        data = b"".join([udp_data_header.pack(udp_protocol_id, UDP_DATA, self.token, sequence, ack, self.received_packet_bits), *messages])
+        self.sent_packets[sequence] = (now, reliable_ids, len(messages) > 0)
+        self.peer._udp_send(data, self.address)
+        self._count_write(len(data))
+        self.packets_sent += 1
+        self.last_send_time = now
+        self.acks_owed = 0
+
+    def _receive_packet(self, data):
+        if len(data) < udp_data_header.size:
+            return
+        now = time.time()
+        self.last_receive_time = now
+        self.packets_received += 1
+        sequence, ack, ack_bits = udp_data_header.unpack_from(data)[3:]
+        self._packet_acked(ack, now)
+        i = 0
+        while ack_bits:
+            if ack_bits & 1:
+                self._packet_acked((ack - 1 - i) & 0xffff, now)
+            ack_bits >>= 1
+            i += 1
+        # Packets that fell out of the acks without being acked can't be acked anymore.
+        while self.sent_packets:
+            oldest_sequence = next(iter(self.sent_packets))
+            if not sequence_greater(ack, (oldest_sequence + 32) & 0xffff):
+                break
+            del self.sent_packets[oldest_sequence]
+            self.packets_lost += 1
+            self.loss_interval_lost_count += 1
+        if not self._track_received(sequence):
+            return
+        if len(data) == udp_data_header.size:
+            return
+        # Only packets with messages get acked right away, otherwise two empty packets would keep acking each other.
+        self.acks_owed += 1
+        if self.acks_owed >= udp_ack_every:
+            self._send_packet([], [], now)
+
+        view = memoryview(data)
+        offset = udp_data_header.size
+        while offset + udp_message_header.size <= len(data):
+            flags, message_id, length = udp_message_header.unpack_from(data, offset)
+            offset += udp_message_header.size
+            fragment = None
+            if flags & udp_fragment_flag:
+                if offset + udp_fragment_header.size > len(data):
+                    return
+                fragment = udp_fragment_header.unpack_from(data, offset)
+                offset += udp_fragment_header.size
+                if fragment[0] >= fragment[1] or fragment[1] * self.peer.mtu > self.peer.max_message_size + self.peer.mtu:
+                    return
+            if offset + length > len(data):
+                return
+            channel = flags & ~udp_fragment_flag
+            if channel > Channel.RELIABLE.value:
+                return
+            self._receive_message(channel, message_id, fragment, view[offset:offset + length])
+            offset += length
+            if not self.connected:
+                return
+
+    def _receive_message(self, channel, message_id, fragment, payload):
+        if channel == Channel.RELIABLE.value:
+            if (message_id - self.reliable_expected_id) & 0xffff >= udp_reliable_window or message_id in self.reliable_received:
+                return
+            self.reliable_received[message_id] = (fragment, payload)
+            while self.reliable_expected_id in self.reliable_received:
+                fragment, payload = self.reliable_received.pop(self.reliable_expected_id)
+                self.reliable_expected_id = (self.reliable_expected_id + 1) & 0xffff
+                if fragment is None:
+                    self._message_received(payload)
+                    continue
+                index, fragment_count = fragment
+                if index != len(self.reliable_fragments):
+                    self.reliable_fragments = []
+                    if index != 0:
+                        continue
+                self.reliable_fragments.append(payload)
+                if index == fragment_count - 1:
+                    self._message_received(b"".join(self.reliable_fragments))
+                    self.reliable_fragments = []
+            return
+
+        if fragment is not None:
+            index, fragment_count = fragment
+            group = self.fragment_groups.get((channel, message_id))
+            if group is None:
+                group = self.fragment_groups[(channel, message_id)] = [time.time(), [None] * fragment_count, 0]
+            fragments = group[1]
+            if len(fragments) != fragment_count or fragments[index] is not None:
+                return
+            fragments[index] = payload
+            group[2] += 1
+            if group[2] < fragment_count:
+                return
+            del self.fragment_groups[(channel, message_id)]
+            payload = b"".join(fragments)
+
+        if channel == Channel.UNRELIABLE_SEQUENCED.value:
+            if self.sequenced_last_id is not None and not sequence_greater(message_id, self.sequenced_last_id):
+                return
+            self.sequenced_last_id = message_id
+        self._message_received(payload)
+
+    # Keeps track of the received packets to ack, returns False for duplicates and packets too old to tell.
+    def _track_received(self, sequence):
+        if self.remote_sequence is None:
+            self.remote_sequence = sequence
+            return True
+        if sequence == self.remote_sequence:
+            return False
+        if sequence_greater(sequence, self.remote_sequence):
+            difference = (sequence - self.remote_sequence) & 0xffff
+            self.received_packet_bits = ((self.received_packet_bits << difference) | (1 << (difference - 1))) & 0xffffffff
+            self.remote_sequence = sequence
+            return True
+        difference = (self.remote_sequence - sequence) & 0xffff
+        if difference > 32:
+            return False
+        bit = 1 << (difference - 1)
+        if self.received_packet_bits & bit:
+            return False
+        self.received_packet_bits |= bit
+        return True
+
+    def _packet_acked(self, sequence, now):
+        sent_packet = self.sent_packets.pop(sequence, None)
+        if sent_packet is None:
+            return
+        time_sent, reliable_ids, has_messages = sent_packet
+        # Empty packets aren't acked right away, so they would make the round trip time look longer.
+        if has_messages:
+            sample = now - time_sent
+            if self.rtt is None:
+                self.rtt = sample
+                self.rtt_deviation = sample / 2
+            else:
+                self.rtt_deviation += (abs(sample - self.rtt) - self.rtt_deviation) * .25
+                self.rtt += (sample - self.rtt) * .125
+        for message_id in reliable_ids:
+            unacked = self.reliable_unacked.pop(message_id, None)
+            if unacked is not None:
+                self.reliable_unacked_byte_count -= len(unacked[0])
+        self.loss_interval_acked_count += 1
+
+
+# -- Description --
+# Simulates a bad network for testing the "udp" transport, for example over loopback:
+#     peer.network_simulator = NetworkSimulator(packet_loss=.1, latency=.05, jitter=.02)
+# Packets sent by the peer are dropped with the chance packet_loss, sent twice with the chance duplicate,
+# and delayed by latency plus a random amount up to jitter seconds, which also reorders them.
+# Set it on both peers to make it happen in both directions.
+class NetworkSimulator:
+    def __init__(self, packet_loss=0, latency=0, jitter=0, duplicate=0, seed=None):
+        self.packet_loss = packet_loss
+        self.latency = latency
+        self.jitter = jitter
+        self.duplicate = duplicate
+        self.random = random.Random(seed)
+        self.delayed_packets = []       # heap of (time to send, counter, data, address)
+        self.counter = itertools.count()
+        self.dropped_count = 0
+
+    def send(self, sock, data, address):
+        if self.random.random() < self.packet_loss:
+            self.dropped_count += 1
+            return
+        copy_count = 2 if self.random.random() < self.duplicate else 1
+        for _ in range(copy_count):
+            delay = self.latency + self.random.random() * self.jitter
+            if delay <= 0:
+                sock.sendto(data, address)
+            else:
+                heapq.heappush(self.delayed_packets, (time.time() + delay, next(self.counter), data, address))
+
+    # Sends the delayed packets that are due, the peer's loop calls this.
+    def update(self, sock):
+        now = time.time()
+        while self.delayed_packets and self.delayed_packets[0][0] <= now:
+            data, address = heapq.heappop(self.delayed_packets)[2:]
+            try:
+                sock.sendto(data, address)
+            except OSError:
+                pass
 
 
 # -- Description --
@@ -151,6 +767,33 @@ class Connection:
 # The client can make use of a given path to a certificate authority bundle for testing / development / self signed.
 # -- Address family --
 # The socket address family can be either "INET" (ipv4) or "INET6" (ipv6).
+# -- Messages --
+# Each message is sent with a header containing its length. By default that's a 16 bit number, so messages can be up to 64 KB.
+# Use `length_header="uint32"` or "varint" to send bigger messages. Both sides then use it after announcing it to each other when connecting.
+# Peers that use a different length header can talk to each other, but all of them have to be from a version of ursina that supports them.
+# Received messages bigger than max_message_size make the connection disconnect.
+# With `memoryview_data=True`, on_data and on_raw_data get read-only memoryviews into the received data instead of copying it into bytes.
+# -- Sending --
+# With `batch_sends=True`, send() only queues the message and update() sends everything queued for a connection at once, with a single sendmsg where possible.
+# Call flush() on the peer or a connection to send the queued messages before that.
+# send_high_water_mark is the max number of bytes that can be waiting to be sent to a connection. send() returns False and drops the message when it's reached.
+# It's None by default, meaning no limit.
+# Each connection keeps track of bytes_sent, bytes_per_second, flush_count and queued_byte_count().
+# -- Transport --
+# The transport can be either "tcp" (the default) or "udp".
+# With "tcp", a lost packet holds up everything sent after it until it's resent. "udp" sends each message on a Channel instead:
+# UNRELIABLE and UNRELIABLE_SEQUENCED messages are never resent, which suits things like position updates that are replaced by the next one anyway,
+# and only RELIABLE messages (the default) are resent until acked and kept in order.
+#     peer.send(connection, data, Channel.UNRELIABLE_SEQUENCED)
+# Packets are kept under mtu bytes (1200 by default), bigger messages are split into fragments and put back together on the other side.
+# The connections are UDPConnections, which keep track of the round trip time and packet loss, see UDPConnection.
+# The "udp" transport always uses a single loop thread, like the "selectors" backend, and doesn't support TLS.
+# Set peer.network_simulator to a NetworkSimulator to test with packet loss, latency and jitter.
+# -- Backend --
+# The backend can be either "threads" or "selectors".
+# "threads" (the default) starts a receiving thread per connection.
+# "selectors" services all the sockets from a single thread, which scales a lot better for hosts with many clients.
+# The events end up in the same queue either way, so update() works the same.
 # -- Notes --
 # Keep in mind that the networking in running on its own thread and you must therefore check if it's running (is_running).
 class Peer:
@@ -159,7 +802,11 @@ class Peer:
                  use_tls=False,
                  path_to_certchain=None, path_to_private_key=None,
                  path_to_cabundle=None,
-                 socket_address_family="INET"):
+                 socket_address_family="INET",
+                 backend="threads",
+                 length_header="uint16", max_message_size=16*1024*1024, memoryview_data=False,
+                 batch_sends=False, send_high_water_mark=None,
+                 transport="tcp"):
         self.on_connect = on_connect
         self.on_disconnect = on_disconnect
         self.on_data = on_data
@@ -175,6 +822,21 @@ class Peer:
             self.socket_address_family = socket.AF_INET6
         else:
             raise Exception("Invalid/unsupported socket address family '{socket_address_family}'.")
+        if backend not in ("threads", "selectors"):
+            raise Exception(f"Invalid/unsupported backend '{backend}'.")
+        self.backend = backend
+        if length_header not in length_headers:
+            raise Exception(f"Invalid/unsupported length header '{length_header}'.")
+        self.length_header = length_header
+        self.max_message_size = max_message_size
+        self.memoryview_data = memoryview_data
+        self.batch_sends = batch_sends
+        self.send_high_water_mark = send_high_water_mark
+        if transport not in ("tcp", "udp"):
+            raise Exception(f"Invalid/unsupported transport '{transport}'.")
+        if transport == "udp" and use_tls:
+            raise Exception("TLS isn't supported with the udp transport.")
+        self.transport = transport
 
         self.ssl_context = None
 
@@ -197,6 +859,19 @@ class Peer:
         self.running_lock = threading.Lock()
         self.connections_lock = threading.Lock()
 
+        self.receive_buffer_size = 65536
+
+        # Used by the selectors backend and the udp transport.
+        self.selector = None
+        self.wakeup_socket = None
+        self.loop_calls = deque()
+
+        # Used by the udp transport.
+        self.mtu = 1200
+        self.network_simulator = None
+        self.udp_connections = dict()   # address -> UDPConnection
+        self.udp_connect_token = None
+
         def on_application_exit():
             if self.running:
                 self.stop()
@@ -260,7 +935,9 @@ class Peer:
         with self.running_lock:
             self.running = False
 
-        if self.is_host:
+        if self.backend == "selectors" or self.transport == "udp":
+            self._wake_loop()
+        elif self.is_host:
             try:
                 self.listen_socket.shutdown(socket.SHUT_RDWR)
                 self.listen_socket.close()
@@ -293,8 +970,17 @@ class Peer:
                 if self.on_data is not None:
                     self.on_data(next_event[1], d, t)
 
-    def send(self, connection, data):
-        connection.send(data)
+        if self.batch_sends:
+            self.flush()
+
+    def flush(self):
+        for connection in self.get_connections():
+            connection.flush()
+
+    def send(self, connection, data, channel=None):
+        if channel is None:
+            return connection.send(data)
+        return connection.send(data, channel)
 
     def disconnect(self, connection):
         connection.disconnect()
@@ -319,13 +1005,22 @@ class Peer:
             connections_copy = self.connections.copy()
         return connections_copy
 
-    def _add_connection(self, socket, address):
-        connection = Connection(self, socket, address, self.connection_timeout)
+    def _add_connection(self, socket, address, token=None):
+        if self.transport == "udp":
+            connection = UDPConnection(self, address, token, self.connection_timeout)
+            self.udp_connections[address] = connection
+        else:
+            connection = Connection(self, socket, address, self.connection_timeout)
+        if self.backend == "selectors" and self.transport == "tcp":
+            self.selector.register(socket, selectors.EVENT_READ, functools.partial(self._selector_service, connection))
+        if self.length_header != "uint16" and self.transport == "tcp":
+            connection._announce_length_header()
         with self.connections_lock:
             self.connections.append(connection)
         self.output_event_queue.put((PeerEvent.CONNECT, connection, None, time.time()))
-        connection.receiving_thread = threading.Thread(target=connection._receive, daemon=True)
-        connection.receiving_thread.start()
+        if self.backend == "threads" and self.transport == "tcp":
+            connection.receiving_thread = threading.Thread(target=connection._receive, daemon=True)
+            connection.receiving_thread.start()
 
     def _remove_connection(self, connection):
         with self.connections_lock:
@@ -333,18 +1028,21 @@ class Peer:
                 self.connections.remove(connection)
                 self.output_event_queue.put((PeerEvent.DISCONNECT, connection, None, time.time()))
 
-    def _run_server(self):
+    def _create_listen_socket(self):
         try:
             self.listen_socket = socket.socket(self.socket_address_family, socket.SOCK_STREAM, 0)
             self.listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.listen_socket.bind((self.host_name, self.port))
             self.listen_socket.listen(self.backlog)
-            if self.use_tls:
-                self.listen_socket = self.ssl_context.wrap_socket(self.listen_socket, server_side=True)
         except Exception as e:
             print(e)
             raise
 
+    def _run_server(self):
+        self._create_listen_socket()
+        if self.use_tls:
+            self.listen_socket = self.ssl_context.wrap_socket(self.listen_socket, server_side=True)
+
         with self.running_lock:
             self.running = True
 
@@ -356,7 +1054,7 @@ class Peer:
                 break
             self._add_connection(client_socket, address)
 
-    def _run_client(self):
+    def _connect_client(self):
         client_socket = None
         if self.use_tls:
             try:
@@ -365,21 +1063,317 @@ class Peer:
                 client_socket.connect((self.host_name, self.port))
             except Exception as e:
                 self.running = False
-                return
+                return None
         else:
             try:
                 client_socket = socket.create_connection((self.host_name, self.port))
             except Exception as e:
                 self.running = False
-                return
+                return None
         client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return client_socket
+
+    def _run_client(self):
+        client_socket = self._connect_client()
+        if client_socket is None:
+            return
         self._add_connection(client_socket, (self.host_name, self.port))
 
         with self.running_lock:
             self.running = True
 
-    def _run(self):
+    def _open_selector(self):
+        self.selector = selectors.DefaultSelector()
+        # Other threads write a byte to the wakeup socket to get the loop out of select(), see _call_in_loop.
+        wakeup_receive_socket, self.wakeup_socket = socket.socketpair()
+        wakeup_receive_socket.setblocking(False)
+        self.wakeup_socket.setblocking(False)
+        self.selector.register(wakeup_receive_socket, selectors.EVENT_READ, functools.partial(self._selector_wakeup, wakeup_receive_socket))
+        return wakeup_receive_socket
+
+    def _close_selector(self, wakeup_receive_socket):
+        self._selector_wakeup(wakeup_receive_socket, selectors.EVENT_READ)
+        for key in list(self.selector.get_map().values()):
+            try:
+                key.fileobj.close()
+            except:
+                pass
+        self.selector.close()
+        self.wakeup_socket.close()
+
+    def _run_selector_loop(self):
+        wakeup_receive_socket = self._open_selector()
+
         if self.is_host:
+            self._create_listen_socket()
+            self.listen_socket.setblocking(False)
+            self.selector.register(self.listen_socket, selectors.EVENT_READ, self._selector_accept)
+        else:
+            client_socket = self._connect_client()
+            if client_socket is None:
+                self.selector.close()
+                wakeup_receive_socket.close()
+                self.wakeup_socket.close()
+                return
+            client_socket.setblocking(False)
+            self._add_connection(client_socket, (self.host_name, self.port))
+
+        with self.running_lock:
+            self.running = True
+
+        select_timeout = None
+        last_timeout_check = time.time()
+        if self.connection_timeout is not None:
+            select_timeout = min(self.connection_timeout, 0.5)
+
+        while self.running:
+            for key, mask in self.selector.select(select_timeout):
+                key.data(mask)
+            if self.connection_timeout is not None and time.time() - last_timeout_check >= select_timeout:
+                now = last_timeout_check = time.time()
+                for connection in self.get_connections():
+                    if now - connection.last_receive_time > self.connection_timeout:
+                        connection.timed_out = True
+                        connection.disconnect()
+
+        self._close_selector(wakeup_receive_socket)
+
+    # Runs func on the selector loop thread, which is the only one that touches the sockets and the selector.
+    def _call_in_loop(self, func, *args):
+        if threading.current_thread() is self.main_thread:
+            func(*args)
+        else:
+            self.loop_calls.append((func, args))
+            self._wake_loop()
+
+    def _wake_loop(self):
+        try:
+            self.wakeup_socket.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def _selector_wakeup(self, wakeup_receive_socket, mask):
+        try:
+            while wakeup_receive_socket.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        while self.loop_calls:
+            func, args = self.loop_calls.popleft()
+            func(*args)
+
+    def _selector_accept(self, mask):
+        while True:
+            try:
+                client_socket, address = self.listen_socket.accept()
+            except (BlockingIOError, OSError):
+                return
+            client_socket.setblocking(False)
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.use_tls:
+                # Do the handshake in the loop instead of blocking it until the client has answered.
+                client_socket = self.ssl_context.wrap_socket(client_socket, server_side=True, do_handshake_on_connect=False)
+                self.selector.register(client_socket, selectors.EVENT_READ, functools.partial(self._selector_handshake, client_socket, address))
+            else:
+                self._add_connection(client_socket, address)
+
+    def _selector_handshake(self, client_socket, address, mask):
+        try:
+            client_socket.do_handshake()
+        except ssl.SSLWantReadError:
+            self.selector.modify(client_socket, selectors.EVENT_READ, functools.partial(self._selector_handshake, client_socket, address))
+            return
+        except ssl.SSLWantWriteError:
+            self.selector.modify(client_socket, selectors.EVENT_WRITE, functools.partial(self._selector_handshake, client_socket, address))
+            return
+        except:
+            self.selector.unregister(client_socket)
+            client_socket.close()
+            return
+        self.selector.unregister(client_socket)
+        self._add_connection(client_socket, address)
+
+    def _selector_service(self, connection, mask):
+        if mask & selectors.EVENT_WRITE:
+            self._selector_write(connection)
+        if mask & selectors.EVENT_READ:
+            self._selector_read(connection)
+
+    def _selector_read(self, connection):
+        while connection.connected:
+            try:
+                byte_count = connection._read_socket()
+            except (BlockingIOError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                return
+            except:
+                byte_count = 0
+            if byte_count == 0:
+                connection.disconnect()
+                return
+            # TLS sockets can have decrypted data left that select() doesn't know about.
+            if not (self.use_tls and connection.socket.pending()):
+                return
+
+    def _selector_write(self, connection):
+        if not connection.connected:
+            return
+        with connection.send_lock:
+            try:
+                byte_count = connection.socket.send(connection.send_buffer)
+            except (BlockingIOError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                byte_count = 0
+            except:
+                byte_count = None
+            if byte_count is not None:
+                del connection.send_buffer[:byte_count]
+                has_more = len(connection.send_buffer) > 0
+        if byte_count is None:
+            connection.disconnect()
+            return
+        events = selectors.EVENT_READ
+        if has_more:
+            # Wait until the socket can take more, the rest is sent from _selector_service.
+            events |= selectors.EVENT_WRITE
+        if self.selector.get_key(connection.socket).events != events:
+            self.selector.modify(connection.socket, events, functools.partial(self._selector_service, connection))
+
+    def _selector_close(self, connection):
+        try:
+            self.selector.unregister(connection.socket)
+        except (KeyError, ValueError):
+            pass
+        try:
+            with connection.send_lock:
+                if connection.send_buffer:
+                    connection.socket.send(connection.send_buffer)
+                    connection.send_buffer.clear()
+        except:
+            pass
+        try:
+            connection.socket.shutdown(socket.SHUT_RDWR)
+            connection.socket.close()
+        except:
+            pass
+
+    def _run_udp_loop(self):
+        wakeup_receive_socket = self._open_selector()
+        self.udp_connections = dict()
+        self.socket = None
+        try:
+            self.socket = socket.socket(self.socket_address_family, socket.SOCK_DGRAM)
+            if self.is_host:
+                self.socket.bind((self.host_name, self.port))
+                # The same as with tcp, so listen_socket.getsockname() gives the port.
+                self.listen_socket = self.socket
+            else:
+                host_address = socket.getaddrinfo(self.host_name, self.port, self.socket_address_family, socket.SOCK_DGRAM)[0][4]
+        except Exception as e:
+            print(e)
+            if self.socket is not None:
+                self.socket.close()
+            self._close_selector(wakeup_receive_socket)
+            return
+        self.socket.setblocking(False)
+        for buffer_option in (socket.SO_RCVBUF, socket.SO_SNDBUF):
+            try:
+                self.socket.setsockopt(socket.SOL_SOCKET, buffer_option, udp_socket_buffer_size)
+            except OSError:
+                pass
+        self.selector.register(self.socket, selectors.EVENT_READ, self._udp_read)
+
+        if self.is_host:
+            with self.running_lock:
+                self.running = True
+        else:
+            # The client keeps sending connect packets until the host accepts, see _udp_receive.
+            self.udp_connect_token = random.getrandbits(32)
+            connect_start_time = time.time()
+            next_connect_attempt_time = 0
+
+        while self.running or self.udp_connect_token is not None:
+            now = time.time()
+            if self.udp_connect_token is not None:
+                if now - connect_start_time > udp_connect_timeout:
+                    self.udp_connect_token = None
+                    break
+                if now >= next_connect_attempt_time:
+                    self._udp_send(udp_header.pack(udp_protocol_id, UDP_CONNECT, self.udp_connect_token), host_address)
+                    next_connect_attempt_time = now + udp_connect_attempt_interval
+
+            for key, mask in self.selector.select(udp_update_interval):
+                key.data(mask)
+            now = time.time()
+            for connection in self.get_connections():
+                connection._update(now)
+            if self.network_simulator is not None:
+                self.network_simulator.update(self.socket)
+
+        self._close_selector(wakeup_receive_socket)
+        self.udp_connections = dict()
+
+    def _udp_send(self, data, address):
+        try:
+            if self.network_simulator is not None:
+                self.network_simulator.send(self.socket, data, address)
+            else:
+                self.socket.sendto(data, address)
+        except OSError:
+            # Like a full send buffer, which just drops the packet, the same as the network could.
+            pass
+
+    def _udp_read(self, mask):
+        while True:
+            try:
+                data, address = self.socket.recvfrom(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionResetError:
+                # Windows reports packets that couldn't be delivered to an earlier sendto() this way.
+                continue
+            except OSError:
+                return
+            self._udp_receive(data, address)
+
+    def _udp_receive(self, data, address):
+        if len(data) < udp_header.size or data[:4] != udp_protocol_id:
+            return
+        packet_type, token = udp_header.unpack_from(data)[1:]
+        connection = self.udp_connections.get(address)
+        if packet_type == UDP_CONNECT and self.is_host:
+            if connection is not None and connection.token != token:
+                # The client reconnected from the same address.
+                connection.disconnect()
+                connection = None
+            if connection is None:
+                self._add_connection(self.socket, address, token)
+            # Answered every time, in case the accept packet was lost.
+            self._udp_send(udp_header.pack(udp_protocol_id, UDP_ACCEPT, token), address)
+        elif packet_type == UDP_ACCEPT and not self.is_host:
+            if token == self.udp_connect_token:
+                self.udp_connect_token = None
+                self._add_connection(self.socket, address, token)
+                with self.running_lock:
+                    self.running = True
+        elif connection is not None and connection.token == token:
+            if packet_type == UDP_DATA:
+                connection._receive_packet(data)
+            elif packet_type == UDP_DISCONNECT:
+                connection.disconnect()
+
+    def _udp_close(self, connection):
+        # Send what's still queued, and tell the other side a few times, since any of the packets can be lost.
+        connection._send_packets(time.time())
+        for _ in range(3):
+            self._udp_send(udp_header.pack(udp_protocol_id, UDP_DISCONNECT, connection.token), connection.address)
+        if self.udp_connections.get(connection.address) is connection:
+            del self.udp_connections[connection.address]
+
+    def _run(self):
+        if self.transport == "udp":
+            self._run_udp_loop()
+        elif self.backend == "selectors":
+            self._run_selector_loop()
+        elif self.is_host:
             self._run_server()
         else:
             self._run_client()
@@ -598,6 +1592,423 @@ class DatagramReader:
         return Vec4(self.read_float64(), self.read_float64(), self.read_float64(), self.read_float64())
 
 
+def zigzag_encode(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def zigzag_decode(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+# -- Description --
+# Serialization class used by RPCPeer(compact=True) for values without a precompiled codec, and for custom types.
+# It has the same functions as DatagramWriter, so the write functions given to register_type work with both.
+# The differences are that ints are zigzag varints, strings have a 16 bit length, and bytes and lists have a varint length.
+class CompactWriter:
+    def __init__(self):
+        self.data = bytearray()
+        self.builtin_type_functions = {
+            bool: self.write_bool,
+            int: self.write_varint,
+            float: self.write_float64,
+            str: self.write_string,
+            Vec2: self.write_vec2,
+            Vec3: self.write_vec3,
+            Vec4: self.write_vec4,
+            tuple: self.write_tuple,
+            list: self.write_list,
+            bytes: self.write_blob
+        }
+        self.extra_type_functions = dict()
+
+    def register_type(self, the_type, write_func):
+        self.extra_type_functions[the_type] = write_func
+
+    def clear(self):
+        self.data = bytearray()
+
+    def get_bytes(self):
+        return bytes(self.data)
+
+    def write(self, value):
+        type_of_value = type(value)
+        builtin_converter_func = self.builtin_type_functions.get(type_of_value)
+        if builtin_converter_func is not None:
+            builtin_converter_func(value)
+        else:
+            converter_func = self.extra_type_functions.get(type_of_value)
+            if converter_func is not None:
+                converter_func(self, value)
+            else:
+                raise Exception(f"Unsupported value type for CompactWriter: {type(value).__name__}")
+
+    def write_varint(self, value):
+        self.data += encode_varint(zigzag_encode(value))
+
+    def write_uvarint(self, value):
+        self.data += encode_varint(value)
+
+    def write_string(self, value):
+        b = value.encode("utf-8")
+        self.write_uint16(len(b))
+        self.data += b
+
+    def write_string32(self, value):
+        b = value.encode("utf-8")
+        self.write_int32(len(b))
+        self.data += b
+
+    def write_bool(self, value):
+        self.data += struct.pack(">?", value)
+
+    def write_int8(self, value):
+        self.data += struct.pack(">b", value)
+
+    def write_int16(self, value):
+        self.data += struct.pack(">h", value)
+
+    def write_uint16(self, value):
+        self.data += struct.pack(">H", value)
+
+    def write_int32(self, value):
+        self.data += struct.pack(">i", value)
+
+    def write_int64(self, value):
+        self.data += struct.pack(">q", value)
+
+    def write_float32(self, value):
+        self.data += struct.pack(">f", value)
+
+    def write_float64(self, value):
+        self.data += struct.pack(">d", value)
+
+    def write_blob(self, value):
+        self.data += encode_varint(len(value))
+        self.data += value
+
+    def write_blob32(self, value):
+        self.write_int32(len(value))
+        self.data += value
+
+    def write_vec2(self, value):
+        self.data += struct.pack(">dd", value[0], value[1])
+
+    def write_vec3(self, value):
+        self.data += struct.pack(">ddd", value[0], value[1], value[2])
+
+    def write_vec4(self, value):
+        self.data += struct.pack(">dddd", value[0], value[1], value[2], value[3])
+
+    def write_tuple(self, value):
+        for v in value:
+            self.write(v)
+
+    def write_list(self, value):
+        self.data += encode_varint(len(value))
+        for v in value:
+            self.write(v)
+
+
+# -- Description --
+# Deserialization class used by RPCPeer(compact=True), see CompactWriter.
+# It reads straight from the received bytes or memoryview without copying them.
+class CompactReader:
+    def __init__(self):
+        self.data = None
+        self.offset = 0
+        self.max_list_length = 1000
+        self.builtin_read_functions = {
+            bool: self.read_bool,
+            int: self.read_varint,
+            float: self.read_float64,
+            str: self.read_string,
+            Vec2: self.read_vec2,
+            Vec3: self.read_vec3,
+            Vec4: self.read_vec4,
+            bytes: self.read_blob
+        }
+        self.extra_read_functions = dict()
+
+    def register_type(self, the_type, read_func):
+        self.extra_read_functions[the_type] = read_func
+
+    def set_data(self, data):
+        self.data = data
+        self.offset = 0
+
+    def read(self, value_type, max_list_length=None):
+        if max_list_length is None:
+            max_list_length = self.max_list_length
+        builtin_converter_func = self.builtin_read_functions.get(value_type)
+        if builtin_converter_func is not None:
+            return builtin_converter_func()
+        converter_func = self.extra_read_functions.get(value_type)
+        if converter_func is not None:
+            return converter_func(self)
+        origin_type = typing.get_origin(value_type)
+        if origin_type is tuple:
+            return tuple(self.read(arg_type, max_list_length) for arg_type in typing.get_args(value_type))
+        elif origin_type is list:
+            arg_type = typing.get_args(value_type)[0]
+            if typing.get_origin(arg_type) is list:
+                raise Exception("CompactReader does not support lists of lists.")
+            l = self.read_length(max_list_length)
+            return [self.read(arg_type, max_list_length) for i in range(l)]
+        raise Exception(f"Unsupported value type for CompactReader: {value_type}")
+
+    def read_length(self, max_list_length):
+        l, self.offset = decode_varint(self.data, self.offset)
+        if l > max_list_length:
+            raise ExceedsListLimitException("Received list that exceeds the max list length allowed by the CompactReader.")
+        return l
+
+    def unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def read_varint(self):
+        value, self.offset = decode_varint(self.data, self.offset)
+        return zigzag_decode(value)
+
+    def read_uvarint(self):
+        value, self.offset = decode_varint(self.data, self.offset)
+        return value
+
+    def read_bytes(self, byte_count):
+        if self.offset + byte_count > len(self.data):
+            raise Exception("Not enough data left.")
+        b = bytes(self.data[self.offset:self.offset + byte_count])
+        self.offset += byte_count
+        return b
+
+    def read_string(self):
+        return self.read_bytes(self.read_uint16()).decode("utf-8")
+
+    def read_string32(self):
+        return self.read_bytes(self.read_int32()).decode("utf-8")
+
+    def read_bool(self):
+        return self.unpack(">?")[0]
+
+    def read_int8(self):
+        return self.unpack(">b")[0]
+
+    def read_int16(self):
+        return self.unpack(">h")[0]
+
+    def read_uint16(self):
+        return self.unpack(">H")[0]
+
+    def read_int32(self):
+        return self.unpack(">i")[0]
+
+    def read_int64(self):
+        return self.unpack(">q")[0]
+
+    def read_float32(self):
+        return self.unpack(">f")[0]
+
+    def read_float64(self):
+        return self.unpack(">d")[0]
+
+    def read_blob(self):
+        l, self.offset = decode_varint(self.data, self.offset)
+        return self.read_bytes(l)
+
+    def read_blob32(self):
+        return self.read_bytes(self.read_int32())
+
+    def read_vec2(self):
+        return Vec2(*self.unpack(">dd"))
+
+    def read_vec3(self):
+        return Vec3(*self.unpack(">ddd"))
+
+    def read_vec4(self):
+        return Vec4(*self.unpack(">dddd"))
+
+
+# Struct formats that can be given to a type with typing.Annotated, like Annotated[Vec3, "f32"] or Annotated[int, "u8"].
+# Integer formats on floats and vectors quantize them with the given step size, like Annotated[Vec3, "i16", .01].
+compact_formats = {"i8": "b", "u8": "B", "i16": "h", "u16": "H", "i32": "i", "u32": "I", "i64": "q", "u64": "Q", "f16": "e", "f32": "f", "f64": "d"}
+
+
+# Removes typing.Annotated from a type, including from the types inside list[...] and tuple[...].
+def strip_annotations(value_type):
+    if typing.get_origin(value_type) is typing.Annotated:
+        return strip_annotations(typing.get_args(value_type)[0])
+    if type(value_type) is types.GenericAlias:
+        return types.GenericAlias(typing.get_origin(value_type), tuple(strip_annotations(t) for t in typing.get_args(value_type)))
+    return value_type
+
+
+# How ProcedureCodec writes and reads one value. Fixed size values have a struct format, so several of them can be packed together.
+class CompactField:
+    def __init__(self, fmt=None, encode=None, decode=None, write=None, read=None):
+        self.fmt = fmt
+        self.component_count = len(struct.unpack(">" + fmt, bytes(struct.calcsize(">" + fmt)))) if fmt is not None else 0
+        self.encode = encode    # value -> tuple of the values to pack
+        self.decode = decode    # tuple of unpacked values -> value
+        if fmt is not None:
+            fixed_struct = struct.Struct(">" + fmt)
+            def write(writer, value):
+                writer.data.extend(fixed_struct.pack(*encode(value)))
+            def read(reader):
+                values = fixed_struct.unpack_from(reader.data, reader.offset)
+                reader.offset += fixed_struct.size
+                return decode(values)
+        self.write = write
+        self.read = read
+
+    @classmethod
+    def from_type(cls, value_type):
+        metadata = ()
+        if typing.get_origin(value_type) is typing.Annotated:
+            value_type, *metadata = typing.get_args(value_type)
+
+        fmt = None
+        scale = None
+        if metadata:
+            if metadata[0] not in compact_formats:
+                raise Exception(f"Unsupported format '{metadata[0]}' for {value_type}, use one of: {', '.join(compact_formats)}.")
+            fmt = compact_formats[metadata[0]]
+            if len(metadata) > 1:
+                scale = metadata[1]
+
+        if value_type is bool:
+            return cls("?", lambda v: (v, ), lambda c: c[0])
+        if value_type is int:
+            if fmt is None:
+                return cls(write=CompactWriter.write_varint, read=CompactReader.read_varint)
+            return cls(fmt, lambda v: (v, ), lambda c: c[0])
+        if value_type is float:
+            fmt = fmt or "d"
+            if scale is not None:
+                return cls(fmt, lambda v: (round(v / scale), ), lambda c: c[0] * scale)
+            return cls(fmt, lambda v: (v, ), lambda c: c[0])
+        if isinstance(value_type, type) and issubclass(value_type, (Vec2, Vec3, Vec4)):     # subclasses too, like Color
+            n = 2 if issubclass(value_type, Vec2) else 3 if issubclass(value_type, Vec3) else 4
+            fmt = (fmt or "d") * n
+            if scale is not None:
+                return cls(fmt, lambda v: tuple(round(v[i] / scale) for i in range(n)), lambda c: value_type(*(e * scale for e in c)))
+            return cls(fmt, lambda v: tuple(v[i] for i in range(n)), lambda c: value_type(*c))
+
+        origin_type = typing.get_origin(value_type)
+        if origin_type is tuple:
+            fields = [cls.from_type(t) for t in typing.get_args(value_type)]
+            if all(field.fmt is not None for field in fields):
+                def encode(v):
+                    values = []
+                    for field, e in zip(fields, v, strict=True):
+                        values.extend(field.encode(e))
+                    return tuple(values)
+                def decode(c):
+                    values = []
+                    i = 0
+                    for field in fields:
+                        values.append(field.decode(c[i:i + field.component_count]))
+                        i += field.component_count
+                    return tuple(values)
+                return cls("".join(field.fmt for field in fields), encode, decode)
+            def write(writer, value):
+                for field, e in zip(fields, value, strict=True):
+                    field.write(writer, e)
+            return cls(write=write, read=lambda reader: tuple(field.read(reader) for field in fields))
+        if origin_type is list:
+            if typing.get_origin(typing.get_args(value_type)[0]) is list:
+                raise Exception("CompactReader does not support lists of lists.")
+            field = cls.from_type(typing.get_args(value_type)[0])
+            def write(writer, value):
+                writer.data += encode_varint(len(value))
+                for e in value:
+                    field.write(writer, e)
+            def read(reader):
+                return [field.read(reader) for i in range(reader.read_length(reader.max_list_length))]
+            return cls(write=write, read=read)
+
+        # Strings, bytes and types registered with register_type.
+        return cls(write=lambda writer, value: writer.write(value), read=lambda reader: reader.read(value_type))
+
+
+# -- Description --
+# Precompiled serialization of the arguments of one procedure, used by RPCPeer(compact=True).
+# Consecutive fixed size arguments, starting with the procedure hash, are packed with a single struct.Struct.
+# If all of them have a fixed size, the whole message is one pack() call.
+class ProcedureCodec:
+    def __init__(self, procedure_name_hash, arg_types):
+        self.procedure_name_hash = procedure_name_hash
+        self.arg_types = arg_types
+        self.fields = [CompactField("i", lambda v: (v, ), lambda c: c[0])] + [CompactField.from_type(t) for t in arg_types]
+        self.arg_count = len(arg_types)
+        self.field_index = 0    # the field unpack() was reading, so errors can say which argument was invalid
+
+        # Either (struct, field indices) for a group of fixed size fields or (None, field index).
+        self.segments = []
+        fixed_indices = []
+        for i, field in enumerate(self.fields):
+            if field.fmt is not None:
+                fixed_indices.append(i)
+                continue
+            if fixed_indices:
+                self.segments.append((struct.Struct(">" + "".join(self.fields[j].fmt for j in fixed_indices)), fixed_indices))
+                fixed_indices = []
+            self.segments.append((None, i))
+        if fixed_indices:
+            self.segments.append((struct.Struct(">" + "".join(self.fields[j].fmt for j in fixed_indices)), fixed_indices))
+
+    def pack(self, writer, args):
+        if len(args) != self.arg_count:
+            raise Exception(f"Expected {self.arg_count} arguments, got {len(args)}.")
+        values = (self.procedure_name_hash, ) + tuple(args)
+        if len(self.segments) == 1:
+            return self._pack_fixed(self.segments[0], values)
+        writer.clear()
+        for segment_struct, indices in self.segments:
+            if segment_struct is None:
+                self.fields[indices].write(writer, values[indices])
+            else:
+                writer.data += self._pack_fixed((segment_struct, indices), values)
+        return writer.get_bytes()
+
+    def _pack_fixed(self, segment, values):
+        segment_struct, indices = segment
+        components = []
+        for i in indices:
+            components.extend(self.fields[i].encode(values[i]))
+        return segment_struct.pack(*components)
+
+    # Reads the procedure hash and the arguments from the start of the reader's data. Returns the arguments.
+    def unpack(self, reader):
+        reader.offset = 0
+        values = []
+        for segment_struct, indices in self.segments:
+            if segment_struct is None:
+                self.field_index = indices
+                values.append(self.fields[indices].read(reader))
+                continue
+            self.field_index = indices[0]
+            if reader.offset + segment_struct.size > len(reader.data):   # find the first argument that didn't fit
+                end = reader.offset
+                for i in indices:
+                    self.field_index = i
+                    end += struct.calcsize(">" + self.fields[i].fmt)
+                    if end > len(reader.data):
+                        break
+            components = segment_struct.unpack_from(reader.data, reader.offset)
+            reader.offset += segment_struct.size
+            c = 0
+            for i in indices:
+                self.field_index = i
+                field = self.fields[i]
+                values.append(field.decode(components[c:c + field.component_count]))
+                c += field.component_count
+        return values[1:]
+
+    def failed_arg_type(self):  # the type of the argument the last unpack() failed on
+        return self.arg_types[self.field_index - 1] if self.field_index > 0 else None
+
+
 # Gives a 32 bit hash value (shifted one right (31 bit)) that is the same across runs and devices.
 def procedure_hash(name):
     h = hashlib.sha1(name.encode("utf-8"), usedforsecurity=False).digest()
@@ -610,6 +2021,18 @@ def procedure_hash(name):
 # -- max list length --
 # Lists are supported for remote procedure calls, but to prevent attacks involving giant lists,
 # there is an upper limit on the length, this can be configured, the default is small on purpose.
+# -- compact --
+# With `compact=True`, the arguments are serialized with CompactWriter/CompactReader instead of DatagramWriter/DatagramReader, which makes the messages a lot smaller.
+# ints become zigzag varints and strings get a 16 bit length. Both sides have to use the same setting.
+# The type annotations of the procedures can pick the size of numbers and vectors with typing.Annotated:
+#     def move(connection, time_received, entity_id: Annotated[int, "u16"], position: Annotated[Vec3, "f32"], rotation_y: Annotated[float, "i16", .01])
+# A codec is built for each procedure when it's registered, so if the procedure is registered on the calling side too, the arguments
+# are written with it and the annotations are used. Otherwise the values are written based on their type, like without annotations.
+# Without compact, the annotations are ignored.
+# -- channels --
+# With `transport="udp"`, each procedure can be called on its own Channel, see Peer:
+#     rpc_peer.register_procedure(move, channel=Channel.UNRELIABLE_SEQUENCED)
+# The channel is looked up by the calling side, so the procedure has to be registered there too. Procedures without one are RELIABLE.
 # -- kwargs --
 # The remaining keyword arguments are passed to Peer, see the Peer class for more information.
 # -- Notes --
@@ -618,10 +2041,15 @@ def procedure_hash(name):
 # print_connect, and print_disconnect booleans.
 # See the networking samples on how to use this class.
 class RPCPeer:
-    def __init__(self, max_list_length=16, **kwargs):
+    def __init__(self, max_list_length=16, compact=False, **kwargs):
+        if compact and kwargs.get("on_raw_data") is None:
+            # CompactReader can read the received memoryviews directly.
+            kwargs.setdefault("memoryview_data", True)
         self.peer = Peer(**kwargs)
 
         self.max_list_length = max_list_length
+        self.compact = compact
+        self.interest_manager = None
 
         self.print_connect = True
         self.print_disconnect = True
@@ -669,9 +2097,15 @@ class RPCPeer:
         self.procedures = dict()
         self.procedures[procedure_hash("on_connect")] = []
         self.procedures[procedure_hash("on_disconnect")] = []
+        self.procedure_codecs = dict()
+        self.procedure_channels = dict()
 
-        self.writer = DatagramWriter()
-        self.reader = DatagramReader()
+        if self.compact:
+            self.writer = CompactWriter()
+            self.reader = CompactReader()
+        else:
+            self.writer = DatagramWriter()
+            self.reader = DatagramReader()
 
     def is_using_tls(self):
         return self.peer.is_using_tls()
@@ -685,6 +2119,9 @@ class RPCPeer:
     def update(self, max_events=100):
         self.peer.update(max_events=max_events)
 
+    def flush(self):
+        self.peer.flush()
+
     def is_running(self):
         return self.peer.is_running()
 
@@ -704,7 +2141,7 @@ class RPCPeer:
         self.writer.register_type(the_type, write_func)
         self.reader.register_type(the_type, read_func)
 
-    def register_procedure(self, proc, host_only=False, client_only=False, prefix=None):
+    def register_procedure(self, proc, host_only=False, client_only=False, prefix=None, channel=None):
         func_spec = inspect.getfullargspec(proc)
         if not len(func_spec.args) >= 2:
             raise Exception(f"{proc.__name__} must have at least two arguments, connection and time_received.")
@@ -712,10 +2149,13 @@ class RPCPeer:
         if func_spec.args[0] == "self":
             func_args = func_args[1:]
         arg_types = []
+        annotated_arg_types = []
         for func_arg in func_args:
             func_arg_type = func_spec.annotations.get(func_arg)
             if not func_arg_type is not None:
                 raise Exception(f"Failed to register the '{proc.__name__}' procedure, it's missing a type annotation for the '{func_arg}' argument.")
+            annotated_arg_types.append(func_arg_type)
+            func_arg_type = strip_annotations(func_arg_type)
             if type(func_arg_type) is types.GenericAlias:
                 arg_types.append((typing.get_origin(func_arg_type), typing.get_args(func_arg_type)))
             else:
@@ -731,6 +2171,10 @@ class RPCPeer:
             if not procedure_name_hash not in self.procedures:
                 raise Exception(f"{proc_name} was already registered before.")
             self.procedures[procedure_name_hash] = (proc_name, arg_types, proc, host_only, client_only)
+            if channel is not None:
+                self.procedure_channels[procedure_name_hash] = channel
+            if self.compact:
+                self.procedure_codecs[procedure_name_hash] = ProcedureCodec(procedure_name_hash, annotated_arg_types)
 
     def __getattr__(self, name):
         def remote_procedure(*args):
@@ -738,18 +2182,52 @@ class RPCPeer:
                 raise Exception(f"Remote procedure call '{name}' must have at least one argument, the connection.")
             if not isinstance(args[0], Connection):
                 raise Exception(f"First argument to the RPC '{name}' must be a 'Connection' type.")
-            procedure_name_hash = procedure_hash(name)
-            self.writer.clear()
-            self.writer.write_int32(procedure_name_hash)
-            connection = args[0]
-            for arg in args[1:]:
-                self.writer.write(arg)
-            connection.send(self.writer.get_datagram().getMessage())
+            data = self.serialize_call(name, args[1:])
+            channel = self.procedure_channels.get(procedure_hash(name))
+            if channel is None:
+                return args[0].send(data)
+            return args[0].send(data, channel)
 
         return remote_procedure
 
+    # Calls a remote procedure on all the connections, or the given ones. The arguments are only serialized once.
+    # With relevant_to, only the connections that the interest manager considers that entity relevant to get the call.
+    def broadcast(self, name, *args, connections=None, relevant_to=None):
+        if connections is None:
+            connections = self.get_connections()
+        if relevant_to is not None and self.interest_manager is not None:
+            interested_connections = self.interest_manager.connections_for(relevant_to)
+            connections = [connection for connection in connections if connection in interested_connections]
+        if not connections:
+            return
+        data = self.serialize_call(name, args)
+        channel = self.procedure_channels.get(procedure_hash(name))
+        for connection in connections:
+            if channel is None:
+                connection.send(data)
+            else:
+                connection.send(data, channel)
+
+    def serialize_call(self, name, args):
+        procedure_name_hash = procedure_hash(name)
+        if self.compact:
+            codec = self.procedure_codecs.get(procedure_name_hash)
+            if codec is not None:
+                return codec.pack(self.writer, args)
+        self.writer.clear()
+        self.writer.write_int32(procedure_name_hash)
+        for arg in args:
+            self.writer.write(arg)
+        if self.compact:
+            return self.writer.get_bytes()
+        return self.writer.get_datagram().getMessage()
+
     def rpc_on_data(self, connection, data, time_received):
-        self.reader.set_datagram(p3d.Datagram(data))
+        if self.compact:
+            self.reader.set_data(data)
+            self.reader.max_list_length = self.max_list_length
+        else:
+            self.reader.set_datagram(p3d.Datagram(data))
 
         proc_name = None
         proc_func = None
@@ -770,14 +2248,21 @@ class RPCPeer:
             client_only = proc[4]
             proc_arg_values = []
             arg_type = None
+            codec = None
             try:
-                for t in proc_arg_types:
-                    arg_type = t
-                    v = self.reader.read(t, max_list_length=self.max_list_length)
-                    proc_arg_values.append(v)
-            except ExceedsListLimitException:
-                raise Exception(f"Argument with type '{arg_type}' exceeds max list size limit for procedure '{proc_name}'.")
+                if self.compact:
+                    codec = self.procedure_codecs[procedure_name_hash]
+                    proc_arg_values = codec.unpack(self.reader)
+                else:
+                    for t in proc_arg_types:
+                        arg_type = t
+                        v = self.reader.read(t, max_list_length=self.max_list_length)
+                        proc_arg_values.append(v)
             except Exception as e:
+                if codec is not None:
+                    arg_type = codec.failed_arg_type()
+                if isinstance(e, ExceedsListLimitException):
+                    raise Exception(f"Argument with type '{arg_type}' exceeds max list size limit for procedure '{proc_name}'.")
                 raise Exception(f"Received invalid or missing argument or list/tuple exceeding max length allowed for procedure '{proc_name}', expected a '{arg_type}'.\n    {str(e)}")
         except Exception as e:
             print("WARNING: Received invalid remote procedure call, disconnecting...")
@@ -803,11 +2288,530 @@ class RPCPeer:
 # @rpc(my_rpc_peer_object)
 # def foo(connection, time_received, x: int):
 #     print(x)
-def rpc(peer, host_only=False, client_only=False):
+#
+# With the udp transport, the channel can be picked with @rpc(my_rpc_peer_object, channel=Channel.UNRELIABLE_SEQUENCED).
+def rpc(peer, host_only=False, client_only=False, channel=None):
     def wrapper(f):
-        peer.register_procedure(f, host_only=host_only, client_only=client_only)
+        peer.register_procedure(f, host_only=host_only, client_only=client_only, channel=channel)
     return wrapper
 
 
+# -- Description --
+# Spatial interest management. Decides which entities are relevant to each connection, based on the distance to the connection's observer.
+# The entities are kept in a grid of cells, so only the cells around each observer have to be checked.
+# -- Usage --
+#     peer.interest_manager = InterestGrid(cell_size=16, view_distance=48, axes="xz")
+#     peer.interest_manager.set_observer(connection, player_entity)
+# Replicator then only replicates the relevant entities to each connection. Entities entering or leaving the view distance
+# get spawned or despawned on that client, and on_enter(connection, entity) and on_leave(connection, entity) get called on the host.
+# RPCPeer.broadcast(..., relevant_to=entity) only calls the procedure on the connections the entity is relevant to.
+# -- Notes --
+# Connections without an observer don't get any entities.
+# axes are the axes the distance is measured on, like "xz" for 3D games on the ground or "xy" for 2D games.
+# Entities stay relevant until they're view_distance + leave_margin away, so they don't flicker in and out at the edge.
+# Without a Replicator, call update(entities) with all the entities to keep track of.
+class InterestGrid:
+    def __init__(self, cell_size=16, view_distance=48, leave_margin=None, axes="xyz", on_enter=None, on_leave=None):
+        self.cell_size = cell_size
+        self.view_distance = view_distance
+        self.leave_margin = leave_margin if leave_margin is not None else cell_size / 4
+        self.axes = ["xyz".index(axis) for axis in axes]
+        self.on_enter = on_enter
+        self.on_leave = on_leave
+
+        self.cells = dict()         # cell -> set of entities
+        self.entity_cells = dict()  # entity -> cell
+        self.positions = dict()     # entity -> position on the axes
+        self.observers = dict()     # connection -> entity or position
+        self.relevant_entities = dict()    # connection -> set of entities
+
+    def set_observer(self, connection, target):
+        self.observers[connection] = target
+        self.relevant_entities.setdefault(connection, set())
+
+    def remove_observer(self, connection):
+        self.observers.pop(connection, None)
+        self.relevant_entities.pop(connection, None)
+
+    def relevant(self, connection):
+        return self.relevant_entities.get(connection, ())
+
+    def connections_for(self, entity):
+        return [connection for connection, entities in self.relevant_entities.items() if entity in entities]
+
+    def _position(self, target):
+        if not isinstance(target, (tuple, list, Vec2, Vec3)):
+            target = target.world_position
+        return tuple(target[i] for i in self.axes)
+
+    def _cell(self, position):
+        return tuple(floor(e / self.cell_size) for e in position)
+
+    def update(self, entities):
+        entities = [entity for entity in entities if entity]    # skip destroyed entities
+        current = set(entities)
+        for entity in [entity for entity in self.entity_cells if entity not in current]:
+            self.cells[self.entity_cells.pop(entity)].discard(entity)
+            del self.positions[entity]
+
+        for entity in entities:
+            position = self._position(entity)
+            self.positions[entity] = position
+            cell = self._cell(position)
+            previous_cell = self.entity_cells.get(entity)
+            if cell != previous_cell:
+                if previous_cell is not None:
+                    self.cells[previous_cell].discard(entity)
+                self.cells.setdefault(cell, set()).add(entity)
+                self.entity_cells[entity] = cell
+
+        for connection in list(self.observers):
+            if not connection.is_connected():
+                self.remove_observer(connection)
+                continue
+            self._update_observer(connection)
+
+    def _update_observer(self, connection):
+        previous = self.relevant_entities[connection]
+        target = self.observers[connection]
+        is_position = isinstance(target, (tuple, list, Vec2, Vec3))
+        if target is None or (not is_position and not target):     # no observer, or it got destroyed
+            relevant = set()
+        else:
+            origin = self._position(target)
+            leave_distance = self.view_distance + self.leave_margin
+            cell_range = ceil(leave_distance / self.cell_size)
+            origin_cell = self._cell(origin)
+            relevant = set()
+            for offset in itertools.product(range(-cell_range, cell_range + 1), repeat=len(origin_cell)):
+                cell = self.cells.get(tuple(c + o for c, o in zip(origin_cell, offset, strict=True)))
+                if not cell:
+                    continue
+                for entity in cell:
+                    distance_squared = sum((a - b) ** 2 for a, b in zip(self.positions[entity], origin, strict=True))
+                    max_distance = leave_distance if entity in previous else self.view_distance
+                    if distance_squared <= max_distance ** 2:
+                        relevant.add(entity)
+
+        self.relevant_entities[connection] = relevant
+        if self.on_leave is not None:
+            for entity in previous - relevant:
+                self.on_leave(connection, entity)
+        if self.on_enter is not None:
+            for entity in relevant - previous:
+                self.on_enter(connection, entity)
+
+
+# Used internally by Replicator.
+class ReplicatedClass:
+    def __init__(self, name, fields, spawn, despawn):
+        self.name = name
+        self.field_names = list(fields)
+        self.fields = [CompactField.from_type(t) for t in fields.values()]
+        # Floats and vectors are interpolated on the clients, the other fields change when their snapshot is reached.
+        self.interpolated = []
+        for t in fields.values():
+            t = strip_annotations(t)
+            self.interpolated.append(t is float or (isinstance(t, type) and issubclass(t, (Vec2, Vec3, Vec4))))
+        self.spawn = spawn
+        self.despawn = despawn
+
+
+# Used internally by Replicator, for each entity on the clients.
+class ReplicatedEntity:
+    def __init__(self, entity, replicated_class, tick, values):
+        self.entity = entity
+        self.replicated_class = replicated_class
+        self.tick = tick            # tick of the newest values received
+        self.values = values
+        self.samples = deque()      # (host time, values)
+        self.applied_values = None
+
+
+# Used internally by Replicator, for each connection on the host.
+class ReplicatedConnection:
+    def __init__(self):
+        # id -> last tick the client is known to have the values of, for the entities spawned on it.
+        # Starts at the tick it was spawned in and goes up when the client acks the parts with changes to it.
+        self.acked_ticks = dict()
+        self.sent_parts = dict()    # tick -> ids in each part sent in that tick
+
+
+# -- Description --
+# Replicates the state of entities from the host to the clients on top of an RPCPeer.
+# Every tick, the host takes a snapshot of the registered fields of the added entities. Entities that become relevant to a client
+# are spawned there with a reliable message containing all their fields. After that, the client only gets the fields that changed
+# since the last tick it acknowledged for that entity, as a bitmask followed by the changed values, until it acknowledges them.
+# The bandwidth per client depends on what changes, not on the size of the world.
+# The clients create the entities with the spawn function of their class and interpolate between snapshots.
+# -- Usage --
+# register_class has to be called the same way on the host and the clients:
+#     replicator = Replicator(peer)
+#     replicator.register_class("player", spawn=lambda: Entity(model="cube"), fields={"position": Annotated[Vec3, "f32"], "rotation_y": float, "color": Color})
+# On the host:
+#     replicator.add(player, "player")
+# On both sides, every frame after peer.update():
+#     replicator.update()
+# -- Notes --
+# The fields are serialized with CompactWriter, so they can use typing.Annotated, see RPCPeer.
+# Floats and vectors are interpolated and shown interpolation_delay seconds in the past, so there's usually a snapshot on both sides.
+# Entities that are destroyed on the host are removed automatically, other objects have to be removed with remove().
+# Each tick is split into parts of up to max_part_size bytes, so they fit in a udp packet or under the length header.
+# By default, that's what fits in Peer.mtu with the udp transport, and 32 KB with tcp.
+# The parts with changes are sent on Channel.UNRELIABLE_SEQUENCED and acknowledged one by one, so a lost part only delays the entities in it.
+class Replicator:
+    def __init__(self, rpc_peer, tick_rate=20, interpolation_delay=.1, history_length=32, max_part_size=None):
+        self.rpc_peer = rpc_peer
+        self.tick_rate = tick_rate
+        self.interpolation_delay = interpolation_delay
+        self.history_length = history_length    # acks for parts older than this many ticks are ignored, so their changes get sent again
+        self.max_part_size = max_part_size
+        self.classes = dict()
+
+        # Used by the host.
+        self.tick = 0
+        self.next_tick_time = 0
+        self.next_id = 1
+        self.entities = dict()      # id -> (entity, replicated class)
+        self.ids = dict()           # entity -> id
+        self.snapshot = dict()      # id -> values in the last tick
+        self.changed_ticks = dict()     # id -> last tick each field changed in
+        self.last_changed_ticks = dict()    # id -> last tick any field changed in
+        self.connection_states = dict()     # connection -> ReplicatedConnection
+
+        # Used by the clients.
+        self.replicated_entities = dict()   # id -> ReplicatedEntity
+        self.unacked_parts = dict()         # tick -> bitmask of the parts received, acked in the next update()
+        self.host_connection = None
+        self.clock_offset = None
+
+        self.writer = CompactWriter()
+        self.reader = CompactReader()
+
+        # Spawns and despawns are sent reliably, and in order, so they're only sent once.
+        # The changes are sent until they're acked instead, so lost ones get replaced by newer values.
+        rpc_peer.register_procedure(self.replication_spawn, client_only=True)
+        rpc_peer.register_procedure(self.replication_snapshot, client_only=True, channel=Channel.UNRELIABLE_SEQUENCED)
+        rpc_peer.register_procedure(self.replication_ack, host_only=True, channel=Channel.UNRELIABLE)
+        rpc_peer.register_procedure(self.on_disconnect)
+
+    def register_class(self, name, fields, spawn=None, despawn=None):
+        self.classes[name] = ReplicatedClass(name, fields, spawn, despawn)
+
+    def add(self, entity, class_name):
+        replicated_id = self.next_id
+        self.next_id += 1
+        self.entities[replicated_id] = (entity, self.classes[class_name])
+        self.ids[entity] = replicated_id
+        return replicated_id
+
+    def remove(self, entity):
+        replicated_id = self.ids.pop(entity, None)
+        if replicated_id is not None:
+            del self.entities[replicated_id]
+
+    def get_id(self, entity):
+        return self.ids.get(entity)
+
+    def get_entity(self, replicated_id):
+        if self.rpc_peer.is_hosting():
+            entry = self.entities.get(replicated_id)
+            return entry[0] if entry is not None else None
+        replicated_entity = self.replicated_entities.get(replicated_id)
+        return replicated_entity.entity if replicated_entity is not None else None
+
+    # Decides which entities a connection gets. Uses the peer's interest manager if it has one, otherwise it's all of them.
+    def relevant_ids(self, connection, snapshot):
+        interest_manager = self.rpc_peer.interest_manager
+        if interest_manager is None:
+            return snapshot.keys()
+        return [self.ids[entity] for entity in interest_manager.relevant(connection) if entity in self.ids and self.ids[entity] in snapshot]
+
+    def get_part_size(self):
+        if self.max_part_size is not None:
+            return self.max_part_size
+        peer = self.rpc_peer.peer
+        if peer.transport == "udp":
+            # Leaves room for the procedure hash and the length of the bytes.
+            return peer.mtu - udp_data_header.size - udp_message_header.size - 16
+        return 32 * 1024
+
+    def update(self):
+        if not self.rpc_peer.is_running():
+            # Peer.stop() discards the disconnect events, so clean up here.
+            if self.replicated_entities:
+                self.clear_replicated_entities()
+            self.connection_states.clear()
+            return
+        if self.rpc_peer.is_hosting():
+            now = time.time()
+            if now >= self.next_tick_time:
+                self.next_tick_time = max(self.next_tick_time + 1 / self.tick_rate, now)
+                self.send_snapshots()
+        else:
+            self.send_acks()
+            self.interpolate()
+
+    def take_snapshot(self):
+        previous_snapshot = self.snapshot
+        snapshot = dict()
+        for replicated_id, (entity, replicated_class) in list(self.entities.items()):
+            if not entity:     # destroyed
+                del self.entities[replicated_id]
+                self.ids.pop(entity, None)
+                continue
+            values = tuple(getattr(entity, name) for name in replicated_class.field_names)
+            snapshot[replicated_id] = values
+            previous_values = previous_snapshot.get(replicated_id)
+            if previous_values is None:
+                self.changed_ticks[replicated_id] = [self.tick] * len(values)
+                self.last_changed_ticks[replicated_id] = self.tick
+            elif values != previous_values:
+                changed_ticks = self.changed_ticks[replicated_id]
+                for i in range(len(values)):
+                    if values[i] != previous_values[i]:
+                        changed_ticks[i] = self.tick
+                self.last_changed_ticks[replicated_id] = self.tick
+
+        for replicated_id in previous_snapshot:
+            if replicated_id not in snapshot:
+                del self.changed_ticks[replicated_id]
+                del self.last_changed_ticks[replicated_id]
+        self.snapshot = snapshot
+        return snapshot
+
+    # Writes the records in as many parts as needed to keep each under get_part_size() bytes. Returns a list of (bytes, ids in it).
+    # Every part starts with the tick, its index in the tick and the host time, so it can be read on its own.
+    def split_into_parts(self, host_time, records, write_record):
+        writer = self.writer
+        part_size = self.get_part_size()
+        parts = []
+        ids = []
+
+        def start_part():
+            writer.clear()
+            writer.write_uvarint(self.tick)
+            writer.write_uvarint(len(parts))
+            writer.write_float64(host_time)
+            return len(writer.data)
+
+        header_size = start_part()
+        for record in records:
+            record_start = len(writer.data)
+            write_record(record)
+            if len(writer.data) > part_size and record_start > header_size:
+                record_data = writer.data[record_start:]
+                del writer.data[record_start:]
+                parts.append((writer.get_bytes(), ids))
+                ids = []
+                header_size = start_part()
+                writer.data += record_data
+            ids.append(record[0])
+        if ids:
+            parts.append((writer.get_bytes(), ids))
+        return parts
+
+    def send_snapshots(self):
+        self.tick += 1
+        snapshot = self.take_snapshot()
+        host_time = time.time()
+        if self.rpc_peer.interest_manager is not None:
+            self.rpc_peer.interest_manager.update([entity for entity, replicated_class in self.entities.values()])
+
+        writer = self.writer
+        def write_spawn(record):
+            replicated_id, values = record
+            writer.write_uvarint(replicated_id)
+            if values is None:  # despawn
+                writer.write_string("")
+                return
+            replicated_class = self.entities[replicated_id][1]
+            writer.write_string(replicated_class.name)
+            for field, value in zip(replicated_class.fields, values, strict=True):
+                field.write(writer, value)
+
+        def write_changes(record):
+            replicated_id, mask = record
+            writer.write_uvarint(replicated_id)
+            writer.write_uvarint(mask)
+            values = snapshot[replicated_id]
+            fields = self.entities[replicated_id][1].fields
+            for i in range(len(values)):
+                if mask & (1 << i):
+                    fields[i].write(writer, values[i])
+
+        for connection in self.rpc_peer.get_connections():
+            state = self.connection_states.get(connection)
+            if state is None:
+                state = self.connection_states[connection] = ReplicatedConnection()
+            acked_ticks = state.acked_ticks
+            ids = set(self.relevant_ids(connection, snapshot))
+
+            records = [(replicated_id, None) for replicated_id in acked_ticks if replicated_id not in ids]
+            records.extend((replicated_id, snapshot[replicated_id]) for replicated_id in ids if replicated_id not in acked_ticks)
+            for data, part_ids in self.split_into_parts(host_time, records, write_spawn):
+                if not self.rpc_peer.replication_spawn(connection, data):
+                    break   # send_high_water_mark reached, try the rest next tick
+                for replicated_id in part_ids:
+                    if replicated_id in ids:
+                        acked_ticks[replicated_id] = self.tick
+                    else:
+                        del acked_ticks[replicated_id]
+
+            records = []
+            for replicated_id in ids:
+                acked_tick = acked_ticks.get(replicated_id)
+                if acked_tick is None or self.last_changed_ticks[replicated_id] <= acked_tick:
+                    continue
+                mask = 0
+                for i, changed_tick in enumerate(self.changed_ticks[replicated_id]):
+                    if changed_tick > acked_tick:
+                        mask |= 1 << i
+                records.append((replicated_id, mask))
+
+            sent_parts = []
+            for data, part_ids in self.split_into_parts(host_time, records, write_changes):
+                self.rpc_peer.replication_snapshot(connection, data)
+                sent_parts.append(part_ids)
+            if sent_parts:
+                state.sent_parts[self.tick] = sent_parts
+            state.sent_parts.pop(self.tick - self.history_length, None)
+
+    def replication_ack(self, connection, time_received, tick: int, parts: bytes):
+        state = self.connection_states.get(connection)
+        if state is None or tick not in state.sent_parts:
+            return
+        acked_parts = int.from_bytes(parts, "little")
+        acked_ticks = state.acked_ticks
+        for i, ids in enumerate(state.sent_parts[tick]):
+            if not acked_parts & (1 << i):
+                continue
+            for replicated_id in ids:
+                if acked_ticks.get(replicated_id, tick) < tick:
+                    acked_ticks[replicated_id] = tick
+
+    def read_part_header(self, connection, time_received, data):
+        reader = self.reader
+        reader.set_data(data)
+        tick = reader.read_uvarint()
+        part = reader.read_uvarint()
+        host_time = reader.read_float64()
+        self.host_connection = connection
+
+        offset = time_received - host_time
+        if self.clock_offset is None or offset < self.clock_offset:
+            self.clock_offset = offset
+        else:
+            self.clock_offset += (offset - self.clock_offset) * .05
+        return tick, part, host_time
+
+    def replication_spawn(self, connection, time_received, data: bytes):
+        tick, part, host_time = self.read_part_header(connection, time_received, data)
+        reader = self.reader
+        while reader.offset < len(data):
+            replicated_id = reader.read_uvarint()
+            class_name = reader.read_string()
+            if not class_name:
+                self._despawn(replicated_id)
+                continue
+            replicated_class = self.classes[class_name]
+            values = tuple(field.read(reader) for field in replicated_class.fields)
+            entity = replicated_class.spawn() if replicated_class.spawn is not None else None
+            replicated_entity = ReplicatedEntity(entity, replicated_class, tick, values)
+            self.replicated_entities[replicated_id] = replicated_entity
+            self._apply(replicated_entity, values)
+            replicated_entity.samples.append((host_time, values))
+
+    def replication_snapshot(self, connection, time_received, data: bytes):
+        tick, part, host_time = self.read_part_header(connection, time_received, data)
+        reader = self.reader
+        while reader.offset < len(data):
+            replicated_id = reader.read_uvarint()
+            mask = reader.read_uvarint()
+            replicated_entity = self.replicated_entities.get(replicated_id)
+            if replicated_entity is None:
+                # Its spawn message didn't arrive yet, so the fields can't be read. Without an ack, the host sends the rest of the part again.
+                return
+            values = list(replicated_entity.values)
+            for i, field in enumerate(replicated_entity.replicated_class.fields):
+                if mask & (1 << i):
+                    values[i] = field.read(reader)
+            if tick <= replicated_entity.tick:     # newer values arrived first
+                continue
+            replicated_entity.tick = tick
+            replicated_entity.values = tuple(values)
+            samples = replicated_entity.samples
+            if samples and samples[-1][0] < host_time - 1.5 / self.tick_rate:
+                # It didn't change for a while, so hold the old values until the snapshot before this one, instead of slowly moving from them.
+                samples.append((host_time - 1 / self.tick_rate, samples[-1][1]))
+            samples.append((host_time, replicated_entity.values))
+
+        self.unacked_parts[tick] = self.unacked_parts.get(tick, 0) | (1 << part)
+        for old_tick in [t for t in self.unacked_parts if t <= tick - self.history_length]:
+            del self.unacked_parts[old_tick]
+
+    def send_acks(self):
+        if self.host_connection is None:
+            return
+        for tick, parts in self.unacked_parts.items():
+            self.rpc_peer.replication_ack(self.host_connection, tick, parts.to_bytes((parts.bit_length() + 7) // 8, "little"))
+        self.unacked_parts.clear()
+
+    def on_disconnect(self, connection, time_disconnected):
+        self.connection_states.pop(connection, None)
+        if self.rpc_peer.interest_manager is not None:
+            self.rpc_peer.interest_manager.remove_observer(connection)
+        if not self.rpc_peer.is_hosting():
+            self.clear_replicated_entities()
+
+    def clear_replicated_entities(self):
+        for replicated_id in list(self.replicated_entities):
+            self._despawn(replicated_id)
+        self.unacked_parts.clear()
+        self.host_connection = None
+        self.clock_offset = None
+
+    def interpolate(self):
+        if self.clock_offset is None:
+            return
+        render_time = time.time() - self.clock_offset - self.interpolation_delay
+        for replicated_entity in self.replicated_entities.values():
+            samples = replicated_entity.samples
+            while len(samples) >= 2 and samples[1][0] <= render_time:
+                samples.popleft()
+            start_time, start_values = samples[0]
+            if len(samples) == 1 or render_time <= start_time:
+                self._apply(replicated_entity, start_values)
+                continue
+            end_time, end_values = samples[1]
+            t = min((render_time - start_time) / (end_time - start_time), 1)
+            values = []
+            for interpolated, a, b in zip(replicated_entity.replicated_class.interpolated, start_values, end_values, strict=True):
+                if interpolated:
+                    values.append(lerp(a, b, t))
+                else:
+                    values.append(a if t < 1 else b)
+            self._apply(replicated_entity, values)
+
+    def _apply(self, replicated_entity, values):
+        if replicated_entity.entity is None:
+            return
+        applied_values = replicated_entity.applied_values
+        for i, name in enumerate(replicated_entity.replicated_class.field_names):
+            if applied_values is None or values[i] != applied_values[i]:
+                setattr(replicated_entity.entity, name, values[i])
+        replicated_entity.applied_values = tuple(values)
+
+    def _despawn(self, replicated_id):
+        replicated_entity = self.replicated_entities.pop(replicated_id, None)
+        if replicated_entity is None or replicated_entity.entity is None:
+            return
+        if replicated_entity.replicated_class.despawn is not None:
+            replicated_entity.replicated_class.despawn(replicated_entity.entity)
+        else:
+            from ursina.destroy import destroy
+            destroy(replicated_entity.entity)
+
+
 # Prevent error message spam from Panda3D network module.
 p3d.loadPrcFileData("", "notify-level-net fatal")
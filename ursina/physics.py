@@ -134,6 +134,46 @@ def raycast(origin, direction: Vec3 = Vec3(0, 0, 1), distance=9999,
 
 
 
+def raycast_batch(origins, directions, distances=9999, ignore:list=None):    # same as ursina.raycast_batch, but for the bullet world
+    import numpy as np
+    from panda3d.core import LPoint3f
+
+    from ursina.raycast import _raycast_batch_results
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+    directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+    count = len(origins)
+    distances = np.broadcast_to(np.asarray(distances, dtype=np.float64), (count, )).copy()
+    lengths = np.linalg.norm(directions, axis=1)
+    ends = origins + directions / np.where(lengths == 0, 1, lengths)[:, None] * distances[:, None]
+
+    results = _raycast_batch_results(count, distances)
+    entities = []
+    entity_ids = dict()
+    world = physics_handler.world
+    ignored_nodes = {obj.node if isinstance(obj, PhysicsEntity) else obj for obj in ignore} if ignore else None
+
+    for i in range(count):
+        from_pos, to_pos = LPoint3f(*origins[i]), LPoint3f(*ends[i])
+        if not ignored_nodes:
+            result = world.rayTestClosest(from_pos, to_pos)
+            if not result.hasHit():
+                continue
+        else:
+            hits = [h for h in world.rayTestAll(from_pos, to_pos).getHits() if h.getNode() not in ignored_nodes]
+            if not hits:
+                continue
+            result = min(hits, key=lambda h: h.getHitFraction())
+
+        node = result.getNode()
+        if node not in entity_ids:
+            entity_ids[node] = len(entities)
+            entities.append(node)
+        results[i] = (True, result.getHitFraction() * distances[i], result.getHitPos(), result.getHitNormal(), entity_ids[node])
+
+    return results, entities
+
+
+
 from ursina import Vec2, Default
 @generate_properties_for_class()
 class PhysicsEntity:
@@ -168,6 +208,14 @@ class PhysicsEntity:
     _list_to_vec = Entity._list_to_vec
     enable = Entity.enable
     disable = Entity.disable
+    update_getter = Entity.update_getter
+    update_setter = Entity.update_setter
+    update_deleter = Entity.update_deleter
+    input_getter = Entity.input_getter
+    input_setter = Entity.input_setter
+    input_deleter = Entity.input_deleter
+    input_keys_getter = Entity.input_keys_getter
+    input_keys_setter = Entity.input_keys_setter
     add_script = Entity.add_script
 
     def __init__(self, mass=0, kinematic=None, friction=.5, mask=0x1, collider=None, world=physics_handler.world, lock_axis=Vec3.zero, lock_rotation=Vec3.zero,
@@ -228,7 +276,7 @@ class PhysicsEntity:
         self.scripts = []
         self.animations = []
         self.animate = self.entity.animate
-        scene.entities.append(self)
+        scene._add_entity(self)
         self.forward = self.entity.forward
         self.back = self.entity.back
         self.right = self.entity.right
@@ -278,6 +326,8 @@ class PhysicsEntity:
 
     def has_disabled_ancestor(self):
         return self.entity.has_disabled_ancestor()
+    def effective_enabled_getter(self):
+        return self.entity.effective_enabled
 
 
     def parent_setter(self, value):
@@ -499,6 +549,7 @@ class PhysicsEntity:
         return getattr(self, '_enabled', True)
     def enabled_setter(self, value):
         self._enabled = value
+        scene._refresh_dispatch(self)
         if hasattr(self, 'entity'):
             self.entity.enabled = value
         if hasattr(self, 'rb') and hasattr(self, 'world'):
@@ -5,8 +5,7 @@ import ast
 import time
 from pathlib import Path
 
-from ursina import Entity, application, camera, mesh_importer, print_on_screen, scene, texture_importer, window
-from ursina.mesh_importer import load_model
+from ursina import Entity, application, asset_index, camera, conversion_cache, mesh_importer, print_on_screen, scene, texture_importer, window
 
 
 def is_valid_python(code):
@@ -176,44 +175,16 @@ class HotReloader(Entity):
         changed_models = []
 
         for base_name in unique_names:
-            m = load_model(f'{base_name}.blend')
-            if m:
+            source = conversion_cache.source_of(conversion_cache.output_path(base_name))   # the file the .bam was made from, if any
+            if source is None or not source.exists():
+                source = next((e[0] for e in asset_index.search(base_name, mesh_importer._model_folders(None), ('.blend', '.obj'))), None)
+            if source is None:
+                continue
+
+            _, _, changed = conversion_cache.update(source, base_name)  # only converts it if the file changed
+            if changed:
+                mesh_importer.imported_meshes.pop(base_name, None)
                 changed_models.append(base_name)
-            # m.save()
-            if not m:
-                m = load_model(f'{base_name}.obj', use_deepcopy=True)
-                if m:
-                    m.save(f'{base_name}.bam')
-                    changed_models.append(base_name)
-            # matches = [e for e in application.asset_folder.glob(f'**/{name}.blend')]
-
-            # if not matches or not application.blender_paths:    # reload bam files converted from obj
-            #     matches = [e for e in application.asset_folder.glob(f'**/{name}.obj')]
-            #     if matches:
-            #         m = mesh_importer.load_model(f'{matches[0]}.obj')
-            #         if m:
-            #             print('-----------------update bam:', f'{matches[0]}.obj --> {matches[0]}.bam')
-            #             m.save(f'{matches[0]}.bam')
-            #             mesh_importer.imported_meshes[name] = m
-            #             changed_models.append(name)
-            #             continue
-
-            # if not matches:
-            #     continue
-
-            # model_path = matches[0]
-            # # ignore internal models
-            # if model_path.parent == application.internal_models_folder or '/build/' in str(model_path):
-            #     continue
-
-            # if name in mesh_importer.imported_meshes:
-            #     mesh_importer.imported_meshes.pop(name, None)
-
-            # # print('model is made from .blend file:', model_path)
-            # mesh_importer.blend_to_obj(model_path)
-            # mesh_importer.obj_to_ursinamesh(application.models_compressed_folder, application.models_compressed_folder, return_mesh=True, save_to_file=False, delete_obj=True).save(f'{name}.bam')
-            # # print(f'compressed {name}.blend sucessfully')
-            # changed_models.append(name)
 
 
         for e in entities:
@@ -4,6 +4,8 @@ import os
 import psutil
 
 from ursina import Text, Vec2, camera, window
+from ursina.mesh_importer import imported_meshes
+from ursina.texture_importer import imported_textures
 
 
 def size(size_bytes):
@@ -26,6 +28,7 @@ class MemoryCounter(Text):
         self.process = psutil.Process(os.getpid())
         self.i = 0
         self.text = 'eofiwjeofiwejf'
+        self.show_cache_stats = True    # also show how much memory the loaded models and textures use, from mesh_importer.imported_meshes and texture_importer.imported_textures
 
         for key, value in kwargs.items():
             setattr(self, key, value)
@@ -33,7 +36,12 @@ class MemoryCounter(Text):
     def update(self):
         self.i += 1
         if self.i > 10:
-            self.text = str(size(self.process.memory_info().rss))
+            lines = [str(size(self.process.memory_info().rss)), ]
+            if self.show_cache_stats:
+                for cache in (imported_meshes, imported_textures):
+                    budget = f' / {size(cache.budget)}' if cache.budget is not None else ''
+                    lines.append(f'{cache.name}: {size(cache.resident_bytes)}{budget}, {cache.hits} hits, {cache.misses} misses, {cache.evictions} evicted')
+            self.text = '\n'.join(reversed(lines))
 
             self.i = 0
 
@@ -43,6 +51,7 @@ if __name__ == '__main__':
     app = Ursina()
     MemoryCounter()
     '''
-    Displays the amount of memory used in the bottom right corner
+    Displays the amount of memory used in the bottom right corner,
+    and the hits, misses, evictions and memory used by the model and texture caches.
     '''
     app.run()
@@ -70,7 +70,7 @@ def bake_to_vertex_animation_texture(entity, name, seed, fps=30):   # bakes all
     entity.parent = bake_parent
 
     duration_per_frame = 1 / fps
-    total_duration = max(seq.func_call_time[-1] for seq in animations)
+    total_duration = max(seq.duration for seq in animations)
     num_frames = int(total_duration / duration_per_frame)
     # print('------------------total_duration:', total_duration, 'num animations:', len(animations), 'num_frames:', num_frames)
     if num_frames <= 0:
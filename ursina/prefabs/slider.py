@@ -65,7 +65,7 @@ class Slider(Entity):
             self.knob.lock = (0,1,1)
             self.knob.text_entity.y = height/2
 
-        scene.entities.append(self)
+        scene._add_entity(self)
 
 
     def value_getter(self):
@@ -1,4 +1,5 @@
 import builtins
+from math import inf, nan
 from ursina.entity import Entity
 from ursina.mesh import Mesh
 from ursina.scene import instance as scene
@@ -38,15 +39,19 @@ def raycast(origin, direction:Vec3=(0,0,1), distance=9999, traverse_target:Entit
         temp.look_at(_raycaster.position + direction)
         destroy(temp, 1/30)
 
-    _raycaster._picker.traverse(traverse_target)      #HALF!
+    if traverse_target is scene and scene.collision_grid is not None:   # only test the colliders along the ray
+        direction = Vec3(*direction).normalized()
+        candidates = scene.collision_grid.entities_along_ray(origin, direction, distance)
+        entries = scene.collision_grid.traverse(_raycaster._picker, _raycaster._pq, candidates, ignore)
+    else:
+        _raycaster._picker.traverse(traverse_target)      #HALF!
+        _raycaster._pq.sort_entries()
+        entries = _raycaster._pq.getEntries()
 
-    if _raycaster._pq.get_num_entries() == 0:
+    if len(entries) == 0:
         _raycaster.hit = HitInfo(hit=False, distance=distance)
         return _raycaster.hit
 
-
-    _raycaster._pq.sort_entries()
-    entries = _raycaster._pq.getEntries()
     entities = [e.get_into_node_path().parent for e in entries]
 
     entries = [        # filter out ignored entities
@@ -78,6 +83,124 @@ def raycast(origin, direction:Vec3=(0,0,1), distance=9999, traverse_target:Entit
     return hit_info
 
 
+_batch_root = scene.attach_new_node('_raycast_batch')  # parent of one CollisionNode per ray, reused between calls
+_batch_nodes = []
+_batch_traverser = CollisionTraverser()
+_batch_queue = CollisionHandlerQueue()
+
+
+def _raycast_batch_results(count, distances):   # the structured array returned by raycast_batch, with every ray set to no hit
+    import numpy as np
+    results = np.zeros(count, dtype=[('hit', np.bool_), ('distance', np.float32), ('point', np.float32, 3), ('normal', np.float32, 3), ('entity_id', np.int32)])
+    results['distance'] = distances
+    results['entity_id'] = -1
+    return results
+
+
+def raycast_batch(origins, directions, distances=9999, traverse_target:Entity=scene, ignore:list=None):
+    # casts many rays in one go. origins and directions are (n, 3) arrays, distances is a number or an (n, ) array.
+    # returns (results, entities), where results is a numpy structured array with the fields hit, distance, point, normal and entity_id.
+    # entity_id is the index of the hit entity in entities, or -1 if the ray didn't hit anything. point and normal are in world space.
+    import numpy as np
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+    directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+    count = len(origins)
+    distances = np.broadcast_to(np.asarray(distances, dtype=np.float64), (count, )).copy()
+    lengths = np.linalg.norm(directions, axis=1)
+    directions = directions / np.where(lengths == 0, 1, lengths)[:, None]
+
+    results = _raycast_batch_results(count, distances)
+    entities = []
+    if not count:
+        return results, entities
+    ignore = set(ignore) if ignore else ()
+
+    # a CollisionRay per ray. CollisionSegment would cull by distance, but box into segment gives different surface points than box into ray.
+    while len(_batch_nodes) < count:
+        node = CollisionNode(str(len(_batch_nodes)))
+        node.set_into_collide_mask(0)
+        node.add_solid(CollisionRay())
+        _batch_nodes.append(_batch_root.attach_new_node(node))
+    origin_list, direction_list, distance_list = origins.tolist(), directions.tolist(), distances.tolist()   # numpy scalars are slow to do math on one by one
+    for i in range(count):
+        _batch_nodes[i].node().set_solid(0, CollisionRay(*origin_list[i], *direction_list[i]))
+
+    nearest = [inf, ] * count
+    hit_entries = [None, ] * count
+
+    def add_entries(ray_indices=None):
+        for entry in _batch_queue.get_entries():
+            i = int(entry.get_from_node().name)
+            if ray_indices is None:     # traversed the whole target, so filter like raycast() does
+                entity = entry.get_into_node_path().parent
+                if entity not in scene.collidables or entity in ignore:
+                    continue
+            point = entry.get_surface_point(scene)
+            origin = origin_list[i]
+            dist = ((point[0]-origin[0])**2 + (point[1]-origin[1])**2 + (point[2]-origin[2])**2) ** .5
+            if dist < nearest[i] and dist <= distance_list[i]:
+                nearest[i] = dist
+                hit_entries[i] = entry
+
+    _batch_traverser.clear_colliders()
+    if traverse_target is scene and scene.collision_grid is not None:
+        # find the candidates along each ray, then traverse each candidate once with all the rays that might hit it
+        grid = scene.collision_grid
+        pair_rays, pair_entities = [], []
+        for i in range(count):
+            candidates = grid.entities_along_ray(origin_list[i], direction_list[i], distance_list[i], cull=False)
+            pair_entities.extend(candidates)
+            pair_rays.extend([i, ] * len(candidates))
+
+        # skip the pairs where the ray misses the candidate's bounding sphere, for all of them at once
+        no_sphere = (nan, nan, nan, nan)
+        spheres = np.array([grid.spheres.get(e, no_sphere) for e in pair_entities], dtype=np.float64).reshape(-1, 4)
+        pair_rays = np.array(pair_rays, dtype=np.intp)
+        pair_origins = origins[pair_rays]
+        pair_directions = directions[pair_rays]
+        t = np.clip(np.einsum('ij,ij->i', spheres[:, :3] - pair_origins, pair_directions), 0, distances[pair_rays])
+        offsets = spheres[:, :3] - (pair_origins + pair_directions * t[:, None])
+        keep = np.isnan(spheres[:, 3]) | (np.einsum('ij,ij->i', offsets, offsets) <= spheres[:, 3] ** 2)
+
+        rays_per_candidate = dict()
+        for pair in np.flatnonzero(keep).tolist():
+            entity = pair_entities[pair]
+            if entity in rays_per_candidate:
+                rays_per_candidate[entity].append(int(pair_rays[pair]))
+            else:
+                rays_per_candidate[entity] = [int(pair_rays[pair]), ]
+
+        for entity, ray_indices in rays_per_candidate.items():
+            if entity in ignore or not entity.effective_enabled:
+                continue
+            node_path = getattr(entity.collider, 'node_path', None)
+            if node_path is None or node_path.is_empty():
+                continue
+            for i in ray_indices:
+                _batch_traverser.add_collider(_batch_nodes[i], _batch_queue)
+            _batch_traverser.traverse(node_path)
+            _batch_traverser.clear_colliders()
+            add_entries(ray_indices)
+    else:
+        for i in range(count):
+            _batch_traverser.add_collider(_batch_nodes[i], _batch_queue)
+        _batch_traverser.traverse(traverse_target)
+        _batch_traverser.clear_colliders()
+        add_entries()
+
+    entity_ids = dict()
+    for i, entry in enumerate(hit_entries):
+        if entry is None:
+            continue
+        entity = entry.get_into_node_path().parent.getPythonTag('Entity')
+        if entity not in entity_ids:
+            entity_ids[entity] = len(entities)
+            entities.append(entity)
+        results[i] = (True, nearest[i], entry.get_surface_point(scene), entry.get_surface_normal(scene).normalized(), entity_ids[entity])
+
+    return results, entities
+
+
 if __name__ == '__main__':
     from ursina import *
     from ursina import Ursina, Entity, held_keys, time, duplicate, camera, EditorCamera
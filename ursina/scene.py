@@ -1,14 +1,24 @@
+from itertools import count
 from panda3d.core import NodePath, Fog
 from ursina import color
+from ursina.array_tools import OrderedSet
+from ursina.collision_grid import CollisionGrid
 
 
 class Scene(NodePath):
     def __init__(self):
         super().__init__('scene')
         self.entities = []
-        self._entities_marked_for_removal = []
+        self._entities_marked_for_removal = set()   # destroyed entities get removed from scene.entities at the start of the next update
         self.collidables = set()
-        self._children = []
+        self.collision_grid = CollisionGrid(root=self)    # broad-phase for raycast, boxcast and intersects
+        self.children = []
+        self._entity_counter = count()  # creation order of scene entities, used to keep the registries below in the same order as scene.entities
+        self._updaters = dict()         # entities with an update function or scripts, mapped to their creation order. Ursina._update only visits these.
+        self._input_listeners = dict()  # entities with an input function or scripts, without input_keys. Ursina.input only visits these and the ones in _keyed_input_listeners.
+        self._keyed_input_listeners = dict()    # key -> {entity: creation order}, for entities with input_keys set
+        self._dispatch_needs_sorting = False
+        self._shader_users = dict()     # shader -> {entity: None}. used to apply shader.continuous_input without going through every entity.
         self.fog = Fog('fog')
         self.setFog(self.fog)
         self.fog_color = color.clear
@@ -34,6 +44,119 @@ class Scene(NodePath):
         application.sequences.clear()
 
 
+    @property
+    def entities(self):
+        return self._entities
+
+    @entities.setter
+    def entities(self, value):  # stored as an OrderedSet, so adding, removing and checking if an entity is in the scene is O(1)
+        self._entities = value if isinstance(value, OrderedSet) else OrderedSet(value)
+
+
+    @property
+    def collision_grid(self):
+        return self._collision_grid
+
+    @collision_grid.setter
+    def collision_grid(self, value):    # set to None to make raycast, boxcast and intersects traverse the whole scene instead. a new grid gets filled with the current collidables.
+        self._collision_grid = value
+        if value is not None:
+            for entity in self.collidables:
+                value.add(entity)
+
+
+    def _add_entity(self, entity):
+        self.entities.append(entity)
+        entity._scene_index = next(self._entity_counter)
+        self._refresh_dispatch(entity)
+
+
+    def _refresh_dispatch(self, entity):    # call when something that decides if the entity should get update() or input() changes, like .update, .input, .input_keys, .enabled, .scripts or .shader
+        index = getattr(entity, '_scene_index', None)
+        if index is None:   # not in scene.entities, or destroyed
+            return
+
+        enabled = entity.enabled
+        has_scripts = bool(getattr(entity, 'scripts', None))
+        self._set_registered(self._updaters, entity, index, enabled and (has_scripts or callable(getattr(entity, 'update', None))))
+
+        # entities with input_keys are only registered for those keys, so other key presses won't visit them at all
+        listens = enabled and (has_scripts or callable(getattr(entity, 'input', None)))
+        input_keys = getattr(entity, 'input_keys', None)
+        previous_input_keys = getattr(entity, '_dispatch_input_keys', None)
+        if previous_input_keys is not None and (not listens or input_keys != previous_input_keys):
+            for key in previous_input_keys:
+                self._keyed_input_listeners.get(key, {}).pop(entity, None)
+            entity._dispatch_input_keys = None
+
+        self._set_registered(self._input_listeners, entity, index, listens and input_keys is None)
+        if listens and input_keys is not None:
+            for key in input_keys:
+                self._set_registered(self._keyed_input_listeners.setdefault(key, dict()), entity, index, True)
+            entity._dispatch_input_keys = input_keys
+
+        shader = getattr(entity, 'shader', None)
+        if not hasattr(shader, 'continuous_input'):
+            shader = None
+        previous_shader = getattr(entity, '_dispatch_shader', None)
+        if shader is previous_shader:
+            return
+        if previous_shader is not None:
+            self._shader_users.get(previous_shader, {}).pop(entity, None)
+        if shader is not None:
+            self._shader_users.setdefault(shader, dict())[entity] = None
+        entity._dispatch_shader = shader
+
+
+    def _set_registered(self, registry, entity, index, value):
+        if not value:
+            registry.pop(entity, None)
+            return
+
+        if entity not in registry:
+            if registry and index < next(reversed(registry.values())):
+                self._dispatch_needs_sorting = True  # re-enabled an older entity, so sort before next use to keep the order of scene.entities
+            registry[entity] = index
+
+
+    def _remove_from_dispatch(self, entity):
+        self._updaters.pop(entity, None)
+        self._input_listeners.pop(entity, None)
+        for key in getattr(entity, '_dispatch_input_keys', None) or ():
+            self._keyed_input_listeners.get(key, {}).pop(entity, None)
+        entity._dispatch_input_keys = None
+
+        previous_shader = getattr(entity, '_dispatch_shader', None)
+        if previous_shader is not None:
+            self._shader_users.get(previous_shader, {}).pop(entity, None)
+        entity._dispatch_shader = None
+        entity._scene_index = None
+
+
+    def _sort_dispatch(self):
+        def _sorted(registry):
+            return dict(sorted(registry.items(), key=lambda item: item[1]))
+
+        self._updaters = _sorted(self._updaters)
+        self._input_listeners = _sorted(self._input_listeners)
+        self._keyed_input_listeners = {key: _sorted(registry) for key, registry in self._keyed_input_listeners.items() if registry}
+        self._dispatch_needs_sorting = False
+
+
+    def _get_input_listeners(self, keys):  # entities that should get input for any of the keys, in the order of scene.entities
+        if self._dispatch_needs_sorting:
+            self._sort_dispatch()
+
+        keyed = [self._keyed_input_listeners[key] for key in keys if key in self._keyed_input_listeners]
+        if not keyed:
+            return tuple(self._input_listeners)
+
+        listeners = dict(self._input_listeners)
+        for registry in keyed:
+            listeners.update(registry)
+        return sorted(listeners, key=listeners.__getitem__)
+
+
     @property
     def fog_color(self):
         return self._fog_color
@@ -87,7 +210,7 @@ class Scene(NodePath):
 
     @children.setter
     def children(self, value):
-        self._children = value
+        self._children = value if isinstance(value, OrderedSet) else OrderedSet(value)
 
 
 instance = Scene()
@@ -0,0 +1,140 @@
+'''
+Binary version of the .ursinamesh format. Much faster to load than the text version, since the arrays are read straight from the file with mmap instead of being parsed.
+Mesh.save(name, binary=True) writes it and load_model() reads both versions, so they can use the same .ursinamesh extension.
+
+layout, little-endian:
+    header:     magic (8 bytes), version (uint16), number of sections (uint16)
+    mesh info:  mode (uint8), static (uint8), render_points_in_3d (uint8), padding, thickness (float32), vertex_buffer_length (uint32)
+    sections:   one per array: name (4 bytes), dtype (2 bytes), columns (uint16), offset (uint64), size in bytes (uint64)
+    data:       the arrays, each one starting at a multiple of 16 bytes
+
+sections:
+    vert, colr, uvs_, norm:     float32 vertices, colors, uvs and normals, one row per vertex
+    tris:   uint32 triangles. columns is 0 if they're flat or have different lengths, in which case tlen has the length of each of them.
+    vbuf, vfmt:     vertex_buffer and vertex_buffer_format, as bytes
+'''
+import mmap
+import numbers
+import struct
+
+MAGIC = b'URSMESH\x00'
+VERSION = 1
+_header = struct.Struct('<8sHH')
+_mesh_info = struct.Struct('<BBBxfI')
+_section = struct.Struct('<4s2sHQQ')
+_modes = ('triangle', 'ngon', 'quad', 'line', 'point', 'tristrip')
+_alignment = 16
+
+
+def is_binary_ursinamesh(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_binary_ursinamesh(mesh, path):
+    import numpy as np
+
+    from ursina.mesh import Mesh
+
+    arrays = []     # (name, numpy array, columns)
+    for name, data, columns in (('vert', mesh.vertices, 3), ('colr', mesh.colors, 4), ('uvs_', mesh.uvs, 2), ('norm', mesh.normals, 3)):
+        if data is not None and len(data) > 0:
+            arrays.append((name, np.asarray(Mesh._as_buffer(data, 'f')), columns))
+
+    triangles = mesh.triangles
+    if triangles is not None and len(triangles) > 0:
+        if hasattr(triangles, '__array_interface__') or isinstance(triangles[0], numbers.Real):
+            triangles = np.asarray(triangles, dtype=np.uint32)
+            arrays.append(('tris', triangles.reshape(-1), triangles.shape[1] if triangles.ndim == 2 else 0))
+        else:
+            lengths = np.fromiter((len(e) for e in triangles), dtype=np.uint32, count=len(triangles))
+            flat_triangles = np.asarray(Mesh._as_buffer(triangles, 'I'))
+            if (lengths == lengths[0]).all():
+                arrays.append(('tris', flat_triangles, int(lengths[0])))
+            else:
+                arrays.append(('tris', flat_triangles, 0))
+                arrays.append(('tlen', lengths, 0))
+
+    vertex_buffer_length = 0
+    if mesh.vertex_buffer is not None:
+        arrays.append(('vbuf', np.frombuffer(memoryview(mesh.vertex_buffer).cast('B'), dtype=np.uint8), 0))
+        arrays.append(('vfmt', np.frombuffer(mesh.vertex_buffer_format.encode(), dtype=np.uint8), 0))
+        vertex_buffer_length = mesh.vertex_buffer_length
+
+    offset = _header.size + _mesh_info.size + _section.size * len(arrays)
+    sections = []
+    for name, array, columns in arrays:
+        offset += -offset % _alignment
+        sections.append((name, array, columns, offset))
+        offset += array.nbytes
+
+    mode = mesh.mode.value if hasattr(mesh.mode, 'value') else mesh.mode
+    with open(path, 'wb') as f:
+        f.write(_header.pack(MAGIC, VERSION, len(sections)))
+        f.write(_mesh_info.pack(_modes.index(mode), mesh.static, mesh.render_points_in_3d, mesh.thickness, vertex_buffer_length))
+        for name, array, columns, offset in sections:
+            f.write(_section.pack(name.encode(), array.dtype.str[1:].encode(), columns, offset, array.nbytes))
+        for _, array, _, offset in sections:
+            f.write(b'\x00' * (offset - f.tell()))
+            f.write(array.tobytes())
+
+
+def read_binary_ursinamesh(path):
+    import numpy as np
+
+    from ursina.mesh import Mesh
+
+    with open(path, 'rb') as f:
+        # copy-on-write, so the arrays can be edited without changing the file. the file can be closed, the mapping stays valid.
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    magic, version, section_count = _header.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f'not a binary ursinamesh file: {path}')
+    if version > VERSION:
+        raise ValueError(f'binary ursinamesh file {path} is version {version}, but only up to version {VERSION} is supported')
+
+    mode, static, render_points_in_3d, thickness, vertex_buffer_length = _mesh_info.unpack_from(buffer, _header.size)
+    arrays = dict()
+    for i in range(section_count):
+        name, dtype, columns, offset, size = _section.unpack_from(buffer, _header.size + _mesh_info.size + (i * _section.size))
+        dtype = np.dtype('<' + dtype.decode())
+        array = np.frombuffer(buffer, dtype=dtype, count=size // dtype.itemsize, offset=offset)
+        if columns:
+            array = array.reshape(-1, columns)
+        arrays[name.decode()] = array
+
+    triangles = arrays.get('tris', [])
+    if 'tlen' in arrays:    # triangles with different lengths, like a mix of triangles, quads and lines
+        triangles = [tuple(e.tolist()) for e in np.split(triangles, np.cumsum(arrays['tlen'])[:-1])]
+
+    vertex_buffer = None
+    vertex_buffer_format = None
+    if 'vbuf' in arrays:
+        vertex_buffer = arrays['vbuf']
+        vertex_buffer_format = arrays['vfmt'].tobytes().decode()
+
+    return Mesh(
+        vertices=arrays.get('vert', []),
+        triangles=triangles,
+        colors=arrays.get('colr', []),
+        uvs=arrays.get('uvs_', []),
+        normals=arrays.get('norm', []),
+        static=bool(static),
+        mode=_modes[mode],
+        thickness=thickness,
+        render_points_in_3d=bool(render_points_in_3d),
+        vertex_buffer=vertex_buffer,
+        vertex_buffer_length=vertex_buffer_length if vertex_buffer is not None else None,
+        vertex_buffer_format=vertex_buffer_format,
+        )
+
+
+if __name__ == '__main__':
+    from ursina import EditorCamera, Entity, Ursina, application, load_model
+    app = Ursina()
+    m = load_model('sphere', use_deepcopy=True)
+    m.save('sphere_binary.ursinamesh', folder=application.asset_folder, binary=True)
+    Entity(model=read_binary_ursinamesh(application.asset_folder / 'sphere_binary.ursinamesh'), texture='shore')
+    EditorCamera()
+    app.run()
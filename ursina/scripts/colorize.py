@@ -16,7 +16,7 @@ def get_world_normals(model):
 
 def colorize(model, left=color.white, right=color.blue, down=color.red, up=color.green, back=color.white, forward=color.white, smooth=True, world_space=True, strength=1):
 
-    if not model.normals:
+    if len(model.normals) == 0:
         print('generating normals for', model)
         model.generate_normals(smooth=smooth)
 
@@ -1,3 +1,5 @@
+import numbers
+
 from ursina import *
 
 
@@ -25,7 +27,7 @@ def combine(combine_parent, analyze=False, auto_destroy=True, ignore=[], ignore_
         if e.has_ancestor(combine_parent) or e == combine_parent:
             if not hasattr(e, 'model') or e.model == None or e.scripts or e.eternal:
                 continue
-            if not hasattr(e.model, 'vertices') or not e.model.vertices:
+            if not hasattr(e.model, 'vertices') or len(e.model.vertices) == 0:
                 e.model = load_model(e.model.name, use_deepcopy=True)
                 e.origin = e.origin
             if not e.model:
@@ -38,13 +40,13 @@ def combine(combine_parent, analyze=False, auto_destroy=True, ignore=[], ignore_
             world_space_verts = [Vec3(*vertex_to_world_matrix.xformPoint(Vec3(*v))) for v in e.model.vertices]
             verts += world_space_verts
 
-            if not e.model.triangles:
+            if len(e.model.triangles) == 0:
                 new_tris = [i for i in range(len(e.model.vertices))]
 
             else:
                 new_tris = list()
                 for t in e.model.triangles:
-                    if isinstance(t, int):
+                    if isinstance(t, numbers.Integral):
                         new_tris.append(t)
                     elif len(t) == 3:
                         new_tris.extend(t)
@@ -61,12 +63,12 @@ def combine(combine_parent, analyze=False, auto_destroy=True, ignore=[], ignore_
                 e.tris = new_tris
                 e.world_space_verts = world_space_verts
 
-            if e.model.uvs:
+            if len(e.model.uvs) > 0:
                 uvs.extend([(uv * e.texture_scale) + e.texture_offset for uv in e.model.uvs])
             else:
                 uvs.extend([(0,0) for e in e.model.vertices])
 
-            if e.model.colors: # if has vertex colors
+            if len(e.model.colors) > 0: # if has vertex colors
                 cols.extend([Color(*vcol) * e.color for vcol in e.model.colors])
             else:
                 cols.extend((e.color, ) * len(e.model.vertices))
@@ -77,7 +79,7 @@ def combine(combine_parent, analyze=False, auto_destroy=True, ignore=[], ignore_
                 normal_to_world_matrix.invertInPlace()
                 normal_to_world_matrix.transposeInPlace()
 
-                if e.model.normals: # if has normals
+                if len(e.model.normals) > 0: # if has normals
                     norms.extend([Vec3(*normal_to_world_matrix.xform(Vec3(*n)))for n in e.model.normals])
                 else:
                     norms.extend((Vec3.up, ) * len(e.model.vertices))
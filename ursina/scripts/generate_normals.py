@@ -9,17 +9,18 @@ def normalize_v3(v):
 def generate_normals(vertices, triangles=None, smooth=True):
     import numpy
 
-    if not vertices:
+    if len(vertices) == 0:
         raise ValueError("can't generate normals for a mesh with 0 vertices")
 
-    if not triangles:
-        new_tris = [(i, i+1, i+2) for i in range(0, len(vertices), 3)]
+    if triangles is None or len(triangles) == 0:
+        new_tris = numpy.arange(len(vertices) - len(vertices) % 3).reshape(-1, 3)
 
-    elif not isinstance(triangles[0], int):
+    elif not isinstance(triangles[0], int | numpy.integer):
         raise TypeError(f'triangles must be ints, not {type(triangles[0])} ({triangles[0]})')
 
     else:
-        new_tris = [(triangles[i], triangles[i+1], triangles[i+2]) for i in range(0, len(triangles), 3)]
+        new_tris = numpy.asarray(triangles)
+        new_tris = new_tris[:len(new_tris) - len(new_tris) % 3].reshape(-1, 3)
 
 
     vertices = numpy.array(vertices)
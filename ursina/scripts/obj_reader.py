@@ -0,0 +1,208 @@
+'''
+Fast .obj reader for obj_to_ursinamesh(). Instead of going through the file line by line, it finds the runs of
+'v', 'vt', 'vn' and 'f' lines with numpy, parses each run in one go with np.fromstring and triangulates and
+de-indexes the faces with array gathers. Materials set with usemtl are kept as ranges of faces and get their
+color from the Kd value in the .mtl file.
+
+Returns a Mesh backed by numpy arrays, or None if the file uses something this doesn't handle, like faces with
+different formats in the same run, so the caller can fall back to the slower line by line parser.
+'''
+import warnings
+from pathlib import Path
+
+_V, _VT, _VN, _F, _USEMTL, _MTLLIB = 1, 2, 3, 4, 5, 6
+
+
+def read_mtl_colors(path):  # material name -> (r, g, b, 1), from the Kd lines
+    colors = dict()
+    material_name = None
+    with open(path, encoding='utf-8') as mtl_file:
+        for line in mtl_file:
+            if line.startswith('newmtl '):
+                material_name = line[7:].strip()
+            elif line.startswith('Kd ') and material_name is not None:
+                colors[material_name] = (*[float(e) for e in line[3:].split()[:3]], 1)
+    return colors
+
+
+def read_obj(file_path):
+    import numpy as np
+
+    from ursina.mesh import Mesh
+
+    file_path = Path(file_path)
+    data = file_path.read_bytes()
+    if not data:
+        return None
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    line_ends = np.flatnonzero(buffer == 10)
+    if buffer[-1] != 10:
+        line_ends = np.append(line_ends, len(buffer))
+    line_starts = np.concatenate(((0, ), line_ends[:-1] + 1))
+
+    padded = np.concatenate((buffer, (0, 0)))
+    first, second = padded[line_starts], padded[line_starts + 1]
+    if ((first == 32) | (first == 9)).any():    # indented lines, let the line by line parser deal with it
+        return None
+
+    separator = (second == 32) | (second == 9)
+    kinds = np.zeros(len(line_starts), dtype=np.int8)
+    kinds[(first == ord('v')) & separator] = _V
+    kinds[(first == ord('v')) & (second == ord('t'))] = _VT
+    kinds[(first == ord('v')) & (second == ord('n'))] = _VN
+    kinds[(first == ord('f')) & separator] = _F
+    kinds[first == ord('u')] = _USEMTL
+    kinds[first == ord('m')] = _MTLLIB
+
+    # runs of lines of the same kind, which can be parsed all at once
+    run_starts = np.flatnonzero(np.concatenate(((True, ), kinds[1:] != kinds[:-1])))
+    run_ends = np.concatenate((run_starts[1:], (len(kinds), )))
+
+    positions, uvs, normals = [], [], []
+    counts = {_V: 0, _VT: 0, _VN: 0}
+    face_runs = []          # (vertex indices, uv indices, normal indices, corners per face, material color index)
+    mtl_colors = None
+    material_colors = []
+    current_material = -1
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')     # np.fromstring warns instead of failing on bad input. that's caught by checking the size.
+
+        for start, end, kind in zip(run_starts.tolist(), run_ends.tolist(), kinds[run_starts].tolist(), strict=True):
+            chunk = data[line_starts[start]:line_ends[end-1]]
+            rows = end - start
+
+            if kind in (_V, _VT, _VN):
+                prefix = (b'v', b'vt', b'vn')[kind-1]
+                columns = len(data[line_starts[start]:line_ends[start]].split()) - 1
+                values = np.fromstring(chunk.replace(prefix, b' '), sep=' ')
+                if columns < 2 or values.size != rows * columns:
+                    return None
+                (positions, uvs, normals)[kind-1].append(values.reshape(rows, columns))
+                counts[kind] += rows
+
+            elif kind == _F:
+                first_corner = data[line_starts[start]:line_ends[start]].split()[1]
+                has_uvs = first_corner.count(b'/') >= 1 and b'//' not in first_corner
+                has_normals = first_corner.count(b'/') == 2
+                width = 1 + has_uvs + has_normals
+
+                # count the corners of each face by counting the tokens on each line, minus the 'f'
+                chunk_bytes = np.frombuffer(chunk, dtype=np.uint8)
+                space = (chunk_bytes == 32) | (chunk_bytes == 9) | (chunk_bytes == 13) | (chunk_bytes == 10)
+                token_starts = ~space
+                token_starts[1:] &= space[:-1]
+                corners = np.add.reduceat(token_starts.astype(np.int64), line_starts[start:end] - line_starts[start]) - 1
+
+                indices = np.fromstring(chunk.replace(b'f', b' ').replace(b'/', b' '), dtype=np.int64, sep=' ')
+                if (corners < 3).any() or indices.size != corners.sum() * width:
+                    return None
+                indices = indices.reshape(-1, width)
+
+                resolved = []
+                for column, count in zip(range(width), (counts[_V], *((counts[_VT], ) if has_uvs else ()), *((counts[_VN], ) if has_normals else ())), strict=True):
+                    column_indices = indices[:, column]
+                    resolved.append(np.where(column_indices < 0, column_indices + count, column_indices - 1))     # 1 based, or relative if negative
+
+                face_runs.append((resolved[0], resolved[1] if has_uvs else None, resolved[-1] if has_normals else None, corners, current_material))
+
+            elif kind == _MTLLIB:
+                for line in chunk.splitlines():
+                    if not line.startswith(b'mtllib'):
+                        continue
+                    mtl_path = file_path.parent / line[7:].strip().decode(errors='ignore')
+                    if not mtl_path.is_file():
+                        mtl_path = file_path.with_suffix('.mtl')
+                    if mtl_path.is_file():
+                        mtl_colors = read_mtl_colors(mtl_path)
+
+            elif kind == _USEMTL and mtl_colors:
+                for line in chunk.splitlines():
+                    material_name = line[7:].strip().decode(errors='ignore')
+                    if line.startswith(b'usemtl ') and material_name in mtl_colors:
+                        material_colors.append(mtl_colors[material_name])
+                        current_material = len(material_colors) - 1
+
+    if not positions or not face_runs:
+        return None
+
+    position_columns = max(e.shape[1] for e in positions)
+    vertex_data = np.concatenate([np.pad(e, ((0, 0), (0, position_columns - e.shape[1]))) for e in positions])
+    vertex_indices = np.concatenate([e[0] for e in face_runs])
+    corners = np.concatenate([e[3] for e in face_runs])
+    if vertex_indices.min() < 0 or vertex_indices.max() >= len(vertex_data):
+        return None
+
+    # triangulate as fans: (0, i, i+1) for each face
+    triangle_counts = corners - 2
+    face_starts = np.cumsum(corners) - corners
+    if (corners == 3).all():
+        gather = np.arange(len(vertex_indices))
+    else:
+        triangle_faces = np.repeat(np.arange(len(corners)), triangle_counts)
+        i = np.arange(len(triangle_faces)) - np.repeat(np.cumsum(triangle_counts) - triangle_counts, triangle_counts) + 1
+        first_corner = face_starts[triangle_faces]
+        gather = np.stack((first_corner, first_corner + i, first_corner + i + 1), axis=-1).reshape(-1)
+
+    vertices = vertex_data[vertex_indices[gather], :3].astype(np.float32)
+    vertices[:, 0] *= -1
+
+    mesh_uvs = None
+    if uvs and all(e[1] is not None for e in face_runs):
+        uv_data = np.concatenate([e[:, :2] for e in uvs])
+        uv_indices = np.concatenate([e[1] for e in face_runs])[gather]
+        if uv_indices.min() < 0 or uv_indices.max() >= len(uv_data):
+            return None
+        mesh_uvs = uv_data[uv_indices].astype(np.float32)
+
+    mesh_normals = None
+    if normals and all(e[2] is not None for e in face_runs):
+        normal_data = np.concatenate([e[:, :3] for e in normals])
+        normal_indices = np.concatenate([e[2] for e in face_runs])[gather]
+        if normal_indices.min() < 0 or normal_indices.max() >= len(normal_data):
+            return None
+        mesh_normals = normal_data[normal_indices].astype(np.float32)
+        mesh_normals[:, 0] *= -1
+
+    # material colors take priority over vertex colors, like in the line by line parser
+    mesh_colors = None
+    has_vertex_colors = position_columns >= 6
+    if material_colors or has_vertex_colors:
+        if has_vertex_colors:
+            vertex_colors = np.ones((len(vertex_data), 4))
+            color_columns = min(position_columns, 7) - 3
+            vertex_colors[:, :color_columns] = vertex_data[:, 3:3+color_columns]
+            for e, offset in zip(positions, np.cumsum([0, *[len(e) for e in positions[:-1]]]), strict=True):
+                if e.shape[1] < 6:  # these didn't have colors, so make them white
+                    vertex_colors[offset:offset+len(e)] = 1
+            mesh_colors = vertex_colors[vertex_indices[gather]].astype(np.float32)
+        else:
+            mesh_colors = np.ones((len(gather), 4), dtype=np.float32)
+
+        if material_colors:
+            face_materials = np.repeat(np.array([e[4] for e in face_runs]), [len(e[3]) for e in face_runs])
+            corner_materials = np.repeat(face_materials, corners)[gather]
+            has_material = corner_materials >= 0
+            mesh_colors[has_material] = np.array(material_colors, dtype=np.float32)[corner_materials[has_material]]
+
+    return Mesh(vertices=vertices, uvs=mesh_uvs, normals=mesh_normals, colors=mesh_colors)
+
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    from ursina import EditorCamera, Entity, Ursina
+    app = Ursina()
+    folder = Path(tempfile.mkdtemp())
+    (folder / 'colors.mtl').write_text('newmtl red\nKd 1 0 0\nnewmtl blue\nKd 0 0 1\n')
+    (folder / 'quads.obj').write_text('''mtllib colors.mtl
+v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nv 2 0 0\nv 2 1 0
+usemtl red
+f 1 2 3 4
+usemtl blue
+f 2 5 6 3
+''')
+    Entity(model=read_obj(folder / 'quads.obj'), double_sided=True)
+    EditorCamera()
+    app.run()
@@ -1,6 +1,12 @@
 import time
+from heapq import heapify, heappop, heappush
+from itertools import count
+from math import floor
 
 from ursina import application
+from ursina import curve as curves
+from ursina.scripts.property_generator import generate_properties_for_class
+from ursina.ursinamath import lerp
 
 Wait = float
 
@@ -15,19 +21,106 @@ class Func:
         return self.func(*self.args, **self.kwargs)
 
 
+class SequenceScheduler:
+    # Instead of updating every Sequence every frame, each running Sequence is put in a heap with the clock time it should wake up at,
+    # which is when its next Func is due, or when it ends. There's one clock per time source, so a Sequence's own time can be calculated from it when needed.
+    # Sequences with an .entity are still updated every frame, since they pause when the entity gets disabled.
+    def __init__(self):
+        self.now = {(source, ignore_paused): 0.0 for source in ('scaled', 'unscaled', 'step') for ignore_paused in (False, True)}
+        self.heaps = {key: [] for key in self.now}
+        self.polled = dict()
+        self._counter = count()
+        self._cancelled = 0
+
+
+    def schedule(self, sequence, clock, wake_time, event_time):   # O(log n)
+        heappush(self.heaps[clock], (wake_time, next(self._counter), sequence._schedule_id, sequence, event_time))
+
+
+    def cancel(self, sequence):     # O(1). the old heap entry is skipped when it comes up, since the schedule id won't match anymore.
+        if sequence._clock is not None:
+            self._cancelled += 1
+        sequence._schedule_id += 1
+        sequence._clock = None
+        self.polled.pop(sequence, None)
+
+
+    def update(self):
+        for clock in self.now:
+            source, ignore_paused = clock
+            if application.paused and not ignore_paused:
+                continue
+            if source == 'scaled':
+                self.now[clock] += time.dt
+            elif source == 'unscaled':
+                self.now[clock] += time.dt_unscaled
+            else:
+                self.now[clock] += 1
+
+        for sequence in tuple(self.polled):
+            if sequence not in application.sequences:   # removed without kill(), for example by scene.clear()
+                self.cancel(sequence)
+            elif sequence in self.polled:
+                sequence.update()
+
+        due = []
+        for clock, heap in self.heaps.items():
+            now = self.now[clock]
+            while heap and heap[0][0] <= now:
+                _wake_time, _i, schedule_id, sequence, event_time = heappop(heap)
+                if schedule_id == sequence._schedule_id:
+                    due.append((schedule_id, sequence, event_time))
+                else:
+                    self._cancelled -= 1
+
+        for schedule_id, sequence, event_time in due:
+            if schedule_id != sequence._schedule_id:    # might have been killed by a Func of a sequence that woke up before it
+                continue
+            if sequence not in application.sequences:
+                sequence._clock = None
+                continue
+            sequence._wake(event_time)
+
+        if self._cancelled > 64 and self._cancelled > sum(len(heap) for heap in self.heaps.values()) // 2:
+            self._remove_cancelled()
+
+
+    def _remove_cancelled(self):
+        for heap in self.heaps.values():
+            heap[:] = [entry for entry in heap if entry[2] == entry[3]._schedule_id]
+            heapify(heap)
+        self._cancelled = 0
+
+
+    def clear(self):
+        for heap in self.heaps.values():
+            for entry in heap:
+                entry[3]._clock = None
+            heap.clear()
+        self.polled.clear()
+        self._cancelled = 0
+
+
+sequence_scheduler = SequenceScheduler()
+
+
+@generate_properties_for_class()
 class Sequence:
     default_time_step = None
 
     def __init__(self, *args, unscaled=False, started=False, ignore_paused=False, loop=False, auto_destroy=False, entity=None, time_scale=1, name='sequence', **kwargs):
         super().__init__()
+        self._t = 0
+        self._cursor = 0        # index of the next Func to call
+        self._clock = None      # the scheduler clock this is waiting on. None if it's not scheduled.
+        self._synced_at = 0     # clock time when _t was last updated
+        self._schedule_id = 0
         self.args = list(args)
-        self.t = 0
         self.time_step = Sequence.default_time_step
         self.time_scale = time_scale
         self.duration = 0
         self.funcs = []
         self.func_call_time = []
-        self.func_finished_statuses = []
         self.unscaled = unscaled
         self.paused = False
         self.name = name
@@ -42,13 +135,15 @@ class Sequence:
 
         self.generate()
         application.sequences.append(self)
+        self._reschedule()
 
 
     def generate(self):
+        self._sync()
         self.duration = 0
         self.funcs = []
         self.func_call_time = []
-        self.func_finished_statuses = []
+        self._cursor = 0
 
         for arg in self.args:
             if isinstance(arg, int | float):
@@ -57,7 +152,8 @@ class Sequence:
             elif callable(arg):
                 self.funcs.append(arg)
                 self.func_call_time.append(self.duration)
-                self.func_finished_statuses.append(False)
+
+        self._reschedule()
 
         # print('-----------')
     def __str__(self):
@@ -83,12 +179,11 @@ class Sequence:
         self.generate()
 
     def start(self):
-        for i, f in enumerate(self.funcs):
-            self.func_finished_statuses[i] = False
-
-        self.t = 0
-        self.started = True
-        self.paused = False
+        self._cursor = 0
+        self._t = 0
+        self._started = True
+        self._paused = False
+        self._reschedule()
         return self
 
     def pause(self):
@@ -99,60 +194,283 @@ class Sequence:
 
     def finish(self):
         self.t = self.duration
-        self.update()
+        if self.started and not self._is_paused():
+            self._call_due_funcs()
         self.paused = False
         self.started = False
 
     def kill(self):
-        if self in application.sequences:
-            application.sequences.remove(self)
-            del self
+        application.sequences.discard(self)
+        sequence_scheduler.cancel(self)
 
     @property
     def finished(self):
         return self.t >= self.duration
 
+    @property
+    def func_finished_statuses(self):
+        return [i < self._cursor for i in range(len(self.funcs))]
+
+
+    def t_getter(self):     # time since start. worked out from the scheduler's clock while running, since it only gets updated when the sequence wakes up.
+        if self._clock is None:
+            return self._t
+        return self._t + (sequence_scheduler.now[self._clock] - self._synced_at) * self._rate
+
+    def t_setter(self, value):
+        self._sync()
+        self._t = value
+        self._reschedule()
+
+    # changing any of these on a running sequence changes when it should wake up next
+    def time_scale_setter(self, value):
+        self._sync()
+        self._time_scale = value
+        self._reschedule()
+
+    def unscaled_setter(self, value):
+        self._sync()
+        self._unscaled = value
+        self._reschedule()
+
+    def time_step_setter(self, value):
+        self._sync()
+        self._time_step = value
+        self._reschedule()
+
+    def ignore_paused_setter(self, value):
+        self._sync()
+        self._ignore_paused = value
+        self._reschedule()
+
+    def paused_setter(self, value):
+        self._sync()
+        self._paused = value
+        self._reschedule()
+
+    def started_setter(self, value):
+        self._sync()
+        self._started = value
+        self._reschedule()
+
+    def entity_setter(self, value):
+        self._sync()
+        self._entity = value
+        self._reschedule()
+
+
+    def _is_paused(self):
+        if self.ignore_paused is False and (self.paused or application.paused):
+            return True
+        if self.entity and (not self.entity.enabled or self.entity.ignore):
+            return True
+        return False
+
+    @property
+    def _rate(self):    # how much t changes per unit of scheduler clock time
+        if self.time_step is not None:
+            return self.time_step
+        if self.unscaled:
+            return 1
+        return self.time_scale
 
-    def update(self):
-        if not self.started:
+
+    def _sync(self):    # bring _t up to date with the scheduler clock
+        if self._clock is None:
             return
+        now = sequence_scheduler.now[self._clock]
+        self._t += (now - self._synced_at) * self._rate
+        self._synced_at = now
 
-        if self.ignore_paused is False and (self.paused or application.paused):
+
+    def _reschedule(self):
+        sequence_scheduler.cancel(self)
+        if self not in application.sequences or not self.started:  # also the case while still in __init__
             return
 
-        if self.entity and (not self.entity.enabled or self.entity.ignore):
+        if self.entity is not None:
+            sequence_scheduler.polled[self] = None
+            return
+
+        if self.ignore_paused is False and self.paused:
             return
 
+        rate = self._rate
+        if rate <= 0:
+            return
+
+        if self._cursor < len(self.funcs):
+            event_time = self.func_call_time[self._cursor]
+        elif self._t < self.duration or self.loop or self.auto_destroy:
+            event_time = self.duration
+        else:   # finished and nothing more to do
+            return
+
+        self._clock = ('step' if self.time_step is not None else 'unscaled' if self.unscaled else 'scaled', self.ignore_paused is not False)
+        self._synced_at = sequence_scheduler.now[self._clock]
+        wake_time = self._synced_at + max(event_time - self._t, 0) / rate
+        sequence_scheduler.schedule(self, self._clock, wake_time, event_time)
+
 
+    def _wake(self, event_time):    # called by the scheduler when the next Func is due
+        self._sync()
+        self._t = max(self._t, event_time)  # in case of floating point error
+        self._clock = None
+        self._call_due_funcs()
+        self._reschedule()
+
+
+    def update(self):   # advance one frame. the scheduler calls this every frame for sequences with an .entity, the others only wake up when they have something to do.
+        if not self.started:
+            return
+
+        if self._is_paused():
+            return
+
+        self._sync()
         if self.time_step is None:
             if not self.unscaled:
-                self.t += time.dt * self.time_scale
+                self._t += time.dt * self.time_scale
             else:
-                self.t += time.dt_unscaled
+                self._t += time.dt_unscaled
         else:
-            self.t += self.time_step
+            self._t += self.time_step
+
+        self._call_due_funcs()
+        if self._clock is not None:
+            self._reschedule()
 
-        for i, f in enumerate(self.funcs):
-            if not self.func_finished_statuses[i] and self.func_call_time[i] <= self.t:
-                f()
-                self.func_finished_statuses[i] = True
 
+    def _call_due_funcs(self):
+        while self._cursor < len(self.funcs) and self.func_call_time[self._cursor] <= self._t:
+            f = self.funcs[self._cursor]
+            self._cursor += 1
+            f()
 
-        if self.t >= self.duration:
+        if self._t >= self.duration:
             if self.loop:
-                for i, f in enumerate(self.funcs):
-                    self.func_finished_statuses[i] = False
+                self._cursor = 0
 
                 if time.dt > self.duration: # if delta time is too big, set t to 0 so it doesn't get stuck, but allow desync.
-                    self.t = 0
+                    self._t = 0
                 else:
-                    self.t -= self.duration
+                    self._t -= self.duration
                 return
 
-            if self.auto_destroy and self in application.sequences:
-                application.sequences.remove(self)
-                del self
+            if self.auto_destroy:
+                self.kill()
+
+
+class Tween(Sequence):
+    # animates a value from start to end by evaluating the curve every frame, instead of storing a Func for every step like Sequence.
+    # it's updated every frame while it's running, and stops being updated when it's done.
+    def __init__(self, setattr_function, name, start, end, duration=.1, delay=0, curve=curves.linear, resolution=None, lerp_function=lerp, **kwargs):
+        self.setattr_function = setattr_function
+        self.attr_name = name
+        self.start_value = start
+        self.end_value = end
+        self.delay = delay
+        self.tween_duration = duration
+        self.curve = curve
+        self.resolution = resolution    # if set, only change the value this many times, like the old baked animations.
+        self.lerp_function = lerp_function
+        self._last_progress = None
+        super().__init__(Wait(delay + duration), name=name, **kwargs)
+
+
+    def start(self):
+        self._last_progress = None
+        return super().start()
+
+
+    def _reschedule(self):
+        sequence_scheduler.cancel(self)
+        if self not in application.sequences or not self.started:
+            return
+        if self.ignore_paused is False and self.paused:
+            return
+        if self._t >= self.duration and self._finished_animating() and not self.loop and not self.auto_destroy:
+            return
+        sequence_scheduler.polled[self] = None
+
+    def _finished_animating(self):
+        return self._last_progress == 1
+
+
+    def _call_due_funcs(self):
+        if self._t >= self.delay:
+            progress = 1
+            if self._t < self.duration and self.tween_duration > 0:
+                progress = (self._t - self.delay) / self.tween_duration
+                if self.resolution:
+                    progress = floor(progress * self.resolution) / self.resolution
+
+            if progress != self._last_progress:
+                self._last_progress = progress
+                self.setattr_function(self.attr_name, self.lerp_function(self.start_value, self.end_value, self.curve(progress)))
+
+        if self._t >= self.duration:
+            if self.loop:
+                self._last_progress = None
+            elif not self.auto_destroy:
+                sequence_scheduler.cancel(self)   # done, no need to update it anymore
+                return
+
+        super()._call_due_funcs()
+
+
+class BatchTween(Tween):
+    # animates the same attribute on many targets at once. start and end values are kept in numpy arrays, one row per target,
+    # so the curve and lerp are done for the whole batch in one step. write_function(indices, values) gets the rows that changed.
+    # delay and duration can be a single value or one per target.
+    def __init__(self, write_function, name, start, end, duration=.1, delay=0, curve=curves.linear, **kwargs):
+        import numpy as np
+        self.write_function = write_function
+        self.start_value = np.asarray(start, dtype=float)
+        self.end_value = np.asarray(end, dtype=float)
+        count = len(self.start_value)
+        self.delay = np.broadcast_to(np.asarray(delay, dtype=float), (count,))
+        self.tween_duration = np.broadcast_to(np.asarray(duration, dtype=float), (count,))
+        self.curve = curve
+        self._curve_array = curves.vectorize(curve)
+        self._finished = np.zeros(count, dtype=bool)
+        total_duration = float((self.delay + self.tween_duration).max()) if count else 0
+        Sequence.__init__(self, Wait(total_duration), name=name, **kwargs)
+
+
+    def start(self):
+        self._finished[:] = False
+        return Sequence.start(self)
+
+
+    def _finished_animating(self):
+        return self._finished.all()
+
+
+    def _call_due_funcs(self):
+        import numpy as np
+        indices = np.flatnonzero((self._t >= self.delay) & ~self._finished)
+        if len(indices):
+            duration = self.tween_duration[indices]
+            progress = np.ones(len(indices))
+            np.divide(self._t - self.delay[indices], duration, out=progress, where=duration > 0)
+            np.minimum(progress, 1, out=progress)
+            self._finished[indices] = progress >= 1
+
+            t = self._curve_array(progress)
+            if self.start_value.ndim > 1:
+                t = t[:, None]
+            start = self.start_value[indices]
+            self.write_function(indices, start + (self.end_value[indices] - start) * t)
+
+        if self._t >= self.duration:
+            if self.loop:
+                self._finished[:] = False
+            elif not self.auto_destroy:
+                sequence_scheduler.cancel(self)
+                return
 
+        Sequence._call_due_funcs(self)
 
 
 if __name__ == '__main__':
@@ -1,6 +1,6 @@
 from pathlib import Path
 from panda3d.core import Shader as Panda3dShader
-from ursina import application
+from ursina import application, asset_index
 
 
 default_vertex_shader = '''
@@ -110,10 +110,9 @@ class Shader:
         )
 
         for sh, name in parts.items():
-            for folder in folders:
-                for filename in folder.glob('**/' + name):
-                    with filename.open("rt") as f:
-                        parts[sh] = f.read()
+            for filename, _, _ in asset_index.search(name, folders, folder_first=True):
+                with filename.open("rt") as f:
+                    parts[sh] = f.read()
 
         parts.update(kwargs)
         return cls(language, **parts)
@@ -124,7 +123,7 @@ class Shader:
         from ursina.scene import instance as scene
         if hasattr(self, 'default_input') and key in self.default_input:
             print('setting global shader input:', key, value)
-            for entity_with_this_shader in [e for e in scene.entities if e.shader == self]:
+            for entity_with_this_shader in tuple(scene._shader_users.get(self, ())):
                 entity_with_this_shader.set_shader_input(key, value)
 
 
@@ -8,7 +8,7 @@ import sys
 
 import ursina
 from ursina import camera
-from ursina import application
+from ursina import application, asset_index
 from ursina.entity import Entity
 from ursina.sequence import Sequence, Func, Wait
 from ursina import color
@@ -30,12 +30,9 @@ def _search_for_file(name, folders, file_types=None): # prioritizes based on fil
     if '.' in name:
         file_types = ('', )
 
-    for file_type in file_types:
-        for folder in folders:
-            # print('-----', 'searchpattern:', f'{folder}/**/{name}{file_type}', 'result:', list(folder.glob(f'**/{name}.{file_type}')))
-            for file_path in folder.glob(f'**/{name}{file_type}'):
-                #print('FOUND FONT:', file_path)
-                return file_path
+    for file_path, _, _ in asset_index.search(name, folders, file_types):
+        #print('FOUND FONT:', file_path)
+        return file_path
 
     return None
 
@@ -2,11 +2,13 @@ from pathlib import Path
 from copy import copy
 import builtins
 import importlib.util
-from ursina import application
+from ursina import application, asset_index, async_loading
 from ursina.texture import Texture
+from ursina.asset_cache import AssetCache, release_texture, texture_size
 
 
-imported_textures = dict()
+imported_textures = AssetCache(size_of=texture_size, on_evict=release_texture, name='textures')    # set imported_textures.budget to limit how much memory loaded textures can use
+_loading_textures = dict()  # name -> Future, for load_texture_async calls that haven't finished yet
 file_types = ('.tif', '.jpg', '.jpeg', '.png', '.gif')
 textureless = False
 
@@ -19,8 +21,10 @@ def load_texture(name, folder:Path=None, use_cache=True, filtering='default'):
     if textureless and '*' not in name:
         return Texture(application.internal_textures_folder/'white_cube.png')
 
-    if use_cache and name in imported_textures:
-        return copy(imported_textures[name])
+    if use_cache:
+        cached = imported_textures.get(name, False)
+        if cached is not False:     # None means we already looked for it and it's missing
+            return copy(cached)
 
     if use_thumbhash:
         global thumbhashes
@@ -36,49 +40,72 @@ def load_texture(name, folder:Path=None, use_cache=True, filtering='default'):
             imported_textures[name] = tex
             return tex
 
-    if folder is not None:
-        if not isinstance(folder, Path):
-            raise TypeError(f'folder must be a Path, not a {type(folder)}')
-        _folders = (folder,)
+    _folders = _texture_folders(folder)
 
-    else:
-        _folders = (application.textures_compressed_folder, application.asset_folder, application.internal_textures_folder)
+    if name.endswith('.mp4'):
+        for filename, _, _ in asset_index.search(name, _folders):
+            # print('loaded movie texture:', filename)
+            return builtins.loader.loadTexture(filename.resolve())
 
 
-    if name.endswith('.mp4'):
-        for folder in _folders:
-            for filename in folder.glob('**/' + name):
-                # print('loaded movie texture:', filename)
-                return builtins.loader.loadTexture(filename.resolve())
-
-
-    for folder in _folders:
-        if '.' in name: # got name with file extension
-            for filename in folder.glob('**/' + name):
-                t = Texture(filename.resolve(), filtering=filtering)
-                imported_textures[name] = t
-                return t
-
-        for filename in folder.glob('**/' + name + '.*'): # no file extension given, so try all supported
-            if filename.suffix in file_types:
-                # print('found:', filename)
-                t = Texture(filename.resolve(), filtering=filtering)
-                imported_textures[name] = t
-                return t
+    t = _load_texture_file(name, _folders, filtering)
+    if t is not None:
+        imported_textures[name] = t
+        return t
 
     if application.development_mode and importlib.util.find_spec('psd_tools'):
         from psd_tools import PSDImage
 
-        for folder in _folders:
-            for filename in folder.glob('**/' + name + '.psd'):
-                print('found uncompressed psd, compressing it...')
-                compress_textures(name)
-                return load_texture(name)
+        for _ in asset_index.search(name, _folders, ('.psd', )):
+            print('found uncompressed psd, compressing it...')
+            compress_textures(name)
+            return load_texture(name)
 
     imported_textures[name] = None  # prevent searching for the same missing texture multiple times
     return None
 
 
+def load_texture_async(name, folder:Path=None, use_cache=True, filtering='default'):
+    # like load_texture, but finds and decodes the image on a background thread. returns a Future with the Texture, or None if it's missing.
+    # the texture gets added to imported_textures on the main thread, at the start of a frame.
+    if textureless or use_thumbhash or name.endswith('.mp4') or (use_cache and name in imported_textures):
+        return async_loading.resolved(load_texture(name, folder, use_cache, filtering))
+
+    def finish(t):
+        if t is None:   # let load_texture look for a .psd and remember that it's missing
+            return load_texture(name, folder, use_cache, filtering)
+        if use_cache:
+            if name in imported_textures:   # could have been loaded by load_texture while we were waiting
+                return copy(imported_textures[name])
+            imported_textures[name] = t
+        return t
+
+    if use_cache and name in _loading_textures:     # already loading, so don't do it twice
+        return _loading_textures[name]
+    future = async_loading.submit(_load_texture_file, name, _texture_folders(folder), filtering, on_main_thread=finish)
+    if use_cache:
+        _loading_textures[name] = future
+        future.add_done_callback(lambda future: _loading_textures.pop(name, None))
+    return future
+
+
+def _texture_folders(folder):
+    if folder is not None:
+        if not isinstance(folder, Path):
+            raise TypeError(f'folder must be a Path, not a {type(folder)}')
+        return (folder,)
+
+    return (application.textures_compressed_folder, application.asset_folder, application.internal_textures_folder)
+
+
+def _load_texture_file(name, _folders, filtering):     # finds and loads the texture, without touching imported_textures, so it can run on a background thread
+    # if name has a file extension, look for that first. otherwise, try all the supported ones.
+    for filename, _, _ in asset_index.search(name, _folders, ('', *file_types) if '.' in name else file_types, folder_first=True):
+        # print('found:', filename)
+        return Texture(filename.resolve(), filtering=filtering)
+    return None
+
+
 
 def compress_textures(name=''):
     try:
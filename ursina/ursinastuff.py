@@ -3,7 +3,8 @@ import os
 
 from ursina import application
 from ursina.scene import instance as scene
-from ursina.sequence import Sequence, Func, Wait
+from ursina.sequence import Sequence, Func, Wait, BatchTween
+from ursina import curve
 
 
 class Empty():
@@ -82,6 +83,58 @@ def after(delay, unscaled=True, ignore_paused=False, entity=None):    # function
     return _decorator
 
 
+def animate_many(entities, name, value, duration=.1, delay=0, curve=curve.in_expo, loop=False, time_step=None, unscaled=False, ignore_paused=False, auto_play=True, auto_destroy=True):
+    '''Animate the same attribute on many entities with a single BatchTween, instead of one Sequence per entity.
+        value can be a single value for all of them or one per entity. delay and duration can also be one per entity, for staggered animations.
+
+        example:
+        animate_many(buttons, 'position', [b.position + Vec3(0,.1,0) for b in buttons], duration=.5, delay=[i*.02 for i in range(len(buttons))], curve=curve.out_expo)
+    '''
+    import numpy as np
+
+    entities = list(entities)
+    example_value = getattr(entities[0], name) if entities else 0
+    start = np.array([getattr(e, name) for e in entities], dtype=float)
+    if start.ndim > 1:
+        end = start.copy()
+        value = np.array(value, dtype=float)
+        if value.ndim == 1:   # the same value for every entity
+            value = np.broadcast_to(value, (len(entities), len(value)))
+        end[:, :value.shape[1]] = value  # a Vec2 target only changes x and y
+    else:
+        end = np.broadcast_to(np.asarray(value, dtype=float), start.shape)
+
+    def write(indices, values):     # set the values directly on the NodePaths, for the most common attributes
+        if name == 'scale':
+            values = np.where(values == 0, .001, values)
+        elif name == 'rotation':
+            values = values[:, [1,0,2]] * entities[0].rotation_directions
+
+        values = values.tolist()
+        if name in ('position', 'scale', 'rotation', 'x', 'y', 'z'):
+            setter_name = {'position':'setPos', 'scale':'setScale', 'rotation':'setHpr', 'x':'setX', 'y':'setY', 'z':'setZ'}[name]
+            for i, v in zip(indices.tolist(), values, strict=True):
+                e = entities[i]
+                if not e:   # destroyed while animating
+                    continue
+                if isinstance(v, list):
+                    getattr(e, setter_name)(*v)
+                else:
+                    getattr(e, setter_name)(v)
+                e._transform_changed()   # since the Entity setters aren't used, scene.collision_grid has to be told about the move here
+            return
+
+        value_type = type(example_value)
+        for i, v in zip(indices.tolist(), values, strict=True):
+            e = entities[i]
+            if e:
+                setattr(e, name, value_type(*v) if isinstance(v, list) else v)
+
+    sequence = BatchTween(write, name, start, end, duration=duration, delay=delay, curve=curve, loop=loop, time_step=time_step, unscaled=unscaled, ignore_paused=ignore_paused, auto_destroy=auto_destroy)
+    if auto_play:
+        sequence.start()
+    return sequence
+
 def size_list():    # return a list of current python objects sorted by size
     import operator
 